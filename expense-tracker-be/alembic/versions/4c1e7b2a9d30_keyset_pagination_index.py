@@ -0,0 +1,58 @@
+"""keyset_pagination_index
+
+Revision ID: 4c1e7b2a9d30
+Revises: 5aad84633ae6
+Create Date: 2026-10-17 14:05:12.418377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7b2a9d30'
+down_revision: Union[str, Sequence[str], None] = '5aad84633ae6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Thêm id vào cuối khóa index để ORDER BY/WHERE của keyset pagination
+    # (date DESC, created_at DESC, id DESC) đi thẳng trên index, không cần sort.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_date_created_id',
+            'transactions',
+            ['user_id', sa.text('date DESC'), sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_transactions_user_date_created',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_date_created',
+            'transactions',
+            ['user_id', sa.text('date DESC'), sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_transactions_user_date_created_id',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
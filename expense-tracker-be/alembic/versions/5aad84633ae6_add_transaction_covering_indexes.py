@@ -0,0 +1,60 @@
+"""add_transaction_covering_indexes
+
+Revision ID: 5aad84633ae6
+Revises: 89f55594863a
+Create Date: 2026-10-17 10:41:27.193054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5aad84633ae6'
+down_revision: Union[str, Sequence[str], None] = '89f55594863a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY không chạy được trong transaction -> tạo index ngoài transaction của Alembic
+    # để không khóa ghi bảng transactions trên production.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_type_date',
+            'transactions',
+            ['user_id', 'type', 'date'],
+            unique=False,
+            postgresql_include=['amount', 'category_id', 'category_name'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transactions_user_date_created',
+            'transactions',
+            ['user_id', sa.text('date DESC'), sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_date_created',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_transactions_user_type_date',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,50 @@
+"""add_user_daily_totals_rollup
+
+Revision ID: 89f55594863a
+Revises: e92cd622d537
+Create Date: 2026-10-17 09:12:04.512833
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '89f55594863a'
+down_revision: Union[str, Sequence[str], None] = 'e92cd622d537'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_totals',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('type', sa.String(length=10), nullable=False),
+    sa.Column('category_id', sa.UUID(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'type', 'category_id')
+    )
+    op.create_index('ix_user_daily_totals_user_type_date', 'user_daily_totals', ['user_id', 'type', 'date'], unique=False)
+
+    # Backfill lần đầu từ dữ liệu hiện có (sau này dùng backfill_daily_totals.py nếu cần dựng lại).
+    op.execute(
+        """
+        INSERT INTO user_daily_totals (user_id, date, type, category_id, total_amount, transaction_count)
+        SELECT user_id, date, type, category_id, SUM(amount), COUNT(id)
+        FROM transactions
+        GROUP BY user_id, date, type, category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_daily_totals_user_type_date', table_name='user_daily_totals')
+    op.drop_table('user_daily_totals')
@@ -0,0 +1,62 @@
+"""add_admin_user_listing_indexes
+
+Revision ID: a8e3d5c7f190
+Revises: f4c9b1d2a635
+Create Date: 2026-10-17 20:21:37.618204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e3d5c7f190'
+down_revision: Union[str, Sequence[str], None] = 'f4c9b1d2a635'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        # Keyset (created_at DESC, id DESC) cho /admin/users; thay luôn index 1 cột created_at (KPI new_users_24h).
+        op.create_index(
+            'ix_users_created_id',
+            'users',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_users_created_at', table_name='users', postgresql_concurrently=True, if_exists=True)
+        # Tìm theo tiền tố email / tên (ILIKE 'abc%').
+        for column in ('email', 'name'):
+            op.create_index(
+                f'ix_users_{column}_trgm',
+                'users',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for column in ('email', 'name'):
+            op.drop_index(f'ix_users_{column}_trgm', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_users_created_at',
+            'users',
+            ['created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_users_created_id', table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,55 @@
+"""backfill_created_at_not_null
+
+Revision ID: b5e2c8a1f473
+Revises: a8e3d5c7f190
+Create Date: 2026-10-17 23:05:12.408115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2c8a1f473'
+down_revision: Union[str, Sequence[str], None] = 'a8e3d5c7f190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # created_at là 1 phần khóa keyset (cursor) của danh sách giao dịch và /admin/users:
+    # dòng NULL làm encode cursor lỗi 500 và bị so sánh tuple bỏ qua -> backfill rồi NOT NULL.
+    # Giao dịch: đầu ngày của chính giao dịch (vẫn đúng thứ tự theo date).
+    op.execute(
+        "UPDATE transactions SET created_at = date::timestamp AT TIME ZONE 'UTC' WHERE created_at IS NULL"
+    )
+    # User không rõ ngày đăng ký: coi như cũ nhất; cộng vào daily_signups để xóa user sau này vẫn trừ khớp.
+    op.execute(
+        """
+        WITH fallback AS (
+            SELECT COALESCE(min(created_at), now()) AS ts FROM users
+        ), filled AS (
+            UPDATE users SET created_at = fallback.ts FROM fallback
+            WHERE users.created_at IS NULL
+            RETURNING users.created_at
+        )
+        INSERT INTO daily_signups (date, count)
+        SELECT (created_at AT TIME ZONE 'UTC')::date, count(*) FROM filled GROUP BY 1
+        ON CONFLICT (date) DO UPDATE SET count = daily_signups.count + EXCLUDED.count
+        """
+    )
+    op.alter_column('transactions', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=False,
+                    existing_server_default=sa.text('now()'))
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=False,
+                    existing_server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=True,
+                    existing_server_default=sa.text('now()'))
+    op.alter_column('transactions', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=True,
+                    existing_server_default=sa.text('now()'))
@@ -0,0 +1,50 @@
+"""add_transaction_dedupe_key_index
+
+Revision ID: c3f8a2d4e915
+Revises: b7d3f0e1c254
+Create Date: 2026-10-17 16:48:03.271904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d4e915'
+down_revision: Union[str, Sequence[str], None] = 'b7d3f0e1c254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Phải giữ đúng biểu thức của models.transaction_model.dedupe_key_expression để planner dùng được index.
+DEDUPE_KEY = (
+    "md5(CAST(user_id AS TEXT) || '|' || CAST(date - DATE '2000-01-01' AS TEXT) || '|' "
+    "|| CAST(amount AS TEXT) || '|' || coalesce(note, ''))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Import sao kê tra trùng theo (user_id, date, amount, note) qua khóa md5 -> hash index.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_dedupe_key',
+            'transactions',
+            [sa.text(DEDUPE_KEY)],
+            unique=False,
+            postgresql_using='hash',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_dedupe_key',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
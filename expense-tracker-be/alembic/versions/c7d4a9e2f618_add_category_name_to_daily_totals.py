@@ -0,0 +1,62 @@
+"""add_category_name_to_daily_totals
+
+Revision ID: c7d4a9e2f618
+Revises: b5e2c8a1f473
+Create Date: 2026-10-18 09:41:27.301544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4a9e2f618'
+down_revision: Union[str, Sequence[str], None] = 'b5e2c8a1f473'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild(with_category_name: bool) -> None:
+    # Dựng lại rollup từ transactions theo khóa mới (cùng logic với crud_daily_total.rebuild_daily_totals).
+    name_column = ", category_name" if with_category_name else ""
+    name_value = ", COALESCE(category_name, '')" if with_category_name else ""
+    op.execute("DELETE FROM user_daily_totals")
+    op.execute(
+        f"""
+        INSERT INTO user_daily_totals (user_id, date, type, category_id{name_column}, total_amount, transaction_count)
+        SELECT user_id, date, type, category_id{name_value}, SUM(amount), COUNT(id)
+        FROM transactions
+        GROUP BY user_id, date, type, category_id{name_value}
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Breakdown/Analytics nhóm theo tên danh mục lưu trên giao dịch (Transaction.category_name),
+    # không theo Category.name hiện tại -> rollup phải giữ snapshot tên này trong khóa.
+    op.add_column(
+        'user_daily_totals',
+        sa.Column('category_name', sa.String(length=255), server_default='', nullable=False),
+    )
+    op.drop_constraint('user_daily_totals_pkey', 'user_daily_totals', type_='primary')
+    op.create_primary_key(
+        'user_daily_totals_pkey',
+        'user_daily_totals',
+        ['user_id', 'date', 'type', 'category_id', 'category_name'],
+    )
+    _rebuild(with_category_name=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('user_daily_totals_pkey', 'user_daily_totals', type_='primary')
+    _rebuild(with_category_name=False)
+    op.drop_column('user_daily_totals', 'category_name')
+    op.create_primary_key(
+        'user_daily_totals_pkey',
+        'user_daily_totals',
+        ['user_id', 'date', 'type', 'category_id'],
+    )
@@ -0,0 +1,104 @@
+"""partition_audit_logs_by_month
+
+Revision ID: d6b2e8f1a437
+Revises: c3f8a2d4e915
+Create Date: 2026-10-17 18:02:41.553120
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b2e8f1a437'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a2d4e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3  # Tạo sẵn partition cho vài tháng tới; sau đó job audit.maintain_partitions lo tiếp
+COLUMNS = "id, action, actor_email, target, status, details, ip_address, created_at"
+INDEXES = {
+    'ix_audit_logs_created_id': ['created_at DESC', 'id DESC'],
+    'ix_audit_logs_actor_created_id': ['actor_email', 'created_at DESC', 'id DESC'],
+    'ix_audit_logs_action_created_id': ['action', 'created_at DESC', 'id DESC'],
+    'ix_audit_logs_status_created_id': ['status', 'created_at DESC', 'id DESC'],
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_month_partition(month: date) -> None:
+    # Cùng quy ước tên với cruds.crud_audit.audit_partition_name.
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS audit_logs_p{month:%Y_%m} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table('audit_logs', 'audit_logs_legacy')
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey")
+
+    # Khóa phân vùng phải nằm trong primary key -> PK (id, created_at), created_at NOT NULL.
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id UUID NOT NULL,
+            action VARCHAR(50) NOT NULL,
+            actor_email VARCHAR(255) NOT NULL,
+            target VARCHAR(255),
+            status VARCHAR(20),
+            details TEXT,
+            ip_address VARCHAR(50),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    oldest = op.get_bind().scalar(sa.text("SELECT min(created_at) FROM audit_logs_legacy"))
+    month = min(oldest.astimezone(timezone.utc).date().replace(day=1), this_month) if oldest else this_month
+    while month <= _add_months(this_month, PARTITIONS_AHEAD):
+        _create_month_partition(month)
+        month = _add_months(month, 1)
+    # Lưới an toàn khi job tạo partition không chạy: dòng ngoài mọi khoảng vẫn ghi được.
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.execute(
+        f"INSERT INTO audit_logs ({COLUMNS}) "
+        f"SELECT id, action, actor_email, target, status, details, ip_address, coalesce(created_at, now()) "
+        f"FROM audit_logs_legacy"
+    )
+    op.drop_table('audit_logs_legacy')
+
+    # Index trên bảng cha tự tạo trên mọi partition (kể cả partition tạo sau này).
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'audit_logs', [sa.text(column) for column in columns], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('audit_logs', 'audit_logs_partitioned')
+    op.create_table('audit_logs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('action', sa.String(length=50), nullable=False),
+    sa.Column('actor_email', sa.String(length=255), nullable=False),
+    sa.Column('target', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id', name='audit_logs_plain_pkey')
+    )
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned")
+    # DROP bảng cha xóa luôn mọi partition và index của nó.
+    op.drop_table('audit_logs_partitioned')
+    op.execute("ALTER TABLE audit_logs RENAME CONSTRAINT audit_logs_plain_pkey TO audit_logs_pkey")
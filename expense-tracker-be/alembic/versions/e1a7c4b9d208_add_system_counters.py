@@ -0,0 +1,44 @@
+"""add_system_counters
+
+Revision ID: e1a7c4b9d208
+Revises: d6b2e8f1a437
+Create Date: 2026-10-17 19:10:27.804516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c4b9d208'
+down_revision: Union[str, Sequence[str], None] = 'd6b2e8f1a437'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('system_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('value', sa.Numeric(precision=20, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'shard')
+    )
+    # Giá trị ban đầu vào shard 0; sau đó mọi thao tác ghi cộng delta (cruds/crud_system_counter.py).
+    op.execute(
+        """
+        INSERT INTO system_counters (name, shard, value)
+        SELECT 'users', 0, count(*) FROM users
+        UNION ALL SELECT 'users_2fa', 0, count(*) FROM users WHERE is_2fa_enabled
+        UNION ALL SELECT 'transactions', 0, count(*) FROM transactions
+        UNION ALL SELECT 'income_total', 0, coalesce(sum(amount), 0) FROM transactions WHERE type = 'income'
+        UNION ALL SELECT 'expense_total', 0, coalesce(sum(amount), 0) FROM transactions WHERE type = 'expense'
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('system_counters')
@@ -0,0 +1,59 @@
+"""add_daily_signups_rollup
+
+Revision ID: f4c9b1d2a635
+Revises: e1a7c4b9d208
+Create Date: 2026-10-17 19:48:12.390417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c9b1d2a635'
+down_revision: Union[str, Sequence[str], None] = 'e1a7c4b9d208'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_signups',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('date')
+    )
+    # Backfill 1 lần từ users; sau đó crud_user.create_user / xóa user tự cập nhật rollup.
+    op.execute(
+        """
+        INSERT INTO daily_signups (date, count)
+        SELECT (created_at AT TIME ZONE 'UTC')::date, count(*)
+        FROM users
+        WHERE created_at IS NOT NULL
+        GROUP BY 1
+        """
+    )
+    # KPI new_users_24h lọc users theo created_at -> index thay cho quét cả bảng.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at',
+            'users',
+            ['created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_created_at',
+            table_name='users',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_table('daily_signups')
@@ -0,0 +1,25 @@
+import argparse
+import uuid
+
+from db.database import SessionLocal
+from cruds.crud_daily_total import rebuild_daily_totals
+
+
+def backfill_daily_totals(user_id: str = None):
+    """Dựng lại bảng rollup user_daily_totals từ bảng transactions (toàn bộ hoặc 1 user)."""
+    target_user = uuid.UUID(user_id) if user_id else None
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_totals(db, user_id=target_user)
+        scope = f"user {target_user}" if target_user else "all users"
+        print(f"Rebuilt user_daily_totals for {scope}: {rows} rows.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the user_daily_totals rollup from transactions.")
+    parser.add_argument("--user-id", help="Only rebuild rows for this user UUID.")
+    args = parser.parse_args()
+    backfill_daily_totals(args.user_id)
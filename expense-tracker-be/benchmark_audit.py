@@ -0,0 +1,67 @@
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from benchmark_transaction_indexes import _require_local_env
+from cruds import crud_audit
+from db.database import SessionLocal, engine
+from models import audit_model
+from services.audit_sink import audit_sink
+
+BENCH_ACTOR = "audit-bench@bench.local"
+
+
+def legacy_create_audit_log(db, **fields):
+    """Cách cũ: add + commit + refresh trên session của request cho mỗi sự kiện."""
+    log = audit_model.AuditLog(**fields)
+    db.add(log)
+    db.commit()
+    db.refresh(log)
+    return log
+
+
+def _measure(emit, events: int):
+    timings = []
+    for i in range(events):
+        started = time.perf_counter()
+        emit(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1], sum(timings)
+
+
+def run(events: int):
+    _require_local_env()
+    db = SessionLocal()
+    try:
+        legacy = _measure(
+            lambda i: legacy_create_audit_log(db, action="BENCH", actor_email=BENCH_ACTOR, target=str(i),
+                                              status="SUCCESS"),
+            events,
+        )
+        audit_sink.start()
+        sink = _measure(
+            lambda i: crud_audit.create_audit_log(db, action="BENCH", actor_email=BENCH_ACTOR, target=str(i)),
+            events,
+        )
+        started = time.perf_counter()
+        audit_sink.stop(timeout=60)
+        drain_ms = (time.perf_counter() - started) * 1000
+
+        print(f"{'audit write':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'total (ms)':>12}  ({events} events)")
+        print(f"{'legacy':>12}{legacy[0]:>10.3f}{legacy[1]:>10.3f}{legacy[2]:>12.1f}")
+        print(f"{'sink':>12}{sink[0]:>10.3f}{sink[1]:>10.3f}{sink[2]:>12.1f}  (+{drain_ms:.1f} ms drain on shutdown)")
+        print(f"sink stats: {audit_sink.stats}")
+    finally:
+        db.close()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM audit_logs WHERE actor_email = :actor"), {"actor": BENCH_ACTOR})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-event audit commits with the batched audit sink.")
+    parser.add_argument("--events", type=int, default=5000, help="Audit events written per version.")
+    args = parser.parse_args()
+    run(args.events)
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import statistics
+import time
+from unittest import mock
+
+import anyio
+import httpx
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from benchmark_transaction_indexes import _require_local_env, cleanup, seed
+from db.database import SessionLocal
+from main import app
+from models import user_model
+from services import chat_service
+from services.auth_token_db import get_current_user_db
+
+
+class SlowFakeLLM(FakeListChatModel):
+    """LLM giả: ngủ `latency` giây (giống 1 lần gọi Gemini qua HTTP đồng bộ) rồi trả lời, không gọi tool."""
+    latency: float = 1.0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        # AgentExecutor gọi LLM qua stream -> cũng phải chịu độ trễ.
+        time.sleep(self.latency)
+        yield from super()._stream(*args, **kwargs)
+
+
+async def _run_inline(fn, *args, limiter=None):
+    """Cách chạy cũ: agent.invoke() ngay trên event loop."""
+    return fn(*args)
+
+
+async def _fire(client, concurrency: int, label: str):
+    async def _one(i):
+        started = time.perf_counter()
+        resp = await client.post("/chat/send", json={"message": f"xin chào {label} #{i}", "history": []})
+        resp.raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(_one(i) for i in range(concurrency)))
+    return time.perf_counter() - started, statistics.median(latencies)
+
+
+async def _bench(user, concurrency: int):
+    app.dependency_overrides[get_current_user_db] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with mock.patch.object(anyio.to_thread, "run_sync", _run_inline):
+            inline_wall, inline_p50 = await _fire(client, concurrency, "inline")
+        offload_wall, offload_p50 = await _fire(client, concurrency, "offload")
+    app.dependency_overrides.pop(get_current_user_db, None)
+    return (inline_wall, inline_p50), (offload_wall, offload_p50)
+
+
+def run(concurrency: int, llm_latency: float):
+    _require_local_env()
+    user_id = seed(0, 1)
+    try:
+        db = SessionLocal()
+        try:
+            user = db.get(user_model.User, user_id)
+            db.expunge(user)
+        finally:
+            db.close()
+
+        fake_llm = SlowFakeLLM(responses=["Xin chào! (benchmark)"], latency=llm_latency)
+        with mock.patch.object(chat_service, "ChatGoogleGenerativeAI", lambda **kwargs: fake_llm):
+            inline, offload = asyncio.run(_bench(user, concurrency))
+
+        print(f"{concurrency} concurrent /chat/send, stub LLM latency {llm_latency}s, "
+              f"CHAT_MAX_CONCURRENCY={chat_service.settings.CHAT_MAX_CONCURRENCY}")
+        print(f"{'mode':>10}{'wall (s)':>12}{'p50 (s)':>12}")
+        print(f"{'inline':>10}{inline[0]:>12.2f}{inline[1]:>12.2f}")
+        print(f"{'offload':>10}{offload[0]:>12.2f}{offload[1]:>12.2f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show that concurrent /chat/send calls no longer serialize on the event loop (stubbed LLM)."
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel /chat/send requests per mode.")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds the stub LLM sleeps per call.")
+    args = parser.parse_args()
+    run(args.concurrency, args.llm_latency)
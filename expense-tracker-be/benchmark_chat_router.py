@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from unittest import mock
+
+from benchmark_transaction_indexes import _require_local_env, cleanup, seed
+from db.database import SessionLocal
+from models import user_model
+from services import chat_service
+from services.chat_intent import route_message
+
+# Các câu hay gặp trong log chatbot (cả câu router xử lý được lẫn câu phải nhờ LLM).
+CORPUS = [
+    "số dư", "balance", "tôi còn bao nhiêu tiền", "xem 5 giao dịch cuối", "lịch sử giao dịch",
+    "last 10 transactions", "tháng này tiêu bao nhiêu", "hôm qua chi tiêu hết bao nhiêu",
+    "how much did I spend this month", "thống kê tháng trước", "biểu đồ tháng này",
+    "đặt ngân sách tháng này 5tr", "set budget 10tr", "how much did I spend last week",
+    "vừa ăn sáng 30k", "nhận lương 15tr", "tôi tiêu thế này có ổn không?", "hôm qua tiêu gì",
+    "ăn sáng 30k và cafe 20k",
+]
+
+# Router phải nhận ra các câu này (mốc thời gian có "last" không bị tính là từ khóa get_history;
+# lệnh đặt ngân sách rõ ràng chỉ được hỏi xác nhận, chưa ghi).
+ROUTER_POSITIVE_CASES = [
+    ("how much did I spend last week", "get_statistics"), ("how much did I spend last month", "get_statistics"),
+    ("tháng trước tiêu bao nhiêu", "get_statistics"), ("last 10 transactions", "get_history"),
+    ("đặt ngân sách tháng này 5tr", "set_budget"), ("set budget to 10tr", "set_budget"),
+]
+
+# Router KHÔNG được tự trả lời các câu này (câu hỏi về ngân sách, lệnh ghi, câu hỏi theo danh mục) -> phải đi qua LLM.
+ROUTER_NEGATIVE_CASES = [
+    "đặt ngân sách tháng sau 5tr", "đặt ngân sách ăn uống 2tr",
+    "ngân sách tháng 5 là bao nhiêu?", "What was my budget in 2024?", "budget for 3 people",
+    "tôi có vượt ngân sách 5tr không", "ngân sách 10tr có đủ không?", "is my budget of 5m enough",
+    "how much did I spend on food this month", "tháng này tiêu cafe bao nhiêu", "grab tháng này bao nhiêu",
+]
+
+
+def check_router() -> list:
+    """Kiểm tra offline (không DB): ROUTER_POSITIVE_CASES ra đúng tool, ROUTER_NEGATIVE_CASES đều trả về None."""
+    failures = []
+    for message, tool in ROUTER_POSITIVE_CASES:
+        intent = route_message(message)
+        if intent is None or intent["tool"] != tool:
+            failures.append(message)
+            print(f"  FAIL expected {tool}: {message!r} -> {intent}")
+    for message in ROUTER_NEGATIVE_CASES:
+        intent = route_message(message)
+        if intent is not None:
+            failures.append(message)
+            print(f"  FAIL routed without LLM: {message!r} -> {intent['tool']} {intent['args']}")
+    total = len(ROUTER_POSITIVE_CASES) + len(ROUTER_NEGATIVE_CASES)
+    print(f"router cases: {total - len(failures)}/{total} passed")
+    return failures
+
+
+def _stub_agent(latency: float, calls: list):
+    """LLM giả: ngủ `latency` giây như 1 lượt gọi Gemini + tool."""
+    def _run_agent(user_id, user_message, history):
+        calls.append(user_message)
+        time.sleep(latency)
+        return "stub answer", []
+
+    return _run_agent
+
+
+async def _measure(user, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        for message in CORPUS:
+            started = time.perf_counter()
+            await chat_service.process_chat_message(user, message, [])
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), timings
+
+
+def run(rows: int, rounds: int, llm_latency: float):
+    _require_local_env()
+    user_id = seed(rows, 1)
+    try:
+        db = SessionLocal()
+        try:
+            user = db.get(user_model.User, user_id)
+            db.expunge(user)
+        finally:
+            db.close()
+
+        legacy_calls, router_calls = [], []
+        # Tắt chat cache để chỉ đo router (mỗi câu đều đọc DB hoặc gọi LLM thật sự).
+        with mock.patch.object(chat_service, "get_data_versions", mock.AsyncMock(return_value=None)):
+            with mock.patch.object(chat_service, "_run_agent", _stub_agent(llm_latency, legacy_calls)), \
+                    mock.patch.object(chat_service, "route_message", lambda message, history: None):
+                legacy_p50, _ = asyncio.run(_measure(user, rounds))
+            with mock.patch.object(chat_service, "_run_agent", _stub_agent(llm_latency, router_calls)):
+                router_p50, timings = asyncio.run(_measure(user, rounds))
+
+        routed = [t for t, message in zip(timings, CORPUS * rounds) if message not in router_calls]
+        print(f"{len(CORPUS)} messages x {rounds} rounds, {rows} transactions, stub LLM latency {llm_latency}s")
+        print(f"routed without LLM: {len(CORPUS) - len(set(router_calls))}/{len(CORPUS)} messages "
+              f"(LLM calls {len(legacy_calls)} -> {len(router_calls)})")
+        print(f"{'version':>10}{'p50 (ms)':>12}")
+        print(f"{'llm-only':>10}{legacy_p50:>12.1f}")
+        print(f"{'router':>10}{router_p50:>12.1f}")
+        if routed:
+            print(f"fast path p50: {statistics.median(routed):.1f} ms")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chat latency with and without the fast-path intent router.")
+    parser.add_argument("--rows", type=int, default=10_000, help="Transactions seeded for the benchmark user.")
+    parser.add_argument("--rounds", type=int, default=3, help="Times the message corpus is replayed.")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Seconds the stub LLM sleeps per call.")
+    parser.add_argument("--check-only", action="store_true",
+                        help="Only run the offline router cases (no DB), exit non-zero on a failure.")
+    args = parser.parse_args()
+    if check_router() and args.check_only:
+        sys.exit(1)
+    if not args.check_only:
+        run(args.rows, args.rounds, args.llm_latency)
@@ -0,0 +1,82 @@
+import argparse
+import statistics
+import time
+
+from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from benchmark_transaction_indexes import _require_local_env, cleanup, seed
+from core import cache
+from core.config import settings
+from cruds.crud_category import get_user_category_names_string
+from db.database import SessionLocal
+from models import user_model
+from services import chat_service
+from services.chat_tools import get_finbot_tools
+
+
+def legacy_prepare_agent(db, user):
+    """Phần chuẩn bị cũ của process_chat_message (mỗi request dựng lại tất cả) giữ lại để so sánh."""
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite",
+        temperature=0,
+        google_api_key=settings.google_genai_api_key
+    )
+    tools = get_finbot_tools(db, user)
+    category_context = get_user_category_names_string(db, user.id)
+    system_prompt = chat_service.SYSTEM_TEMPLATE.format(
+        admin_instructions=chat_service.ADMIN_INSTRUCTIONS if user.is_admin else ""
+    ).replace("{categories}", category_context)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}"),
+    ])
+    agent = create_tool_calling_agent(llm, tools, prompt)
+    return AgentExecutor(agent=agent, tools=tools, verbose=False), category_context
+
+
+def _measure(fn, user_id, iterations: int):
+    timings = []
+    db = SessionLocal()
+    try:
+        user = db.get(user_model.User, user_id)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn(db, user)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(iterations: int):
+    _require_local_env()
+    # Chỉ dựng client, không gọi mạng -> key giả là đủ khi máy bench không có key thật.
+    if not settings.google_genai_api_key:
+        settings.GOOGLE_API_KEY = "benchmark-offline-key"
+    cache.init_redis()
+    if cache.get_data_versions_sync("probe") is None:
+        print("⚠️ Redis unavailable: category context is not cached, numbers include the category query.")
+
+    user_id = seed(0, 1)
+    try:
+        # Warm-up: dựng LLM/agent dùng chung + điền cache danh mục.
+        _measure(chat_service._prepare_agent, user_id, 1)
+        legacy_p50, legacy_p95 = _measure(legacy_prepare_agent, user_id, iterations)
+        shared_p50, shared_p95 = _measure(chat_service._prepare_agent, user_id, iterations)
+        print(f"{'setup':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}  ({iterations} requests)")
+        print(f"{'legacy':>10}{legacy_p50:>12.2f}{legacy_p95:>12.2f}")
+        print(f"{'shared':>10}{shared_p50:>12.2f}{shared_p95:>12.2f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-request chatbot agent setup cost (no LLM calls).")
+    parser.add_argument("--iterations", type=int, default=200, help="Setups measured per version.")
+    args = parser.parse_args()
+    run(args.iterations)
@@ -0,0 +1,113 @@
+import argparse
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import event, func
+
+from benchmark_transaction_indexes import _require_local_env, cleanup, seed
+from cruds import crud_summary
+from db.database import SessionLocal, engine
+from models import transaction_model, user_model
+
+
+def _legacy_daily_chart(db, user_id, txn_type: str):
+    txn = transaction_model.Transaction
+    return (
+        db.query(txn.date, func.sum(txn.amount).label("total"))
+        .filter(txn.user_id == user_id, txn.type == txn_type)
+        .group_by(txn.date)
+        .order_by(txn.date.desc())
+        .limit(30)
+        .all()
+    )
+
+
+def legacy_dashboard_data(db, user_id):
+    """
+    Bản get_dashboard_data cũ giữ lại để so sánh: 8 round trip, mọi phép tổng hợp
+    quét thẳng bảng transactions (trước khi có rollup user_daily_totals).
+    """
+    txn = transaction_model.Transaction
+    user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
+    totals = {
+        txn_type: db.query(func.coalesce(func.sum(txn.amount), 0))
+        .filter(txn.user_id == user_id, txn.type == txn_type)
+        .scalar()
+        for txn_type in ("income", "expense")
+    }
+    recent_transactions = (
+        db.query(txn)
+        .filter(txn.user_id == user_id)
+        .order_by(txn.date.desc(), txn.created_at.desc())
+        .limit(10)
+        .all()
+    )
+    income_chart = _legacy_daily_chart(db, user_id, "income")
+    expense_chart = _legacy_daily_chart(db, user_id, "expense")
+
+    # get_monthly_budget_status cũ: đọc lại user + SUM chi tiêu tháng này trên transactions.
+    today = date.today()
+    month_start, next_month_start = crud_summary._month_bounds(today.year, today.month)
+    budget_user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
+    spent_this_month = (
+        db.query(func.coalesce(func.sum(txn.amount), 0))
+        .filter(
+            txn.user_id == user_id,
+            txn.type == "expense",
+            txn.date >= month_start,
+            txn.date < next_month_start,
+        )
+        .scalar()
+    )
+    return user, totals, recent_transactions, income_chart, expense_chart, budget_user, spent_this_month
+
+
+def _add_simulated_rtt(rtt_ms: float):
+    """Mô phỏng độ trễ mạng tới Postgres trên cloud: ngủ rtt_ms trước mỗi round trip."""
+    def _sleep(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(rtt_ms / 1000)
+
+    event.listen(engine, "before_cursor_execute", _sleep)
+
+
+def _measure(fn, user_id, iterations: int):
+    timings = []
+    for _ in range(iterations):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            fn(db, user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return statistics.median(timings), max(timings)
+
+
+def run(sizes, iterations: int, rtt_ms: float):
+    _require_local_env()
+    if rtt_ms:
+        _add_simulated_rtt(rtt_ms)
+
+    print(f"{'rows/user':>10}{'legacy p50':>14}{'legacy max':>14}{'cte p50':>12}{'cte max':>12}  (ms, rtt={rtt_ms}ms)")
+    for rows in sizes:
+        user_id = seed(rows, 1)
+        try:
+            # Warm-up 1 lần để pool/cache plan không làm lệch lần đo đầu.
+            _measure(crud_summary.get_dashboard_data, user_id, 1)
+            legacy_p50, legacy_max = _measure(legacy_dashboard_data, user_id, iterations)
+            cte_p50, cte_max = _measure(crud_summary.get_dashboard_data, user_id, iterations)
+            print(f"{rows:>10}{legacy_p50:>14.1f}{legacy_max:>14.1f}{cte_p50:>12.1f}{cte_max:>12.1f}")
+        finally:
+            cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare legacy vs single-statement dashboard latency.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Transactions per user for each run.")
+    parser.add_argument("--iterations", type=int, default=20, help="Dashboard loads per size and version.")
+    parser.add_argument("--rtt-ms", type=float, default=20.0,
+                        help="Simulated network round trip added before every statement (0 to disable).")
+    args = parser.parse_args()
+    run(args.sizes, args.iterations, args.rtt_ms)
@@ -0,0 +1,101 @@
+import argparse
+import datetime
+import statistics
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from services.firebase_token_verifier import ID_TOKEN_ISSUER_PREFIX, FirebaseTokenVerifier
+
+PROJECT_ID = "bench-project"
+
+
+class LocalKey:
+    """Cặp khóa RSA + chứng chỉ tự ký, đóng vai khóa ký của Firebase."""
+
+    def __init__(self, kid: str):
+        self.kid = kid
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(private_key, hashes.SHA256())
+        )
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+        key_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        self.signer = crypt.RSASigner.from_string(key_pem, key_id=kid)
+
+    def token(self, uid: str = "uid-1", ttl: int = 3600, **overrides) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": ID_TOKEN_ISSUER_PREFIX + PROJECT_ID, "aud": PROJECT_ID, "sub": uid,
+            "iat": now - 10, "exp": now + ttl, "email": f"{uid}@bench.local",
+        }
+        payload.update(overrides)
+        return google_jwt.encode(self.signer, payload).decode()
+
+
+class FakeCertEndpoint:
+    """Thay cho endpoint chứng chỉ của Google: đếm số lần tải + giả lập độ trễ mạng."""
+
+    def __init__(self, keys, latency: float, max_age: int = 3600):
+        self.keys = list(keys)
+        self.latency = latency
+        self.max_age = max_age
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.latency)
+        return {key.kid: key.cert_pem for key in self.keys}, self.max_age
+
+
+def _verifier(endpoint, **kwargs) -> FirebaseTokenVerifier:
+    return FirebaseTokenVerifier(cache_size=1000, refresh_margin=300, retry_interval=30,
+                                 fetch_certs=endpoint, project_id=PROJECT_ID, **kwargs)
+
+
+def run_timings(logins: int, latency: float) -> None:
+    key = LocalKey("key-1")
+    tokens = [key.token(uid=f"uid-{i}") for i in range(logins)]
+
+    def timed(fn):
+        started = time.perf_counter()
+        fn()
+        return (time.perf_counter() - started) * 1000
+
+    cold = _verifier(FakeCertEndpoint([key], latency))
+    cold_ms = timed(lambda: cold.verify(tokens[0]))
+
+    prefetched = _verifier(FakeCertEndpoint([key], latency))
+    prefetched.refresh_certs()  # Việc main.lifespan -> start() làm ở nền lúc khởi động
+    first_ms = timed(lambda: prefetched.verify(tokens[0]))
+    distinct = [timed(lambda t=t: prefetched.verify(t)) for t in tokens[1:]]
+    repeated = [timed(lambda t=t: prefetched.verify(t)) for t in tokens]
+
+    print(f"{'first login, cold certs':>30}: {cold_ms:8.2f} ms  (cert fetch latency {latency * 1000:.0f} ms)")
+    print(f"{'first login, prefetched certs':>30}: {first_ms:8.2f} ms")
+    print(f"{'new token (signature check)':>30}: {statistics.median(distinct):8.3f} ms p50")
+    print(f"{'repeated token (cache hit)':>30}: {statistics.median(repeated):8.3f} ms p50")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency of the Firebase ID token verifier, using a local key pair in place of Firebase. "
+                    "Behaviour checks live in tests/test_firebase_tokens.py."
+    )
+    parser.add_argument("--logins", type=int, default=200, help="Distinct tokens verified in the timing run.")
+    parser.add_argument("--cert-latency", type=float, default=0.15, help="Simulated cert fetch latency (seconds).")
+    args = parser.parse_args()
+    run_timings(args.logins, args.cert_latency)
@@ -0,0 +1,82 @@
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmark_transaction_indexes import _require_local_env, cleanup, seed
+from cruds.crud_category import list_all_categories_for_user
+from cruds.crud_transaction import create_transaction
+from db.database import SessionLocal
+from services.import_service import import_statement, open_statement
+
+MERCHANTS = ["GRAB FOOD", "HIGHLANDS COFFEE", "UBER TRIP", "CIRCLE K", "EVN BILL", "NETFLIX", "SHOPEE", "CGV CINEMA"]
+
+
+def write_statement(path: str, lines: int):
+    """Sao kê CSV giả lập kiểu ngân hàng: ngày dd/mm/yyyy, số âm = chi, mã tham chiếu trong nội dung."""
+    rng = random.Random(42)
+    start = date.today() - timedelta(days=3 * 365)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Ngày giao dịch;Nội dung;Số tiền\n")
+        for i in range(lines):
+            txn_date = start + timedelta(days=rng.randrange(3 * 365))
+            if i % 40 == 0:
+                f.write(f"{txn_date:%d/%m/%Y};SALARY {i};{rng.randrange(10, 30) * 1_000_000:,}\n".replace(",", "."))
+            else:
+                merchant = rng.choice(MERCHANTS)
+                f.write(f"{txn_date:%d/%m/%Y};{merchant} {i};-{rng.randrange(10, 500) * 1000:,}\n".replace(",", "."))
+
+
+def run_import(user_id, path: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    last = None
+    with open(path, "rb") as source:
+        for event in import_statement(user_id, open_statement(source, "csv"), currency_code="VND"):
+            last = event
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, last.decode("utf-8").strip()
+
+
+def run_single_row(user_id, rows: int) -> float:
+    """Cách cũ: mỗi giao dịch 1 lần create_transaction (= POST /expenses) -> số dòng/giây."""
+    db = SessionLocal()
+    try:
+        category = list_all_categories_for_user(db, user_id, "expense")[0]
+        started = time.perf_counter()
+        for i in range(rows):
+            create_transaction(db, user_id, category.id, "expense", Decimal("10000"), note=f"single {i}")
+        return rows / (time.perf_counter() - started)
+    finally:
+        db.close()
+
+
+def run(lines: int, single_rows: int):
+    _require_local_env()
+    user_id = seed(0, 1)
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".csv") as tmp:
+            write_statement(tmp.name, lines)
+            elapsed, peak_mb, summary = run_import(user_id, tmp.name)
+            print(f"first import : {lines} lines in {elapsed:.1f}s ({lines / elapsed:,.0f} rows/s), "
+                  f"peak Python memory {peak_mb:.1f} MB")
+            print(f"  {summary}")
+            elapsed, peak_mb, summary = run_import(user_id, tmp.name)
+            print(f"re-import    : {elapsed:.1f}s, peak Python memory {peak_mb:.1f} MB (every row should be a duplicate)")
+            print(f"  {summary}")
+        print(f"single-row inserts: {run_single_row(user_id, single_rows):,.0f} rows/s ({single_rows} rows)")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming CSV statement import.")
+    parser.add_argument("--lines", type=int, default=200_000, help="Lines in the generated statement.")
+    parser.add_argument("--single-rows", type=int, default=2000, help="Rows inserted one by one for comparison.")
+    args = parser.parse_args()
+    run(args.lines, args.single_rows)
@@ -0,0 +1,117 @@
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, text
+
+from benchmark_dashboard import _add_simulated_rtt
+from benchmark_transaction_indexes import BENCH_EMAIL_DOMAIN, _require_local_env, cleanup
+from cruds import crud_user
+from db.database import SessionLocal, engine
+from services import auth_service
+
+_statements = threading.local()
+
+
+def legacy_sync_firebase_user(db, decoded_token: dict):
+    """Bản sync_firebase_user cũ (SELECT + commit/refresh cập nhật profile + commit/refresh session key)."""
+    uid = decoded_token.get("uid")
+    email = decoded_token.get("email")
+    name = decoded_token.get("name")
+    picture = decoded_token.get("picture")
+    is_verified_firebase = decoded_token.get("email_verified", False)
+
+    user = crud_user.get_user_by_firebase_uid(db, uid)
+    if not user:
+        user = crud_user.create_user(db, firebase_uid=uid, email=email, name=name, profile_image=picture)
+    else:
+        updated = False
+        if email and user.email != email: user.email = email; updated = True
+        if name and user.name != name: user.name = name; updated = True
+        if picture and user.profile_image != picture: user.profile_image = picture; updated = True
+        if user.is_email_verified != is_verified_firebase:
+            user.is_email_verified = is_verified_firebase
+            updated = True
+        if updated:
+            db.add(user); db.commit(); db.refresh(user)
+
+    user.last_session_key = str(uuid.uuid4())
+    db.add(user); db.commit(); db.refresh(user)
+    return user
+
+
+def new_sync_firebase_user(db, decoded_token: dict):
+    return auth_service.sync_firebase_user(db, decoded_token, None, None, None)
+
+
+def _count_statements(conn, cursor, statement, parameters, context, executemany):
+    _statements.count = getattr(_statements, "count", 0) + 1
+
+
+def _tokens(users: int, run: str):
+    """Token Firebase đã giải mã của `users` user benchmark; mỗi lần login đổi tên để có nhánh cập nhật profile."""
+    return [
+        {"uid": f"bench-{i}", "email": f"bench-login-{i}@{BENCH_EMAIL_DOMAIN}", "name": f"Login {run}",
+         "email_verified": True}
+        for i in range(users)
+    ]
+
+
+def _spike(sync, tokens, clients: int):
+    """Mọi user login cùng lúc qua `clients` worker -> (p50 ms, p99 ms, logins/s, câu SQL mỗi login)."""
+    def login(token):
+        _statements.count = 0
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            sync(db, token)
+            return (time.perf_counter() - started) * 1000, _statements.count
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(login, tokens))
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(ms for ms, _ in results)
+    statements = statistics.mean(count for _, count in results)
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1], len(tokens) / elapsed, statements
+
+
+def run(users: int, clients: int, rtt_ms: float):
+    _require_local_env()
+    if rtt_ms:
+        _add_simulated_rtt(rtt_ms)
+    event.listen(engine, "before_cursor_execute", _count_statements)
+
+    print(f"{users} users logging in at once, {clients} concurrent requests, rtt={rtt_ms}ms")
+    print(f"{'login sync':>22}{'p50 (ms)':>10}{'p99 (ms)':>10}{'logins/s':>10}{'SQL/login':>11}")
+    try:
+        for label, sync in (("legacy, first login", legacy_sync_firebase_user),
+                            ("legacy, returning", legacy_sync_firebase_user)):
+            p50, p99, rate, statements = _spike(sync, _tokens(users, label), clients)
+            print(f"{label:>22}{p50:>10.1f}{p99:>10.1f}{rate:>10.1f}{statements:>11.1f}")
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE email LIKE :pattern"),
+                         {"pattern": f"bench-login-%@{BENCH_EMAIL_DOMAIN}"})
+        for label, sync in (("upsert, first login", new_sync_firebase_user),
+                            ("upsert, returning", new_sync_firebase_user)):
+            p50, p99, rate, statements = _spike(sync, _tokens(users, label), clients)
+            print(f"{label:>22}{p50:>10.1f}{p99:>10.1f}{rate:>10.1f}{statements:>11.1f}")
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_statements)
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare legacy vs single-upsert Firebase login sync under a login spike.")
+    parser.add_argument("--users", type=int, default=500, help="Users logging in during the spike.")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent login requests (API threads).")
+    parser.add_argument("--rtt-ms", type=float, default=5.0,
+                        help="Simulated network round trip added before every statement (0 to disable).")
+    args = parser.parse_args()
+    run(args.users, args.clients, args.rtt_ms)
@@ -0,0 +1,80 @@
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from fastapi import HTTPException
+
+from core.config import settings
+from core.security import get_password_hash, verify_password
+from services.password_hasher import PasswordHasher
+
+BENCH_PASSWORD = "correct horse battery staple"
+
+
+def _run_logins(verify, logins: int, clients: int):
+    """`clients` thread giả lập request login song song -> (số login/s, p50 ms, p99 ms, số lần 429)."""
+    timings, rejected = [], [0]
+    lock = threading.Lock()
+    remaining = iter(range(logins))
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                verify()
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    timings.append(elapsed)
+            except HTTPException:
+                with lock:
+                    rejected[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    p50 = statistics.median(timings) if timings else 0.0
+    p99 = timings[max(int(len(timings) * 0.99) - 1, 0)] if timings else 0.0
+    return len(timings) / elapsed, p50, p99, rejected[0]
+
+
+def run(logins: int, clients: int, rounds: int, max_queue: int):
+    cores = os.cpu_count() or 1
+    hashed = get_password_hash(BENCH_PASSWORD, rounds)
+    print(f"bcrypt cost {rounds}, {cores} CPU core(s), {clients} concurrent clients, {logins} logins per run")
+    print(f"{'mode':>22}{'logins/s':>10}{'per core':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'429s':>6}")
+
+    unbounded = _run_logins(lambda: verify_password(BENCH_PASSWORD, hashed), logins, clients)
+    print(f"{'unbounded (inline)':>22}{unbounded[0]:>10.1f}{unbounded[0] / cores:>10.1f}"
+          f"{unbounded[1]:>10.1f}{unbounded[2]:>10.1f}{unbounded[3]:>6}")
+
+    for workers in sorted({1, max(cores // 2, 1), cores}):
+        hasher = PasswordHasher(workers=workers, max_queue=max_queue, rounds=rounds, retry_after=1)
+        try:
+            result = _run_logins(lambda: hasher.verify(BENCH_PASSWORD, hashed), logins, clients)
+        finally:
+            hasher.shutdown()
+        label = f"pool {workers}w/q{max_queue}"
+        print(f"{label:>22}{result[0]:>10.1f}{result[0] / workers:>10.1f}"
+              f"{result[1]:>10.1f}{result[2]:>10.1f}{result[3]:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure bcrypt login throughput per core, inline vs the bounded pool.")
+    parser.add_argument("--logins", type=int, default=200, help="Password checks per run.")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent login requests.")
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS, help="bcrypt cost factor.")
+    parser.add_argument("--max-queue", type=int, default=settings.PASSWORD_HASH_MAX_QUEUE,
+                        help="Queued checks allowed beyond the pool size before 429.")
+    args = parser.parse_args()
+    run(args.logins, args.clients, args.rounds, args.max_queue)
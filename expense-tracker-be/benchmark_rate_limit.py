@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from core import cache
+from services.rate_limiter import RateLimitPolicy, RateLimiter
+
+
+def _redis_client(url: str):
+    """Redis thật nếu có --redis-url, ngược lại fakeredis (cần `pip install fakeredis lupa` để chạy Lua)."""
+    if url:
+        import redis.asyncio as redis
+
+        return redis.from_url(url, decode_responses=True)
+    import fakeredis
+
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def _policy(name="bench", per_minute=60, burst=5, per_ip=False):
+    return RateLimitPolicy(name, per_minute, burst, [("POST", "/expensive")], per_ip=per_ip)
+
+
+async def run_timings(requests: int, redis_url: str) -> None:
+    policy = _policy(f"timing-{uuid.uuid4().hex[:8]}", per_minute=10 ** 9, burst=10 ** 9)
+
+    async def timed(limiter):
+        timings = []
+        for i in range(requests):
+            started = time.perf_counter()
+            await limiter.hit(policy, f"user:{i % 100}")
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    cache.redis_client = _redis_client(redis_url)
+    redis_ms = await timed(RateLimiter([policy], 5))
+    cache.redis_client = None
+    local_ms = await timed(RateLimiter([policy], 5))
+    backend = "redis" if redis_url else "fakeredis"
+    print(f"{'Redis bucket (' + backend + ')':>26}: {redis_ms:8.3f} ms p50")
+    print(f"{'in-process fallback':>26}: {local_ms:8.3f} ms p50")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency of the token-bucket rate limiter (fakeredis by default, or a real Redis). "
+                    "Behaviour checks live in tests/test_rate_limit.py."
+    )
+    parser.add_argument("--redis-url", default="", help="Run against this Redis instead of fakeredis.")
+    parser.add_argument("--requests", type=int, default=2000, help="Bucket hits in the timing run.")
+    args = parser.parse_args()
+    asyncio.run(run_timings(args.requests, args.redis_url))
@@ -0,0 +1,183 @@
+import argparse
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event, text
+
+from cruds import crud_daily_total, crud_summary, crud_transaction
+from cruds.crud_category import seed_default_categories
+from db.database import SessionLocal, engine
+from models import transaction_model, user_model
+
+LOCAL_ENVIRONMENTS = {"local", "dev", "development"}
+BENCH_EMAIL_DOMAIN = "bench.local"
+BENCH_INDEXES = ("ix_transactions_user_type_date", "ix_transactions_user_date_created_id")
+
+SEED_SQL = text(
+    """
+    WITH u AS (
+        SELECT CAST(:user_ids AS uuid[]) AS ids
+    ), c AS (
+        SELECT array_agg(id ORDER BY id) AS ids,
+               array_agg(type ORDER BY id) AS types,
+               array_agg(name ORDER BY id) AS names,
+               count(*) AS n
+        FROM categories
+        WHERE user_id IS NULL
+    )
+    INSERT INTO transactions (id, user_id, category_id, type, amount, currency_code, category_name, note, date, created_at)
+    SELECT gen_random_uuid(),
+           u.ids[1 + g % array_length(u.ids, 1)],
+           c.ids[1 + (g / 7) % c.n],
+           c.types[1 + (g / 7) % c.n],
+           round((random() * 500 + 1)::numeric, 2),
+           'USD',
+           c.names[1 + (g / 7) % c.n],
+           'benchmark',
+           current_date - (random() * 1095)::int,
+           now() - random() * interval '1095 days'
+    FROM generate_series(1, :rows) AS g, u, c
+    """
+)
+
+
+def _require_local_env():
+    """Script seed dữ liệu và drop/create index -> chỉ cho chạy trên DB local."""
+    if os.getenv("APP_ENV", "").lower() not in LOCAL_ENVIRONMENTS:
+        raise SystemExit("Refusing to run benchmark unless APP_ENV is explicitly local/dev/development.")
+
+
+def seed(rows: int, users: int):
+    """Tạo `users` user benchmark và `rows` giao dịch chia đều cho họ. Trả về id của user đầu tiên."""
+    db = SessionLocal()
+    try:
+        seed_default_categories(db)
+        bench_users = [
+            user_model.User(email=f"bench-{uuid.uuid4().hex[:12]}@{BENCH_EMAIL_DOMAIN}", name="Index Benchmark")
+            for _ in range(users)
+        ]
+        db.add_all(bench_users)
+        db.flush()
+        user_ids = [str(u.id) for u in bench_users]
+
+        db.execute(SEED_SQL, {"user_ids": user_ids, "rows": rows})
+        db.commit()
+
+        # Chỉ dựng rollup cho user được đo để các query dashboard đọc đúng dữ liệu.
+        crud_daily_total.rebuild_daily_totals(db, user_id=bench_users[0].id)
+        return bench_users[0].id
+    finally:
+        db.close()
+
+
+def cleanup():
+    """Xóa user benchmark (FK ondelete CASCADE xóa luôn transactions + rollup)."""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": f"bench-%@{BENCH_EMAIL_DOMAIN}"})
+
+
+def set_indexes(enabled: bool):
+    """Bật/tắt các index của migration 5aad84633ae6/4c1e7b2a9d30 (định nghĩa lấy từ model, không lặp DDL)."""
+    indexes = [i for i in transaction_model.Transaction.__table__.indexes if i.name in BENCH_INDEXES]
+    with engine.begin() as conn:
+        for index in indexes:
+            if enabled:
+                index.create(bind=conn, checkfirst=True)
+            else:
+                index.drop(bind=conn, checkfirst=True)
+        conn.execute(text("ANALYZE transactions"))
+
+
+@contextmanager
+def capture_statements(captured: list):
+    """Ghi lại mọi câu SQL (kèm tham số đã bind) mà CRUD gửi xuống driver."""
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def collect_hot_queries(user_id):
+    """Chạy các hàm đọc nóng và trả về [(label, sql, params)] mà chúng thực sự sinh ra."""
+    calls = {
+        "dashboard": lambda db: crud_summary.get_dashboard_data(db, user_id),
+        "expense_by_category": lambda db: crud_summary.get_expense_by_category(db, user_id),
+        "monthly_summary": lambda db: crud_summary.get_monthly_summary(db, user_id, year=date.today().year),
+        "period_breakdown": lambda db: crud_summary.get_period_breakdown(
+            db, user_id, date.today().replace(day=1), date.today()
+        ),
+        "list_transactions": lambda db: crud_transaction.list_transactions_for_user(
+            db, user_id, limit=50, type_filter="expense"
+        ),
+    }
+
+    queries = []
+    for label, call in calls.items():
+        db = SessionLocal()
+        try:
+            with capture_statements([]) as captured:
+                call(db)
+        finally:
+            db.close()
+        for i, (statement, params) in enumerate(captured, start=1):
+            queries.append((f"{label}#{i}", statement, params))
+    return queries
+
+
+def explain(queries, repeat: int):
+    """EXPLAIN ANALYZE từng câu, lấy thời gian tốt nhất sau `repeat` lần."""
+    results = {}
+    with engine.connect() as conn:
+        for label, statement, params in queries:
+            best = None
+            node = None
+            for _ in range(repeat):
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, params
+                ).scalar()[0]
+                if best is None or plan["Execution Time"] < best:
+                    best = plan["Execution Time"]
+                    node = plan["Plan"]["Node Type"]
+            results[label] = (best, node)
+    return results
+
+
+def run(rows: int, users: int, repeat: int, keep: bool):
+    _require_local_env()
+
+    print(f"Seeding {rows} transactions across {users} users...")
+    user_id = seed(rows, users)
+    try:
+        queries = collect_hot_queries(user_id)
+
+        set_indexes(False)
+        before = explain(queries, repeat)
+        set_indexes(True)
+        after = explain(queries, repeat)
+
+        print(f"\n{'query':<26}{'before (ms)':>14}{'after (ms)':>14}  plan before -> after")
+        for label, _, _ in queries:
+            b_time, b_node = before[label]
+            a_time, a_node = after[label]
+            print(f"{label:<26}{b_time:>14.2f}{a_time:>14.2f}  {b_node} -> {a_node}")
+    finally:
+        if not keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Seed a local Postgres and compare EXPLAIN ANALYZE timings with/without the transaction indexes."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of transactions to seed.")
+    parser.add_argument("--users", type=int, default=20, help="Spread the rows across this many benchmark users.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the best time is reported.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded benchmark users and rows.")
+    args = parser.parse_args()
+    run(args.rows, args.users, args.repeat, args.keep)
@@ -6,7 +6,7 @@ celery_app = Celery(
     "expense_tracker",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["tasks.export_tasks"]
+    include=["tasks.export_tasks", "tasks.audit_tasks", "tasks.system_tasks"]
 )
 
 celery_app.conf.update(
@@ -15,4 +15,23 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="Asia/Ho_Chi_Minh",
     enable_utc=True,
-)
\ No newline at end of file
+    # Trạng thái job lưu ở bảng export_jobs -> không cần giữ result của Celery lâu.
+    task_ignore_result=True,
+    task_acks_late=True,  # Worker chết giữa chừng -> task được giao lại thay vì mất
+    worker_prefetch_multiplier=1,  # Export là task dài, không giữ sẵn nhiều task trong 1 worker
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    beat_schedule={
+        "purge-expired-exports": {
+            "task": "exports.purge_expired_exports",
+            "schedule": 15 * 60,
+        },
+        "maintain-audit-partitions": {
+            "task": "audit.maintain_partitions",
+            "schedule": 24 * 60 * 60,
+        },
+        "reconcile-system-counters": {
+            "task": "system.reconcile_counters",
+            "schedule": 60 * 60,
+        },
+    },
+)
@@ -1,10 +1,18 @@
 # core/cache.py
 
+import functools
+import hashlib
 import json
 import logging
-from typing import Optional, Any
+import threading
+from datetime import date
+from typing import Optional, Any, Tuple
 
 import redis.asyncio as redis
+from cachetools import TTLCache
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from redis import Redis as SyncRedis
 from redis.exceptions import RedisError
 
 from core.config import settings
@@ -15,13 +23,15 @@ logger = logging.getLogger(__name__)
 # ✅ REDIS CLIENT (Async + Connection Pool)
 # =========================================================
 redis_client: Optional[redis.Redis] = None
+# Client đồng bộ: chỉ dùng cho các thao tác nhỏ (invalidate) gọi từ code sync (CRUD, chat tools).
+sync_redis_client: Optional[SyncRedis] = None
 
 
 def init_redis():
     """
     Khởi tạo Redis connection (gọi ở startup)
     """
-    global redis_client
+    global redis_client, sync_redis_client
 
     try:
         redis_client = redis.from_url(
@@ -30,11 +40,19 @@ def init_redis():
             decode_responses=True,
             max_connections=10
         )
+        sync_redis_client = SyncRedis.from_url(
+            settings.REDIS_URL or "redis://localhost:6379/0",
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=10,
+            socket_timeout=1,
+        )
         logger.info("✅ Redis initialized")
 
     except Exception as e:
         logger.error(f"❌ Redis init failed: {e}")
         redis_client = None
+        sync_redis_client = None
 
 
 async def close_redis():
@@ -47,6 +65,9 @@ async def close_redis():
         await redis_client.close()
         logger.info("🔌 Redis connection closed")
 
+    if sync_redis_client:
+        sync_redis_client.close()
+
 
 # =========================================================
 # ✅ BASIC CACHE OPERATIONS
@@ -113,6 +134,237 @@ async def set_user_summary_cache(user_id: int, summary_data, ex: int = 3600):
     return await set_cached(key, summary_data, ex=ex)
 
 
+def get_cached_sync(key: str) -> Optional[Any]:
+    """
+    Bản đồng bộ của get_cached (dependency / code chạy trong threadpool)
+    """
+    if not sync_redis_client:
+        return None
+
+    try:
+        data = sync_redis_client.get(key)
+        return json.loads(data) if data else None
+
+    except (RedisError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ Redis GET error ({key}): {e}")
+        return None
+
+
+def set_cached_sync(key: str, value: Any, ex: int = 300) -> bool:
+    """
+    Bản đồng bộ của set_cached
+    """
+    if not sync_redis_client:
+        return False
+
+    try:
+        sync_redis_client.set(key, json.dumps(value), ex=ex)
+        return True
+
+    except (RedisError, TypeError) as e:
+        logger.warning(f"⚠️ Redis SET error ({key}): {e}")
+        return False
+
+
+def delete_cached_sync(key: str):
+    """
+    Xóa cache từ code đồng bộ (không có event loop)
+    """
+    if not sync_redis_client:
+        return
+
+    try:
+        sync_redis_client.delete(key)
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis DELETE error ({key}): {e}")
+
+
+# =========================================================
+# ✅ AUTH USER CACHE (Tầng 1: TTL-LRU trong process, Tầng 2: Redis)
+# =========================================================
+_local_auth_user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_LOCAL_CACHE_SIZE,
+    ttl=settings.AUTH_USER_LOCAL_CACHE_TTL_SECONDS,
+)
+_local_auth_user_lock = threading.Lock()
+
+
+def _auth_user_key(user_id) -> str:
+    return f"auth_user:{user_id}"
+
+
+async def get_auth_user_cache(user_id) -> Optional[dict]:
+    key = _auth_user_key(user_id)
+    with _local_auth_user_lock:
+        data = _local_auth_user_cache.get(key)
+    if data is not None:
+        return data
+
+    data = await get_cached(key)
+    if data is not None:
+        with _local_auth_user_lock:
+            _local_auth_user_cache[key] = data
+    return data
+
+
+async def set_auth_user_cache(user_id, user_data: dict, ex: int = None):
+    key = _auth_user_key(user_id)
+    with _local_auth_user_lock:
+        _local_auth_user_cache[key] = user_data
+    return await set_cached(key, user_data, ex=ex or settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def get_auth_user_cache_sync(user_id) -> Optional[dict]:
+    """Bản đồng bộ cho dependency `def` (get_current_user_db) chạy trong threadpool."""
+    key = _auth_user_key(user_id)
+    with _local_auth_user_lock:
+        data = _local_auth_user_cache.get(key)
+    if data is not None:
+        return data
+
+    data = get_cached_sync(key)
+    if data is not None:
+        with _local_auth_user_lock:
+            _local_auth_user_cache[key] = data
+    return data
+
+
+def set_auth_user_cache_sync(user_id, user_data: dict, ex: int = None):
+    key = _auth_user_key(user_id)
+    with _local_auth_user_lock:
+        _local_auth_user_cache[key] = user_data
+    return set_cached_sync(key, user_data, ex=ex or settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_auth_user_cache(user_id):
+    """Gọi sau mọi thay đổi trên bảng users (profile, bảo mật, session key, admin)."""
+    key = _auth_user_key(user_id)
+    with _local_auth_user_lock:
+        _local_auth_user_cache.pop(key, None)
+    delete_cached_sync(key)
+
+
+# =========================================================
+# ✅ RESPONSE CACHE CHO CÁC ROUTE ĐỌC (invalidate bằng generation counter)
+# =========================================================
+# Mỗi user có 1 bộ đếm phiên bản dữ liệu trong Redis; mọi thao tác ghi (transaction, category,
+# budget) chỉ cần INCR bộ đếm -> key cache cũ tự "mồ côi" và hết hạn theo TTL, không cần SCAN/DEL.
+GLOBAL_DATA_VERSION_KEY = "data_version:global"  # Dữ liệu dùng chung (VD: default categories của admin)
+
+_response_cache_stats = {"hit": 0, "miss": 0, "bypass": 0}
+_response_cache_stats_lock = threading.Lock()
+
+
+def _data_version_key(user_id) -> str:
+    return f"data_version:{user_id}"
+
+
+def _record_response_cache(outcome: str):
+    with _response_cache_stats_lock:
+        _response_cache_stats[outcome] += 1
+
+
+def get_response_cache_stats() -> dict:
+    """Số liệu hit/miss của response cache (tính trong process hiện tại)."""
+    with _response_cache_stats_lock:
+        stats = dict(_response_cache_stats)
+    lookups = stats["hit"] + stats["miss"]
+    stats["hit_ratio"] = round(stats["hit"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def _incr_sync(key: str):
+    if not sync_redis_client:
+        return
+
+    try:
+        sync_redis_client.incr(key)
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis INCR error ({key}): {e}")
+
+
+def bump_user_data_version(user_id):
+    """Gọi SAU commit của mọi thao tác ghi làm thay đổi dữ liệu đọc của user."""
+    _incr_sync(_data_version_key(user_id))
+
+
+def bump_global_data_version():
+    _incr_sync(GLOBAL_DATA_VERSION_KEY)
+
+
+async def get_data_versions(user_id) -> Optional[Tuple[int, int]]:
+    """(phiên bản của user, phiên bản global) hoặc None nếu Redis không dùng được."""
+    if not redis_client:
+        return None
+
+    try:
+        user_version, global_version = await redis_client.mget(_data_version_key(user_id), GLOBAL_DATA_VERSION_KEY)
+        return int(user_version or 0), int(global_version or 0)
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis MGET error (data_version:{user_id}): {e}")
+        return None
+
+
+def get_data_versions_sync(user_id) -> Optional[Tuple[int, int]]:
+    """Bản đồng bộ của get_data_versions (cho code chạy trong worker thread, VD: chatbot)."""
+    if not sync_redis_client:
+        return None
+
+    try:
+        user_version, global_version = sync_redis_client.mget(_data_version_key(user_id), GLOBAL_DATA_VERSION_KEY)
+        return int(user_version or 0), int(global_version or 0)
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis MGET error (data_version:{user_id}): {e}")
+        return None
+
+
+def cached_response(namespace: str, response_model: Any = None, ex: int = None):
+    """
+    Decorator cache kết quả của route đọc (async) theo user + route + query params + ngày hiện tại.
+    - Route phải nhận `current_user` qua Depends.
+    - Ngày (date.today(), cùng nguồn với các CRUD "N ngày qua", "tháng này") nằm trong key: qua ngày mới
+      thì trend theo ngày, spent_this_month... không còn đọc bản cache của hôm qua.
+    - Redis lỗi/không có -> gọi thẳng route (đọc DB) như bình thường.
+    Đặt bên dưới @router.get(...).
+    """
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    def _to_json(result):
+        if adapter is not None:
+            return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+        return jsonable_encoder(result)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            current_user = kwargs.get("current_user")
+            versions = await get_data_versions(current_user.id) if current_user is not None else None
+            if versions is None:
+                _record_response_cache("bypass")
+                return await func(*args, **kwargs)
+
+            params = {k: v for k, v in kwargs.items() if k not in ("current_user", "db")}
+            params_hash = hashlib.md5(
+                json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            key = (f"resp:{current_user.id}:{versions[0]}.{versions[1]}:{namespace}:"
+                   f"{date.today().isoformat()}:{params_hash}")
+
+            cached = await get_cached(key)
+            if cached is not None:
+                _record_response_cache("hit")
+                return cached
+
+            _record_response_cache("miss")
+            result = await func(*args, **kwargs)
+            await set_cached(key, _to_json(result), ex=ex or settings.RESPONSE_CACHE_TTL_SECONDS)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
 # =========================================================
 # ✅ HEALTH CHECK
 # =========================================================
@@ -24,6 +24,63 @@ class Settings(BaseSettings):  # Inheritance tốt – dễ extend (e.g., thêm
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     BACKEND_CORS_ORIGINS: str = ",".join(DEFAULT_CORS_ORIGINS)
 
+    # Cache user đã xác thực (get_current_user_db): tầng 1 trong process, tầng 2 Redis.
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    AUTH_USER_LOCAL_CACHE_TTL_SECONDS: int = 5  # Ngắn: worker khác chỉ thấy dữ liệu cũ tối đa vài giây.
+    AUTH_USER_LOCAL_CACHE_SIZE: int = 1024
+    # Response cache của các route đọc (summary/dashboard/analytics/transactions).
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    # POST /transactions/bulk + tool create_batch_transactions: số dòng tối đa mỗi lần (1 DB transaction).
+    TRANSACTION_BULK_MAX_ROWS: int = 5000
+    # Import sao kê CSV/OFX (POST /import/transactions): số dòng mỗi batch (1 commit) và giới hạn file.
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_FILE_MB: int = 100
+
+    # Xuất file bất đồng bộ (Celery): nơi lưu file, thời hạn tải và giới hạn mỗi user.
+    EXPORT_STORAGE_BACKEND: str = "local"
+    EXPORT_STORAGE_DIR: str = "storage/exports"
+    EXPORT_RESULT_TTL_HOURS: int = 24
+    EXPORT_MAX_ACTIVE_JOBS_PER_USER: int = 2
+    EXPORT_JOB_TIMEOUT_MINUTES: int = 30  # Job pending/running quá lâu (worker chết) bị coi là failed
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # True: chạy task ngay trong process API (dev/test không cần worker)
+    # Chatbot: số agent (LLM + tools) chạy song song tối đa trên mỗi worker, mỗi agent giữ 1 thread + 1 DB connection.
+    CHAT_MAX_CONCURRENCY: int = 8
+    # Cache danh sách danh mục đưa vào prompt chatbot (key theo data_version nên TTL chỉ để dọn bộ nhớ).
+    CHAT_CATEGORY_CACHE_TTL_SECONDS: int = 600
+    CHAT_CATEGORY_CACHE_SIZE: int = 1024
+    # Audit log ghi nền theo batch (services/audit_sink.py).
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: int = 200  # Thời gian tối đa gom batch -> log xuất hiện trễ nhiều nhất chừng này
+    AUDIT_ENQUEUE_TIMEOUT_MS: int = 50  # Hàng đợi đầy: caller chờ tối đa chừng này rồi ghi trực tiếp
+    AUDIT_SHUTDOWN_TIMEOUT_SECONDS: int = 10
+    # audit_logs phân vùng theo tháng: tạo trước N tháng, giữ lại M tháng gần nhất (cũ hơn -> DROP partition).
+    AUDIT_PARTITIONS_AHEAD: int = 3
+    AUDIT_RETENTION_MONTHS: int = 12
+    # bcrypt (services/password_hasher.py): cost factor; đổi giá trị này -> hash cũ được hash lại khi user đăng nhập.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 0  # Số thread bcrypt mỗi worker API; 0 = số CPU
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # Số yêu cầu chờ tối đa khi mọi thread bận; vượt -> 429 ngay
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    # Firebase ID token (services/firebase_token_verifier.py): cache payload tới exp + làm mới chứng chỉ Google nền.
+    FIREBASE_TOKEN_CACHE_SIZE: int = 10000
+    FIREBASE_CERT_REFRESH_MARGIN_SECONDS: int = 300  # Tải lại chứng chỉ sớm chừng này trước khi hết max-age
+    FIREBASE_CERT_RETRY_SECONDS: int = 30  # Tải lỗi -> thử lại sau chừng này (vẫn dùng chứng chỉ cũ)
+    # Rate limit (services/rate_limiter.py): token bucket trên Redis; BURST = số request dồn được, PER_MINUTE = tốc độ nạp lại.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CHAT_PER_MINUTE: int = 10  # /chat/send, theo user
+    RATE_LIMIT_CHAT_BURST: int = 5
+    RATE_LIMIT_EXPORT_PER_MINUTE: int = 6  # Các endpoint dựng file export, theo user
+    RATE_LIMIT_EXPORT_BURST: int = 3
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10  # /auth/login_sync, theo IP
+    RATE_LIMIT_LOGIN_BURST: int = 5
+    RATE_LIMIT_ANALYTICS_PER_MINUTE: int = 60  # /analytics/summary, theo user
+    RATE_LIMIT_ANALYTICS_BURST: int = 20
+    RATE_LIMIT_REDIS_RETRY_SECONDS: int = 5  # Redis lỗi -> dùng bucket trong process chừng này giây rồi mới thử lại Redis
+    # IP/CIDR của reverse proxy / load balancer (cách nhau dấu phẩy): chỉ request đi qua các hop này mới được
+    # đọc X-Forwarded-For để lấy IP client cho bucket theo IP. Trống = dùng IP kết nối trực tiếp.
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+
     # Các biến khác
     FIREBASE_SERVICE_ACCOUNT: str = ""  # Optional tốt, nhưng add type Optional[str] nếu pydantic v2.
     GOOGLE_API_KEY: str = ""  # Cho Gemini – liên kết chat_route.
@@ -0,0 +1,58 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination cho các danh sách giao dịch và audit log.
+
+Cursor là chuỗi base64 (opaque với client) chứa khóa sắp xếp (date, created_at, id)
+của dòng cuối cùng trang trước -> trang sau chỉ cần `WHERE (date, created_at, id) < cursor`
+thay vì OFFSET, nên trang sâu tốn như trang đầu.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _encode(payload: list) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str, parsers) -> tuple:
+    """Giải mã cursor thành tuple, mỗi phần tử qua 1 hàm parse; cursor hỏng -> 400 thay vì 500."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(parsers):
+            raise ValueError("cursor length mismatch")
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def encode_cursor(row) -> str:
+    """Tạo cursor từ dòng cuối của trang (object có date, created_at, id)."""
+    return _encode([row.date.isoformat(), row.created_at.isoformat(), str(row.id)])
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[date, datetime, UUID]]:
+    """Giải mã cursor từ query param; cursor hỏng -> 400 thay vì 500."""
+    if not cursor:
+        return None
+    return _decode(cursor, (date.fromisoformat, datetime.fromisoformat, UUID))
+
+
+def encode_time_cursor(row) -> str:
+    """Cursor cho danh sách sắp theo (created_at, id) DESC, VD: audit log."""
+    return _encode([row.created_at.isoformat(), str(row.id)])
+
+
+def decode_time_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, UUID]]:
+    if not cursor:
+        return None
+    return _decode(cursor, (datetime.fromisoformat, UUID))
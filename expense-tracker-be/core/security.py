@@ -28,9 +28,17 @@ def verify_password(plain_password, hashed_password):  # Verify tốt.
     except (TypeError, ValueError):
         return False
 
-def get_password_hash(password):  # Hash tốt – dùng khi register user.
-    """Mã hóa mật khẩu trước khi lưu vào DB"""
-    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt()).decode("utf-8")
+def get_password_hash(password, rounds: Optional[int] = None):  # Hash tốt – dùng khi register user.
+    """Mã hóa mật khẩu trước khi lưu vào DB (cost = BCRYPT_ROUNDS nếu không truyền rounds)"""
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode("utf-8")
+
+def password_needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+    """Hash lưu trong DB có cost khác cấu hình hiện tại không ($2b$<cost>$...)."""
+    try:
+        return int(hashed_password.split("$")[2]) != (rounds or settings.BCRYPT_ROUNDS)
+    except (AttributeError, IndexError, ValueError):
+        return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):  # Create JWT tốt.
     """Tạo JWT Token"""
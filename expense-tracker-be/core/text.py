@@ -0,0 +1,18 @@
+# core/text.py
+"""
+Chuẩn hóa văn bản tiếng Việt dùng chung (chatbot, import sao kê...): so khớp không phân biệt hoa thường / dấu.
+"""
+import re
+import unicodedata
+
+
+def unaccent(message: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (đ -> d), giữ nguyên ký tự khác."""
+    text = unicodedata.normalize("NFD", message.lower().replace("đ", "d"))
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def normalize_text(message: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (đ -> d), bỏ ký tự đặc biệt, gộp khoảng trắng."""
+    text = re.sub(r"'s\b", "", unaccent(message).replace("’", "'"))  # "what's", "month's"
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
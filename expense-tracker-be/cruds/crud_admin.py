@@ -2,10 +2,14 @@
 
 import uuid
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, exc
-from models import user_model, income_model, expense_model, category_model
+from sqlalchemy import func, desc, exc, or_, select, tuple_
+from core.cache import bump_global_data_version, invalidate_auth_user_cache
+from core.pagination import decode_time_cursor, encode_time_cursor
+from cruds import crud_system_counter
+from models import user_model, income_model, expense_model, category_model, daily_total_model
 from schemas import category_schemas  # Import schema category
 from schemas.admin_schemas import AdminUserUpdate
+from typing import Optional
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -48,72 +52,122 @@ def admin_update_system_settings(db: Session, update_data: dict):
     return settings
 
 def admin_get_global_kpis(db: Session):
-    """Lấy KPI thống kê toàn hệ thống từ bảng Transaction duy nhất"""
-
-    # 1. Đếm tổng User
-    total_users = db.query(func.count(user_model.User.id)).scalar() or 0
-
-    # 2. Tính toán tài chính từ bảng Transaction
-    # Chúng ta dùng 1 query duy nhất để lấy cả Thu và Chi
-    totals = db.query(
-        transaction_model.Transaction.type,
-        func.sum(transaction_model.Transaction.amount).label("total")
-    ).group_by(transaction_model.Transaction.type).all()
-
-    total_income = 0
-    total_expense = 0
-    for t_type, t_amount in totals:
-        if t_type == 'income':
-            total_income = float(t_amount)
-        elif t_type == 'expense':
-            total_expense = float(t_amount)
-
-    # 3. Các chỉ số bảo mật và tăng trưởng
-    total_2fa = db.query(func.count(user_model.User.id)).filter(
-        user_model.User.is_2fa_enabled == True
-    ).scalar() or 0
-
+    """
+    Lấy KPI thống kê toàn hệ thống từ bảng system_counters (cập nhật dần theo từng thao tác ghi),
+    không còn SUM cả bảng transactions / COUNT cả bảng users mỗi lần mở dashboard.
+    """
+    counters = crud_system_counter.get_counters(db)
+    total_income = float(counters.get(crud_system_counter.TOTAL_BY_TYPE["income"], 0))
+    total_expense = float(counters.get(crud_system_counter.TOTAL_BY_TYPE["expense"], 0))
+
+    # User mới trong 24h: cửa sổ trượt, không phải bộ đếm cộng dồn -> đếm theo index ix_users_created_id.
     one_day_ago = datetime.utcnow() - timedelta(hours=24)
     new_users = db.query(func.count(user_model.User.id)).filter(
         user_model.User.created_at >= one_day_ago
     ).scalar() or 0
 
     return {
-        "total_users": total_users,
+        "total_users": int(counters.get(crud_system_counter.USERS, 0)),
         "total_income": total_income,
         "total_expense": total_expense,
         "net_balance": total_income - total_expense,
-        "total_2fa_users": total_2fa,
+        "total_2fa_users": int(counters.get(crud_system_counter.USERS_2FA, 0)),
         "new_users_24h": new_users
     }
 
 
-def admin_get_user_growth(db: Session, days: int = 30):
-    """Lấy số lượng user mới mỗi ngày trong N ngày qua"""
-    start_date = datetime.utcnow().date() - timedelta(days=days - 1)
+USER_GROWTH_WINDOWS = (7, 30, 90, 365)  # Các khoảng ngày biểu đồ tăng trưởng user hỗ trợ
 
-    growth_data = (
-        db.query(
-            func.date(user_model.User.created_at).label("date"),
-            func.count(user_model.User.id).label("count")
-        )
-        .filter(user_model.User.created_at >= start_date)
-        .group_by(func.date(user_model.User.created_at))
-        .order_by(func.date(user_model.User.created_at).asc())
+
+def admin_get_user_growth(db: Session, days: int = 30):
+    """
+    Lấy số lượng user mới mỗi ngày trong N ngày qua (ngày UTC, tính cả hôm nay).
+    Đọc từ rollup daily_signups (tối đa `days` dòng theo primary key) và điền 0 cho ngày không có ai đăng ký.
+    """
+    today = datetime.utcnow().date()
+    start_date = today - timedelta(days=days - 1)
+
+    rows = (
+        db.query(system_model.DailySignup.date, system_model.DailySignup.count)
+        .filter(system_model.DailySignup.date >= start_date, system_model.DailySignup.date <= today)
         .all()
     )
+    counts = {row.date: row.count for row in rows}
 
-    # Format data
-    return [{"date": str(row.date), "count": row.count} for row in growth_data]
+    return [
+        {"date": str(day), "count": counts.get(day, 0)}
+        for day in (start_date + timedelta(days=offset) for offset in range(days))
+    ]
 
 
 # =========================================================
 # 2. USER MANAGEMENT (Quản lý Người dùng)
 # =========================================================
 
-def admin_get_all_users(db: Session, skip: int = 0, limit: int = 100):
-    """Lấy danh sách tất cả người dùng (có phân trang)"""
-    return db.query(user_model.User).order_by(user_model.User.created_at.desc()).offset(skip).limit(limit).all()
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def admin_list_users(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    search: Optional[str] = None,
+    is_admin: Optional[bool] = None,
+    is_2fa_enabled: Optional[bool] = None,
+    is_email_verified: Optional[bool] = None,
+):
+    """
+    1 trang user mới nhất trước (keyset theo created_at, id) -> (items, next_cursor).
+    Mỗi dòng kèm transaction_count + last_activity (ngày giao dịch gần nhất) lấy từ rollup user_daily_totals,
+    gộp trong CÙNG 1 câu query (chỉ group các user của trang) thay vì FE gọi thêm API cho từng user.
+    """
+    user = user_model.User
+    page = select(
+        user.id, user.name, user.email, user.profile_image, user.created_at,
+        user.is_admin, user.is_2fa_enabled, user.is_email_verified,
+    )
+    if search and search.strip():
+        # Tìm theo tiền tố: ILIKE 'abc%' dùng được trigram index (ix_users_email_trgm / ix_users_name_trgm).
+        pattern = _escape_like(search.strip()) + "%"
+        page = page.where(or_(user.email.ilike(pattern, escape="\\"), user.name.ilike(pattern, escape="\\")))
+    if is_admin is not None:
+        page = page.where(user.is_admin.is_(is_admin))
+    if is_2fa_enabled is not None:
+        page = page.where(user.is_2fa_enabled.is_(is_2fa_enabled))
+    if is_email_verified is not None:
+        page = page.where(func.coalesce(user.is_email_verified, False).is_(is_email_verified))
+
+    keyset = decode_time_cursor(cursor)
+    if keyset is not None:
+        page = page.where(tuple_(user.created_at, user.id) < tuple_(*keyset))
+    page = page.order_by(user.created_at.desc(), user.id.desc()).limit(limit + 1).subquery()
+
+    rollup = daily_total_model.UserDailyTotal
+    stats = (
+        select(
+            rollup.user_id,
+            func.sum(rollup.transaction_count).label("transaction_count"),
+            func.max(rollup.date).label("last_activity"),
+        )
+        .where(rollup.user_id.in_(select(page.c.id)), rollup.transaction_count > 0)
+        .group_by(rollup.user_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            page,
+            func.coalesce(stats.c.transaction_count, 0).label("transaction_count"),
+            stats.c.last_activity,
+        )
+        .outerjoin(stats, stats.c.user_id == page.c.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    ).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_time_cursor(rows[-1])
 
 
 def admin_get_user_by_id(db: Session, user_id: UUID):
@@ -128,6 +182,7 @@ def admin_update_user(db: Session, user: user_model.User, update_data: AdminUser
         setattr(user, key, value)
     db.commit()
     db.refresh(user)
+    invalidate_auth_user_cache(user.id)
     return user
 
 
@@ -155,8 +210,11 @@ def admin_delete_user(db: Session, user: user_model.User):
             # Vẫn tiếp tục xóa DB dù Firebase lỗi
 
     # 2. Xóa DB
+    user_id = user.id
+    crud_system_counter.track_user_deleted(db, user)  # Trước khi cascade xóa giao dịch + rollup
     db.delete(user)
     db.commit()
+    invalidate_auth_user_cache(user_id)
     return True, "User deleted successfully"
 
 # =========================================================
@@ -191,6 +249,7 @@ def admin_create_default_category(db: Session, payload: category_schemas.Categor
     )
     db.add(new_cat)
     db.commit()
+    bump_global_data_version()
     db.refresh(new_cat)
     return new_cat
 
@@ -204,6 +263,7 @@ def admin_update_default_category(db: Session, category: category_model.Category
         if key != "type":
             setattr(category, key, value)
     db.commit()
+    bump_global_data_version()
     db.refresh(category)
     return category
 
@@ -212,7 +272,9 @@ def admin_delete_default_category(db: Session, category: category_model.Category
     """Xóa 1 danh mục MẶC ĐỊNH"""
     # TODO: Nên thêm logic kiểm tra category này có đang được
     # tham chiếu bởi bảng income/expense không trước khi xóa.
+    crud_system_counter.track_rollup_removed(db, category_id=category.id)
     db.delete(category)
     db.commit()
+    bump_global_data_version()
     return True
 
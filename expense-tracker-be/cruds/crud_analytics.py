@@ -1,11 +1,12 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from datetime import date
 from uuid import UUID
 from typing import Optional, Dict, List, Any
 from decimal import Decimal
 
-from models import transaction_model, user_model
+from models import daily_total_model, transaction_model, user_model
 from schemas.analytics_schemas import CategorySummary, AnalyticsFilter, AnalyticsSummary
 
 
@@ -95,35 +96,81 @@ def get_analytics_summary_data(
 
 def _apply_filters(query, filters: AnalyticsFilter):
     if filters.start_date:
-        query = query.filter(transaction_model.Transaction.date >= filters.start_date)
+        query = query.where(transaction_model.Transaction.date >= filters.start_date)
     if filters.end_date:
-        query = query.filter(transaction_model.Transaction.date <= filters.end_date)
+        query = query.where(transaction_model.Transaction.date <= filters.end_date)
     if filters.category_id:
-        query = query.filter(transaction_model.Transaction.category_id == filters.category_id)
+        query = query.where(transaction_model.Transaction.category_id == filters.category_id)
     if filters.type and filters.type != "all":
-        query = query.filter(transaction_model.Transaction.type == filters.type)
+        query = query.where(transaction_model.Transaction.type == filters.type)
     return query
 
 
-def get_analytics_summary_data(
-        db: Session,
-        user_id: UUID,
-        filters: AnalyticsFilter
-) -> Dict[str, Any]:
-    base_query = db.query(transaction_model.Transaction).filter(
-        transaction_model.Transaction.user_id == user_id
-    )
-    filtered_query = _apply_filters(base_query, filters)
+def _apply_rollup_filters(query, filters: AnalyticsFilter):
+    """Bộ lọc giống _apply_filters nhưng áp lên bảng rollup user_daily_totals."""
+    table = daily_total_model.UserDailyTotal
+    if filters.start_date:
+        query = query.where(table.date >= filters.start_date)
+    if filters.end_date:
+        query = query.where(table.date <= filters.end_date)
+    if filters.category_id:
+        query = query.where(table.category_id == filters.category_id)
+    if filters.type and filters.type != "all":
+        query = query.where(table.type == filters.type)
+    return query
 
-    totals = (
-        filtered_query.with_entities(
-            transaction_model.Transaction.type,
-            func.sum(transaction_model.Transaction.amount).label("total")
-        )
-        .group_by(transaction_model.Transaction.type)
-        .all()
-    )
 
+def _analytics_statements(user_id: UUID, filters: AnalyticsFilter) -> Dict[str, Any]:
+    """
+    Các câu SELECT của trang Analytics, dùng chung cho bản sync và async.
+    Các phép tổng hợp đọc từ rollup theo ngày -> chi phí tỉ lệ với số ngày, không phải số giao dịch.
+    """
+    rollup = daily_total_model.UserDailyTotal
+
+    def _rollup_select(*columns):
+        return _apply_rollup_filters(select(*columns).where(rollup.user_id == user_id), filters)
+
+    return {
+        "totals": _rollup_select(
+            rollup.type,
+            func.sum(rollup.total_amount).label("total")
+        ).group_by(rollup.type),
+        "category_distribution": _rollup_select(
+            rollup.category_name,
+            rollup.type,
+            func.sum(rollup.total_amount).label("total")
+        ).group_by(
+            rollup.category_name,
+            rollup.type
+        ),
+        "transactions": _apply_filters(
+            select(transaction_model.Transaction).where(transaction_model.Transaction.user_id == user_id),
+            filters,
+        )
+        .order_by(
+            transaction_model.Transaction.date.desc(),
+            transaction_model.Transaction.created_at.desc(),
+        )
+        .limit(100),
+        "expense_by_day": _rollup_select(
+            rollup.date.label("date"),
+            func.sum(rollup.total_amount).label("total")
+        )
+        .where(rollup.type == "expense")
+        .group_by(rollup.date)
+        .order_by(rollup.date.asc()),
+        "currency_symbol": select(user_model.User.currency_symbol).where(user_model.User.id == user_id),
+    }
+
+
+def _analytics_payload(
+        filters: AnalyticsFilter,
+        totals,
+        category_distribution_raw,
+        detailed_transactions,
+        expense_by_day,
+        currency_symbol: Optional[str],
+) -> Dict[str, Any]:
     total_income = Decimal(0)
     total_expense = Decimal(0)
     for t_type, t_amount in totals:
@@ -132,18 +179,6 @@ def get_analytics_summary_data(
         elif t_type == "expense":
             total_expense = t_amount or Decimal(0)
 
-    category_distribution_raw = (
-        filtered_query.with_entities(
-            transaction_model.Transaction.category_name,
-            transaction_model.Transaction.type,
-            func.sum(transaction_model.Transaction.amount).label("total")
-        )
-        .group_by(
-            transaction_model.Transaction.category_name,
-            transaction_model.Transaction.type
-        )
-        .all()
-    )
     category_distribution = [
         CategorySummary(
             category_name=name or "Uncategorized",
@@ -153,27 +188,6 @@ def get_analytics_summary_data(
         for name, t_type, amount in category_distribution_raw
     ]
 
-    detailed_transactions = (
-        filtered_query.order_by(
-            transaction_model.Transaction.date.desc(),
-            transaction_model.Transaction.created_at.desc(),
-        )
-        .limit(100)
-        .all()
-    )
-
-    expense_by_day = (
-        _apply_filters(base_query, filters)
-        .filter(transaction_model.Transaction.type == "expense")
-        .with_entities(
-            transaction_model.Transaction.date.label("date"),
-            func.sum(transaction_model.Transaction.amount).label("total")
-        )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.asc())
-        .all()
-    )
-
     if expense_by_day:
         most_expensive_day = max(expense_by_day, key=lambda row: row.total).date
         range_start = filters.start_date or expense_by_day[0].date
@@ -184,8 +198,6 @@ def get_analytics_summary_data(
         most_expensive_day = None
         average_daily_spending = Decimal(0)
 
-    currency_symbol = get_user_currency_symbol(db, user_id)
-
     return AnalyticsSummary(
         total_income=total_income,
         total_expense=total_expense,
@@ -194,5 +206,37 @@ def get_analytics_summary_data(
         most_expensive_day=most_expensive_day,
         category_distribution=category_distribution,
         transactions=detailed_transactions,
-        currency_symbol=currency_symbol
+        currency_symbol=currency_symbol or "$"
     ).model_dump(mode="json")
+
+
+def get_analytics_summary_data(
+        db: Session,
+        user_id: UUID,
+        filters: AnalyticsFilter
+) -> Dict[str, Any]:
+    statements = _analytics_statements(user_id, filters)
+    return _analytics_payload(
+        filters,
+        totals=db.execute(statements["totals"]).all(),
+        category_distribution_raw=db.execute(statements["category_distribution"]).all(),
+        detailed_transactions=db.execute(statements["transactions"]).scalars().all(),
+        expense_by_day=db.execute(statements["expense_by_day"]).all(),
+        currency_symbol=db.execute(statements["currency_symbol"]).scalar(),
+    )
+
+
+async def get_analytics_summary_data_async(
+        db: AsyncSession,
+        user_id: UUID,
+        filters: AnalyticsFilter
+) -> Dict[str, Any]:
+    statements = _analytics_statements(user_id, filters)
+    return _analytics_payload(
+        filters,
+        totals=(await db.execute(statements["totals"])).all(),
+        category_distribution_raw=(await db.execute(statements["category_distribution"])).all(),
+        detailed_transactions=(await db.execute(statements["transactions"])).scalars().all(),
+        expense_by_day=(await db.execute(statements["expense_by_day"])).all(),
+        currency_symbol=(await db.execute(statements["currency_symbol"])).scalar(),
+    )
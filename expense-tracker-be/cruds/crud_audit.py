@@ -1,9 +1,39 @@
 # cruds/crud_audit.py
 import datetime
+import logging
+import re
+from typing import List, Optional, Tuple
 
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.pagination import decode_time_cursor, encode_time_cursor
 from models import audit_model
-from sqlalchemy import desc
+from services.audit_sink import audit_sink
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME = re.compile(r"audit_logs_p(\d{4})_(\d{2})")
+AUDIT_DEFAULT_PARTITION = "audit_logs_default"
+# Khóa advisory (theo transaction) cho mọi DDL trên partition audit_logs: nhiều worker khởi động cùng lúc
+# -> chỉ 1 worker tạo partition / chuyển dòng, các worker khác chờ rồi thấy partition đã có.
+AUDIT_PARTITION_LOCK_ID = 724_001
+
+
+def _audit_event(action: str, actor_email: str, target: str, status: str, details, ip_address: str) -> dict:
+    # Đủ mọi cột cho mỗi sự kiện -> các dòng cùng batch dùng chung 1 câu INSERT nhiều dòng.
+    return {
+        "action": action,
+        "actor_email": actor_email,
+        "target": target,
+        "status": status,
+        "details": str(details) if details else None,
+        "ip_address": ip_address,
+        "created_at": datetime.datetime.now(datetime.timezone.utc),  # Thời điểm xảy ra, không phải lúc flush
+    }
+
 
 def create_audit_log(
     db: Session,
@@ -14,44 +44,189 @@ def create_audit_log(
     details: str = None,
     ip_address: str = None
 ):
-    log = audit_model.AuditLog(
-        action=action,
-        actor_email=actor_email,
-        target=target,
-        status=status,
-        details=str(details) if details else None,
-        ip_address=ip_address
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    """
+    Đưa sự kiện vào audit_sink (ghi nền theo batch trên connection riêng).
+    `db` không còn được dùng: không commit/refresh thêm trên session của caller.
+    """
+    audit_sink.emit(_audit_event(action, actor_email, target, status, details, ip_address))
+
 
-# cruds/crud_audit.py
 def log_action(db: Session, actor_email: str, action: str, target: str = None, details: str = None,
                status: str = "INFO", ip_address: str = None):
+    """Như create_audit_log (status mặc định INFO); lỗi ghi audit không ảnh hưởng luồng chính."""
     try:
-        # Kiểm tra xem model có cột status/ip_address không để tránh lỗi
-        # (Giả sử model của bạn đã có, nếu chưa có thì nó sẽ bỏ qua hoặc cần migration)
-
-        new_log = audit_model.AuditLog(
-            actor_email=actor_email,
-            action=action,
-            target=target,
-            details=details,
-            created_at=datetime.datetime.now(),
-            status=status,
-            ip_address=ip_address
-        )
-        db.add(new_log)
-        db.commit()
-        db.refresh(new_log)
-        return new_log
+        audit_sink.emit(_audit_event(action, actor_email, target, status, details, ip_address))
     except Exception as e:
-        print(f"⚠️ Lỗi ghi Audit Log (Không ảnh hưởng luồng chính): {str(e)}")
-        db.rollback()
-        return None  # Trả về None chứ không throw lỗi 500
+        logger.warning(f"⚠️ Lỗi ghi Audit Log (Không ảnh hưởng luồng chính): {str(e)}")
+
+
+# =========================================================
+# 🔎 ĐỌC LOG: keyset pagination + bộ lọc (mỗi bộ lọc có index (cột, created_at DESC, id DESC))
+# =========================================================
+
+def list_audit_logs(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    actor_email: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    start_time: Optional[datetime.datetime] = None,
+    end_time: Optional[datetime.datetime] = None,
+) -> Tuple[List[audit_model.AuditLog], Optional[str]]:
+    """
+    1 trang log mới nhất trước -> (items, next_cursor).
+    Khoảng thời gian [start_time, end_time) giúp Postgres chỉ quét các partition tháng liên quan.
+    """
+    log = audit_model.AuditLog
+    stmt = select(log)
+    if actor_email:
+        stmt = stmt.where(log.actor_email == actor_email)
+    if action:
+        stmt = stmt.where(log.action == action.upper())
+    if status:
+        stmt = stmt.where(log.status == status)
+    if start_time:
+        stmt = stmt.where(log.created_at >= start_time)
+    if end_time:
+        stmt = stmt.where(log.created_at < end_time)
+
+    keyset = decode_time_cursor(cursor)
+    if keyset is not None:
+        cursor_created_at, cursor_id = keyset
+        stmt = stmt.where(
+            log.created_at <= cursor_created_at,  # Điều kiện thừa giúp cắt partition + phạm vi index
+            tuple_(log.created_at, log.id) < tuple_(cursor_created_at, cursor_id),
+        )
+
+    rows = db.scalars(stmt.order_by(log.created_at.desc(), log.id.desc()).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_time_cursor(rows[-1])
+
+
+# =========================================================
+# 🗂️ PARTITION THEO THÁNG: tạo trước + retention bằng DROP partition
+# =========================================================
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
 
 
-def get_audit_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(audit_model.AuditLog).order_by(audit_model.AuditLog.created_at.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+def audit_partition_name(month: datetime.date) -> str:
+    return f"audit_logs_p{month:%Y_%m}"
+
+
+def _current_month() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date().replace(day=1)
+
+
+def _create_audit_partition(db: Session, month: datetime.date, name: str) -> int:
+    """
+    Tạo partition của 1 tháng -> số dòng chuyển từ DEFAULT sang.
+    DEFAULT đã có dòng thuộc tháng này (beat ngừng lâu hơn AUDIT_PARTITIONS_AHEAD tháng) thì
+    CREATE ... PARTITION OF sẽ lỗi: tách DEFAULT ra, tạo partition, chuyển dòng, rồi gắn DEFAULT lại.
+    """
+    bounds = {"start": f"{month.isoformat()} 00:00:00+00", "end": f"{_add_months(month, 1).isoformat()} 00:00:00+00"}
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF audit_logs FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    )
+    in_month = "created_at >= CAST(:start AS TIMESTAMPTZ) AND created_at < CAST(:end AS TIMESTAMPTZ)"
+    if not _has_default_partition(db) or not db.scalar(
+            text(f"SELECT EXISTS (SELECT 1 FROM {AUDIT_DEFAULT_PARTITION} WHERE {in_month})"), bounds):
+        db.execute(create)
+        return 0
+
+    db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {AUDIT_DEFAULT_PARTITION}"))
+    db.execute(create)
+    moved = db.execute(text(f"INSERT INTO {name} SELECT * FROM {AUDIT_DEFAULT_PARTITION} WHERE {in_month}"),
+                       bounds).rowcount
+    db.execute(text(f"DELETE FROM {AUDIT_DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+    db.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {AUDIT_DEFAULT_PARTITION} DEFAULT"))
+    return moved
+
+
+def _lock_partitions(db: Session) -> None:
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": AUDIT_PARTITION_LOCK_ID})
+
+
+def _has_default_partition(db: Session) -> bool:
+    return db.scalar(text("SELECT to_regclass(:name)"), {"name": AUDIT_DEFAULT_PARTITION}) is not None
+
+
+def _past_months_in_default(db: Session, since: datetime.date, before: datetime.date) -> List[datetime.date]:
+    """Các tháng trong [since, before) còn dòng nằm trong DEFAULT (beat ngừng lâu, log ghi lùi thời gian)."""
+    if not _has_default_partition(db):
+        return []
+    months = db.scalars(text(
+        f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM {AUDIT_DEFAULT_PARTITION} "
+        "WHERE created_at >= CAST(:start AS TIMESTAMPTZ) AND created_at < CAST(:end AS TIMESTAMPTZ)"
+    ), {"start": f"{since.isoformat()} 00:00:00+00", "end": f"{before.isoformat()} 00:00:00+00"}).all()
+    return sorted(months)
+
+
+def ensure_audit_partitions(db: Session, months_ahead: int = None) -> List[str]:
+    """
+    Tạo partition cho tháng hiện tại + `months_ahead` tháng tới (nếu chưa có), cùng các tháng cũ
+    (còn trong cửa sổ retention) có dòng rơi vào DEFAULT -> dòng được chuyển sang và retention DROP được.
+    Mỗi tháng 1 transaction riêng giữ advisory lock: 1 tháng lỗi chỉ được log lại, không kéo theo các tháng khác.
+    """
+    months_ahead = settings.AUDIT_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    this_month = _current_month()
+    oldest_kept = _add_months(this_month, -settings.AUDIT_RETENTION_MONTHS)
+    months = _past_months_in_default(db, oldest_kept, this_month)
+    months += [_add_months(this_month, offset) for offset in range(months_ahead + 1)]
+    db.commit()
+
+    created = []
+    for month in months:
+        name = audit_partition_name(month)
+        try:
+            _lock_partitions(db)
+            # Kiểm tra lại sau khi có lock: worker khác có thể vừa tạo xong
+            if db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None:
+                db.commit()
+                continue
+            moved = _create_audit_partition(db, month, name)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"❌ Không tạo được audit partition {name}: {e}")
+            continue
+        if moved:
+            logger.info(f"Moved {moved} audit rows from {AUDIT_DEFAULT_PARTITION} into {name}")
+        created.append(name)
+    return created
+
+
+def drop_expired_audit_partitions(db: Session, retention_months: int = None) -> List[str]:
+    """
+    Retention: DROP các partition tháng đã ra khỏi cửa sổ `retention_months` tháng gần nhất
+    (tức thì, không để lại dead tuple như DELETE + VACUUM). Partition DEFAULT không bị DROP,
+    chỉ DELETE các dòng quá hạn còn sót trong đó.
+    """
+    retention_months = settings.AUDIT_RETENTION_MONTHS if retention_months is None else retention_months
+    oldest_kept = _add_months(_current_month(), -retention_months)
+    _lock_partitions(db)
+    partitions = db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'audit_logs'::regclass"
+    )).all()
+
+    dropped = []
+    for name in sorted(partitions):
+        match = _PARTITION_NAME.fullmatch(name)
+        if match and datetime.date(int(match.group(1)), int(match.group(2)), 1) < oldest_kept:
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if AUDIT_DEFAULT_PARTITION in partitions:
+        purged = db.execute(
+            text(f"DELETE FROM {AUDIT_DEFAULT_PARTITION} WHERE created_at < CAST(:oldest AS TIMESTAMPTZ)"),
+            {"oldest": f"{oldest_kept.isoformat()} 00:00:00+00"},
+        ).rowcount
+        if purged:
+            logger.info(f"Purged {purged} expired audit rows from {AUDIT_DEFAULT_PARTITION}")
+    db.commit()
+    return dropped
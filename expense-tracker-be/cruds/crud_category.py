@@ -2,9 +2,12 @@
 from typing import Optional
 
 from sqlalchemy import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from fastapi import HTTPException
+from core.cache import bump_user_data_version
+from cruds import crud_system_counter
 from models import category_model
 import uuid
 
@@ -25,6 +28,7 @@ def create_category(db: Session, user_id: UUID, name: str, type: str, color: str
     )
     db.add(category)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(category)
     return category
 
@@ -46,13 +50,7 @@ def list_all_categories_for_user(db: Session, user_id: UUID, type_filter: str =
     return query.order_by(category_model.Category.user_id.desc(), category_model.Category.name.asc()).all()
 
 
-def get_accessible_category_for_user(db: Session, category_id, user_id, expected_type: Optional[str] = None):
-    """Return a user-owned or default category only when its type matches."""
-    category = (
-        db.query(category_model.Category)
-        .filter(category_model.Category.id == category_id)
-        .first()
-    )
+def _check_category_access(category, user_id, expected_type: Optional[str] = None):
     if not category:
         raise HTTPException(status_code=400, detail="Category not found.")
     if expected_type is not None and category.type != expected_type:
@@ -62,6 +60,24 @@ def get_accessible_category_for_user(db: Session, category_id, user_id, expected
     return category
 
 
+def get_accessible_category_for_user(db: Session, category_id, user_id, expected_type: Optional[str] = None):
+    """Return a user-owned or default category only when its type matches."""
+    category = (
+        db.query(category_model.Category)
+        .filter(category_model.Category.id == category_id)
+        .first()
+    )
+    return _check_category_access(category, user_id, expected_type)
+
+
+async def get_accessible_category_for_user_async(
+        db: AsyncSession, category_id, user_id, expected_type: Optional[str] = None
+):
+    """Async variant of get_accessible_category_for_user."""
+    category = await db.get(category_model.Category, category_id)
+    return _check_category_access(category, user_id, expected_type)
+
+
 def update_category(db: Session, category_id: UUID, user_id: UUID, update_data: dict):
     category = (
         db.query(category_model.Category)
@@ -73,6 +89,7 @@ def update_category(db: Session, category_id: UUID, user_id: UUID, update_data:
     for key, value in update_data.items():
         setattr(category, key, value)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(category)
     return category
 
@@ -85,8 +102,10 @@ def delete_category(db: Session, category_id: UUID, user_id: UUID):
     )
     if not category:
         return None
+    crud_system_counter.track_rollup_removed(db, category_id=category.id)  # Giao dịch bị xóa theo cascade
     db.delete(category)
     db.commit()
+    bump_user_data_version(user_id)
     return category
 
 
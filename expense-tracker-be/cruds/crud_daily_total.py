@@ -0,0 +1,227 @@
+# cruds/crud_daily_total.py
+"""
+Duy trì bảng rollup `user_daily_totals` song song với bảng `transactions`.
+
+Mọi hàm ghi (create/update/delete transaction, income, expense) gọi các helper ở đây
+TRƯỚC khi commit, nên rollup và transaction luôn nằm trong cùng 1 DB transaction.
+Các helper này cũng cập nhật bộ đếm toàn hệ thống (crud_system_counter) cho Admin KPIs.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.cache import bump_global_data_version, bump_user_data_version
+from cruds import crud_system_counter
+from models import daily_total_model, transaction_model
+
+
+def _apply_delta(
+        db: Session,
+        user_id: UUID,
+        txn_date: date,
+        txn_type: str,
+        category_id: UUID,
+        category_name: Optional[str],
+        amount,
+        count: int,
+):
+    """Cộng dồn (hoặc trừ) 1 delta vào dòng rollup tương ứng bằng 1 câu UPSERT."""
+    table = daily_total_model.UserDailyTotal
+    stmt = pg_insert(table).values(
+        user_id=user_id,
+        date=txn_date,
+        type=txn_type,
+        category_id=category_id,
+        category_name=category_name or "",
+        total_amount=amount,
+        transaction_count=count,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.user_id, table.date, table.type, table.category_id, table.category_name],
+        set_={
+            "total_amount": table.total_amount + stmt.excluded.total_amount,
+            "transaction_count": table.transaction_count + stmt.excluded.transaction_count,
+        },
+    ).returning(table.transaction_count)
+
+    remaining = db.execute(stmt).scalar()
+    crud_system_counter.track_transaction_delta(db, user_id, txn_type, amount, count)
+
+    # Ngày/danh mục không còn giao dịch nào -> xóa dòng để biểu đồ không hiện điểm 0 giả.
+    if remaining is not None and remaining <= 0:
+        db.execute(
+            delete(table).where(
+                table.user_id == user_id,
+                table.date == txn_date,
+                table.type == txn_type,
+                table.category_id == category_id,
+                table.category_name == (category_name or ""),
+            )
+        )
+
+
+def add_transaction(db: Session, transaction: transaction_model.Transaction):
+    """Ghi nhận 1 giao dịch mới (hoặc giá trị SAU khi update) vào rollup."""
+    _apply_delta(
+        db,
+        transaction.user_id,
+        transaction.date,
+        transaction.type,
+        transaction.category_id,
+        transaction.category_name,
+        transaction.amount,
+        1,
+    )
+
+
+def remove_transaction(db: Session, transaction: transaction_model.Transaction):
+    """Gỡ 1 giao dịch (hoặc giá trị TRƯỚC khi update) khỏi rollup."""
+    _apply_delta(
+        db,
+        transaction.user_id,
+        transaction.date,
+        transaction.type,
+        transaction.category_id,
+        transaction.category_name,
+        -Decimal(str(transaction.amount)),
+        -1,
+    )
+
+
+ROLLUP_UPSERT_CHUNK = 1000  # 7 tham số/dòng -> luôn dưới giới hạn 32767 tham số của Postgres
+
+
+def add_transactions_bulk(db: Session, transactions) -> None:
+    """
+    Ghi nhận nhiều giao dịch mới vào rollup: gộp theo (user, ngày, loại, danh mục, tên danh mục) trong Python
+    rồi UPSERT nhiều dòng 1 lần, thay vì 1 câu UPSERT cho mỗi giao dịch.
+    """
+    deltas = {}
+    by_type = {}
+    for txn in transactions:
+        key = (txn.user_id, txn.date, txn.type, txn.category_id, txn.category_name or "")
+        amount, count = deltas.get(key, (Decimal(0), 0))
+        deltas[key] = (amount + Decimal(str(txn.amount)), count + 1)
+        amount, count = by_type.get((txn.user_id, txn.type), (Decimal(0), 0))
+        by_type[(txn.user_id, txn.type)] = (amount + Decimal(str(txn.amount)), count + 1)
+
+    table = daily_total_model.UserDailyTotal
+    values = [
+        {"user_id": user_id, "date": txn_date, "type": txn_type, "category_id": category_id,
+         "category_name": category_name, "total_amount": amount, "transaction_count": count}
+        for (user_id, txn_date, txn_type, category_id, category_name), (amount, count) in deltas.items()
+    ]
+    for start in range(0, len(values), ROLLUP_UPSERT_CHUNK):
+        stmt = pg_insert(table).values(values[start:start + ROLLUP_UPSERT_CHUNK])
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.user_id, table.date, table.type, table.category_id, table.category_name],
+                set_={
+                    "total_amount": table.total_amount + stmt.excluded.total_amount,
+                    "transaction_count": table.transaction_count + stmt.excluded.transaction_count,
+                },
+            )
+        )
+    for (user_id, txn_type), (amount, count) in by_type.items():
+        crud_system_counter.track_transaction_delta(db, user_id, txn_type, amount, count)
+
+
+def rebuild_daily_totals(db: Session, user_id: Optional[UUID] = None) -> int:
+    """
+    Tính lại rollup từ bảng transactions (backfill / sửa lệch dữ liệu).
+    Không truyền user_id -> dựng lại toàn bộ bảng.
+    """
+    table = daily_total_model.UserDailyTotal
+    txn = transaction_model.Transaction
+
+    category_name = func.coalesce(txn.category_name, "")
+    delete_stmt = delete(table)
+    source = select(
+        txn.user_id,
+        txn.date,
+        txn.type,
+        txn.category_id,
+        category_name,
+        func.sum(txn.amount),
+        func.count(txn.id),
+    ).group_by(txn.user_id, txn.date, txn.type, txn.category_id, category_name)
+
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(table.user_id == user_id)
+        source = source.where(txn.user_id == user_id)
+
+    db.execute(delete_stmt)
+    result = db.execute(
+        pg_insert(table).from_select(
+            ["user_id", "date", "type", "category_id", "category_name", "total_amount", "transaction_count"],
+            source,
+        )
+    )
+    db.commit()
+    # Rollup dựng lại -> các response cache cũ không còn đúng.
+    if user_id is not None:
+        bump_user_data_version(user_id)
+    else:
+        bump_global_data_version()
+    return result.rowcount
+
+
+# =========================================================
+# 📖 READ HELPERS (dùng chung cho crud_summary / crud_analytics)
+# =========================================================
+
+def _totals_by_type_statement(
+        user_id: UUID,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+):
+    table = daily_total_model.UserDailyTotal
+    stmt = (
+        select(table.type, func.sum(table.total_amount).label("total"))
+        .where(table.user_id == user_id)
+        .group_by(table.type)
+    )
+    if start_date:
+        stmt = stmt.where(table.date >= start_date)
+    if end_date:
+        stmt = stmt.where(table.date <= end_date)
+    return stmt
+
+
+def _split_totals(rows) -> Tuple[Decimal, Decimal]:
+    total_income = Decimal(0)
+    total_expense = Decimal(0)
+    for t_type, t_amount in rows:
+        if t_type == "income":
+            total_income = t_amount or Decimal(0)
+        elif t_type == "expense":
+            total_expense = t_amount or Decimal(0)
+    return total_income, total_expense
+
+
+def get_totals_by_type(
+        db: Session,
+        user_id: UUID,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+) -> Tuple[Decimal, Decimal]:
+    """Trả về (tổng thu, tổng chi) của user trong khoảng ngày (bao gồm 2 đầu)."""
+    rows = db.execute(_totals_by_type_statement(user_id, start_date, end_date)).all()
+    return _split_totals(rows)
+
+
+async def get_totals_by_type_async(
+        db: AsyncSession,
+        user_id: UUID,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+) -> Tuple[Decimal, Decimal]:
+    """Bản async của get_totals_by_type (dùng với get_async_db)."""
+    rows = (await db.execute(_totals_by_type_statement(user_id, start_date, end_date))).all()
+    return _split_totals(rows)
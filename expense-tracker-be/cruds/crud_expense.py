@@ -4,10 +4,14 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
+from core.cache import bump_user_data_version
+from cruds import crud_daily_total
 from cruds.crud_category import get_accessible_category_for_user
+from cruds.crud_transaction import apply_keyset, keyset_page
 from models import category_model, transaction_model, user_model
 
 
@@ -93,7 +97,9 @@ def create_expense(
         note=note,
     )
     db.add(transaction)
+    crud_daily_total.add_transaction(db, transaction)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(transaction)
     return transaction
 
@@ -107,13 +113,13 @@ def list_expenses_for_user(db: Session, user_id: UUID):
 def list_expenses_for_user_filtered(
         db: Session,
         user_id: UUID,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: Optional[int] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         category_id: Optional[UUID] = None,
 ):
-    """List expense transactions for one user with optional filters."""
+    """List expense transactions for one user with optional filters, one keyset page at a time (limit=None -> everything)."""
     user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -134,12 +140,10 @@ def list_expenses_for_user_filtered(
         category = get_accessible_category_for_user(db, category_id, user_id, "expense")
         query = query.filter(transaction_model.Transaction.category_id == category.id)
 
-    query = query.order_by(transaction_model.Transaction.date.desc()).offset(skip)
-    if limit is not None:
-        query = query.limit(limit)
-
+    items, next_cursor = keyset_page(apply_keyset(query, cursor, limit).all(), limit)
     return {
-        "items": query.all(),
+        "items": items,
+        "next_cursor": next_cursor,
         "currency_code": getattr(user, "currency_code", "USD"),
         "currency_symbol": getattr(user, "currency_symbol", "$"),
     }
@@ -177,10 +181,13 @@ def update_expense(db: Session, expense_id: UUID, user_id: UUID, update_data: di
     else:
         update_data.pop("category_id", None)
 
+    crud_daily_total.remove_transaction(db, expense)
     for key, value in update_data.items():
         if hasattr(expense, key):
             setattr(expense, key, value)
+    crud_daily_total.add_transaction(db, expense)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(expense)
     return expense
 
@@ -199,26 +206,37 @@ def delete_expense(db: Session, expense_id: UUID, user_id: UUID):
     if not expense:
         return None
 
+    crud_daily_total.remove_transaction(db, expense)
     db.delete(expense)
     db.commit()
+    bump_user_data_version(user_id)
     return {"message": "Expense deleted successfully"}
 
 
-def get_expense_summary(db: Session, user_id: UUID):
-    """Summarize total expenses by category."""
-    summary = (
-        db.query(
+def _expense_summary_statement(user_id: UUID):
+    return (
+        select(
             transaction_model.Transaction.category_name.label("category_name"),
             func.sum(transaction_model.Transaction.amount).label("total_amount"),
         )
-        .filter(
+        .where(
             transaction_model.Transaction.user_id == user_id,
             transaction_model.Transaction.type == "expense",
         )
         .group_by(transaction_model.Transaction.category_name)
         .order_by(func.sum(transaction_model.Transaction.amount).desc())
-        .all()
     )
+
+
+def get_expense_summary(db: Session, user_id: UUID):
+    """Summarize total expenses by category."""
+    summary = db.execute(_expense_summary_statement(user_id)).all()
+    return [{"category_name": s.category_name, "total_amount": float(s.total_amount)} for s in summary]
+
+
+async def get_expense_summary_async(db: AsyncSession, user_id: UUID):
+    """Async variant of get_expense_summary."""
+    summary = (await db.execute(_expense_summary_statement(user_id))).all()
     return [{"category_name": s.category_name, "total_amount": float(s.total_amount)} for s in summary]
 
 
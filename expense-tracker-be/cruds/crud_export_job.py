@@ -0,0 +1,125 @@
+# cruds/crud_export_job.py
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import export_job_model, user_model
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _stale_before():
+    """Job pending/running tạo trước mốc này coi như đã chết (worker crash/restart)."""
+    return _now() - timedelta(minutes=settings.EXPORT_JOB_TIMEOUT_MINUTES)
+
+
+def create_export_job(db: Session, user_id: UUID, export_format: str, filters: dict):
+    """Tạo job mới nếu user chưa vượt EXPORT_MAX_ACTIVE_JOBS_PER_USER (429 nếu vượt)."""
+    job_model = export_job_model.ExportJob
+
+    # Khóa dòng user để 2 request song song không cùng lọt qua bước đếm.
+    db.execute(select(user_model.User.id).where(user_model.User.id == user_id).with_for_update())
+    active_jobs = db.scalar(
+        select(func.count(job_model.id)).where(
+            job_model.user_id == user_id,
+            job_model.status.in_(ACTIVE_STATUSES),
+            job_model.created_at >= _stale_before(),
+        )
+    )
+    if active_jobs >= settings.EXPORT_MAX_ACTIVE_JOBS_PER_USER:
+        db.rollback()
+        raise HTTPException(
+            status_code=429,
+            detail=f"You already have {active_jobs} export(s) in progress. Please wait for them to finish.",
+        )
+
+    job = job_model(user_id=user_id, format=export_format, filters=filters, status="pending")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_export_job_for_user(db: Session, job_id: UUID, user_id: UUID):
+    job = db.get(export_job_model.ExportJob, job_id)
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+# =========================================================
+# ⚙️ CẬP NHẬT TRẠNG THÁI (dùng trong worker Celery)
+# =========================================================
+
+def mark_running(db: Session, job, total_rows: int):
+    job.status = "running"
+    job.started_at = _now()
+    job.total_rows = total_rows
+    job.processed_rows = 0
+    db.commit()
+
+
+def update_progress(db: Session, job, processed_rows: int):
+    job.processed_rows = processed_rows
+    db.commit()
+
+
+def mark_completed(db: Session, job, storage_key: str, file_name: str, file_size: int, processed_rows: int):
+    job.status = "completed"
+    job.storage_key = storage_key
+    job.file_name = file_name
+    job.file_size = file_size
+    job.processed_rows = processed_rows
+    job.finished_at = _now()
+    job.expires_at = job.finished_at + timedelta(hours=settings.EXPORT_RESULT_TTL_HOURS)
+    db.commit()
+
+
+def mark_failed(db: Session, job, error: str):
+    job.status = "failed"
+    job.error = error[:500]
+    job.finished_at = _now()
+    db.commit()
+
+
+def expire_export_jobs(db: Session, storage) -> int:
+    """
+    Dọn dẹp định kỳ: xóa file đã hết hạn (status -> expired) và đánh dấu failed
+    các job kẹt ở pending/running quá EXPORT_JOB_TIMEOUT_MINUTES. Trả về số job đã xử lý.
+    """
+    job_model = export_job_model.ExportJob
+    expired = db.scalars(
+        select(job_model).where(job_model.status == "completed", job_model.expires_at < _now())
+    ).all()
+    for job in expired:
+        if job.storage_key:
+            storage.delete(job.storage_key)
+        job.status = "expired"
+        job.storage_key = None
+
+    stale = db.scalars(
+        select(job_model).where(job_model.status.in_(ACTIVE_STATUSES), job_model.created_at < _stale_before())
+    ).all()
+    for job in stale:
+        job.status = "failed"
+        job.error = "Export timed out"
+        job.finished_at = _now()
+
+    db.commit()
+    return len(expired) + len(stale)
+
+
+def job_progress(job) -> float:
+    if job.status == "completed":
+        return 100.0
+    if not job.total_rows:
+        return 0.0
+    return round(min(job.processed_rows / job.total_rows, 1) * 100, 1)
@@ -7,7 +7,10 @@ from fastapi import HTTPException
 from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
+from core.cache import bump_user_data_version
+from cruds import crud_daily_total
 from cruds.crud_category import get_accessible_category_for_user
+from cruds.crud_transaction import apply_keyset, keyset_page
 from models import category_model, transaction_model, user_model
 
 
@@ -89,7 +92,9 @@ def create_income(
         note=note,
     )
     db.add(transaction)
+    crud_daily_total.add_transaction(db, transaction)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(transaction)
     return transaction
 
@@ -102,13 +107,13 @@ def list_incomes_for_user(db: Session, user_id: UUID):
 def list_incomes_for_user_filtered(
         db: Session,
         user_id: UUID,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: Optional[int] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         category_id: Optional[UUID] = None,
 ):
-    """List income transactions for one user with optional filters."""
+    """List income transactions for one user with optional filters, one keyset page at a time (limit=None -> everything)."""
     user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -129,12 +134,10 @@ def list_incomes_for_user_filtered(
         category = get_accessible_category_for_user(db, category_id, user_id, "income")
         query = query.filter(transaction_model.Transaction.category_id == category.id)
 
-    query = query.order_by(transaction_model.Transaction.date.desc()).offset(skip)
-    if limit is not None:
-        query = query.limit(limit)
-
+    items, next_cursor = keyset_page(apply_keyset(query, cursor, limit).all(), limit)
     return {
-        "items": query.all(),
+        "items": items,
+        "next_cursor": next_cursor,
         "currency_code": getattr(user, "currency_code", "USD"),
         "currency_symbol": getattr(user, "currency_symbol", "$"),
     }
@@ -172,10 +175,13 @@ def update_income(db: Session, income_id: UUID, user_id: UUID, update_data: dict
     else:
         update_data.pop("category_id", None)
 
+    crud_daily_total.remove_transaction(db, income)
     for key, value in update_data.items():
         if hasattr(income, key):
             setattr(income, key, value)
+    crud_daily_total.add_transaction(db, income)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(income)
     return income
 
@@ -193,8 +199,10 @@ def delete_income(db: Session, income_id: UUID, user_id: UUID):
     )
     if not income:
         return None
+    crud_daily_total.remove_transaction(db, income)
     db.delete(income)
     db.commit()
+    bump_user_data_version(user_id)
     return income
 
 
@@ -2,7 +2,10 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
+from core.cache import invalidate_auth_user_cache
+from cruds import crud_system_counter
 from models import user_model  # Giả sử model User của bạn ở đây
+from services import session_registry
 from schemas.security_schemas import SecuritySettingsUpdate
 # --- Logic cho 2FA (Sẽ phức tạp hơn, đây là bản cơ bản) ---
 # Bạn sẽ cần thư viện: pip install pyotp
@@ -29,12 +32,19 @@ def update_user_security_settings(db: Session, user_id: UUID, settings: Security
         return None
 
     update_data = settings.model_dump(exclude_unset=True)
+    single_device_enabled = bool(update_data.get("restrict_multi_device")) and not user.restrict_multi_device
 
     for key, value in update_data.items():
+        if key == "is_2fa_enabled":
+            crud_system_counter.track_2fa_change(db, user, value)
         setattr(user, key, value)
 
     db.commit()
     db.refresh(user)
+    invalidate_auth_user_cache(user.id)
+    if single_device_enabled:
+        # Vừa bật Single Device: chỉ giữ lại phiên đăng nhập mới nhất
+        session_registry.revoke_user_sessions(user.id, keep=user.last_session_key)
     return user
 
 
@@ -47,6 +57,7 @@ def enable_2fa_generate_secret(db: Session, user_id: UUID):
     secret = pyotp.random_base32()
     user.otp_secret = secret
     db.commit()
+    invalidate_auth_user_cache(user.id)
 
     qr_url = pyotp.totp.TOTP(secret).provisioning_uri(
         name=user.email,
@@ -64,8 +75,10 @@ def enable_2fa_verify_code(db: Session, user_id: UUID, code: str):
     totp = pyotp.TOTP(user.otp_secret)
     # Đã có valid_window=1 ở đây là TỐT
     if totp.verify(code, valid_window=1):
+        crud_system_counter.track_2fa_change(db, user, True)
         user.is_2fa_enabled = True
         db.commit()
+        invalidate_auth_user_cache(user.id)
         return True
     else:
         return False
@@ -1,10 +1,13 @@
 # crud_summary.py
 from decimal import Decimal
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
-from sqlalchemy import func, desc
-from models import transaction_model, category_model, income_model, expense_model
+from sqlalchemy import func, desc, select, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from models import transaction_model, category_model, income_model, expense_model, daily_total_model
+from cruds import crud_daily_total
 from datetime import datetime, timedelta, date
 # Giả sử crud_income và crud_expense đã được import để lấy các hàm summary
 # from .crud_income import get_income_summary
@@ -14,20 +17,7 @@ from datetime import datetime, timedelta, date
 # và giả sử các hàm get_income_summary/get_expense_summary đã được định nghĩa
 # hoặc import đúng cách nếu sử dụng dashboard.
 
-def get_financial_summary_from_transactions(db: Session, user_id: UUID):
-    """Tính tổng thu nhập, chi tiêu và số dư (dùng bảng Transaction)."""
-    total_income = (
-        db.query(func.sum(transaction_model.Transaction.amount))
-        .filter(transaction_model.Transaction.user_id == user_id, transaction_model.Transaction.type == "income")
-        .scalar()
-        or 0
-    )
-    total_expense = (
-        db.query(func.sum(transaction_model.Transaction.amount))
-        .filter(transaction_model.Transaction.user_id == user_id, transaction_model.Transaction.type == "expense")
-        .scalar()
-        or 0
-    )
+def _financial_summary(total_income, total_expense):
     balance = float(total_income) - float(total_expense)
     return {
         "total_income": float(total_income),
@@ -36,18 +26,37 @@ def get_financial_summary_from_transactions(db: Session, user_id: UUID):
     }
 
 
-def get_expense_by_category(db: Session, user_id: UUID):
-    """Tính tổng chi tiêu theo Category (dùng bảng Transaction)."""
-    result = (
-        db.query(
+def get_financial_summary_from_transactions(db: Session, user_id: UUID):
+    """Tính tổng thu nhập, chi tiêu và số dư (đọc từ rollup user_daily_totals)."""
+    total_income, total_expense = crud_daily_total.get_totals_by_type(db, user_id)
+    return _financial_summary(total_income, total_expense)
+
+
+async def get_financial_summary_from_transactions_async(db: AsyncSession, user_id: UUID):
+    total_income, total_expense = await crud_daily_total.get_totals_by_type_async(db, user_id)
+    return _financial_summary(total_income, total_expense)
+
+
+def _expense_by_category_statement(user_id: UUID):
+    return (
+        select(
             category_model.Category.name,
             func.sum(transaction_model.Transaction.amount).label("total_amount")
         )
         .join(transaction_model.Transaction, transaction_model.Transaction.category_id == category_model.Category.id)
-        .filter(transaction_model.Transaction.user_id == user_id, transaction_model.Transaction.type == "expense")
+        .where(transaction_model.Transaction.user_id == user_id, transaction_model.Transaction.type == "expense")
         .group_by(category_model.Category.name)
-        .all()
     )
+
+
+def get_expense_by_category(db: Session, user_id: UUID):
+    """Tính tổng chi tiêu theo Category (dùng bảng Transaction)."""
+    result = db.execute(_expense_by_category_statement(user_id)).all()
+    return [{"category": r[0], "total": float(r[1])} for r in result]
+
+
+async def get_expense_by_category_async(db: AsyncSession, user_id: UUID):
+    result = (await db.execute(_expense_by_category_statement(user_id))).all()
     return [{"category": r[0], "total": float(r[1])} for r in result]
 
 
@@ -310,7 +319,9 @@ def get_monthly_summary(db: Session, user_id: UUID, year: int):
         )
         .filter(
             transaction_model.Transaction.user_id == user_id,
-            func.extract("year", transaction_model.Transaction.date) == year,
+            # Lọc theo khoảng ngày (không bọc cột bằng extract) để dùng được ix_transactions_user_type_date.
+            transaction_model.Transaction.date >= date(year, 1, 1),
+            transaction_model.Transaction.date < date(year + 1, 1, 1),
         )
         .group_by(func.date_trunc("month", transaction_model.Transaction.date))
         .order_by("month")
@@ -326,38 +337,35 @@ def get_monthly_summary(db: Session, user_id: UUID, year: int):
     ]
 
 
+def _month_bounds(year: int, month: int):
+    """Trả về (ngày đầu tháng, ngày đầu tháng kế tiếp)."""
+    start_date = date(year, month, 1)
+    if month == 12:
+        return start_date, date(year + 1, 1, 1)
+    return start_date, date(year, month + 1, 1)
+
+
 def get_monthly_budget_status(db: Session, user_id: UUID, year: int | None = None, month: int | None = None):
     """
     Budget status helper for dashboard.
     - monthly_budget = budget_limit
-    - spent_this_month = sum(expense amounts) for current month
+    - spent_this_month = sum(expense amounts) for current month (đọc từ rollup theo ngày)
     - remaining_budget = budget_limit - spent_this_month
     - NO DB mutation
     """
     from models import user_model
 
-    now = datetime.utcnow().date()
+    now = date.today()
     year = year or now.year
     month = month or now.month
 
     user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
-    budget_limit = float(getattr(user, "budget_limit", 0) or 0)
+    budget_limit = float(getattr(user, "monthly_budget", 0) or 0)
 
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1)
-    else:
-        end_date = date(year, month + 1, 1)
+    start_date, end_date = _month_bounds(year, month)
 
-    spent_this_month = (
-        db.query(func.coalesce(func.sum(transaction_model.Transaction.amount), 0))
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
-            transaction_model.Transaction.date >= start_date,
-            transaction_model.Transaction.date < end_date,
-        )
-        .scalar()
+    _, spent_this_month = crud_daily_total.get_totals_by_type(
+        db, user_id, start_date=start_date, end_date=end_date - timedelta(days=1)
     )
 
     spent_this_month = float(spent_this_month or 0)
@@ -370,170 +378,208 @@ def get_monthly_budget_status(db: Session, user_id: UUID, year: int | None = Non
     }
 
 
-def get_dashboard_data(db: Session, user_id: UUID):
-    from models import user_model
+def _daily_series(user_id: UUID, txn_type: str):
+    """SELECT tổng tiền theo ngày của 1 loại giao dịch, đọc từ rollup (gộp mọi danh mục)."""
+    return (
+        select(
+            daily_total_model.UserDailyTotal.date.label("date"),
+            func.sum(daily_total_model.UserDailyTotal.total_amount).label("total"),
+        )
+        .where(
+            daily_total_model.UserDailyTotal.user_id == user_id,
+            daily_total_model.UserDailyTotal.type == txn_type,
+        )
+        .group_by(daily_total_model.UserDailyTotal.date)
+    )
 
-    user = db.query(user_model.User).filter(user_model.User.id == user_id).first()
 
-    total_income = (
-        db.query(func.coalesce(func.sum(transaction_model.Transaction.amount), 0))
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "income",
+def _json_rows(cte, *order_by):
+    """Gom toàn bộ dòng của 1 CTE thành 1 mảng JSON (rỗng -> '[]') để trả về trong cùng câu SELECT."""
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(literal_column(cte.name), *order_by)),
+                literal_column("'[]'::json"),
+            )
         )
-        .scalar()
+        .select_from(cte)
+        .scalar_subquery()
     )
-    total_expense = (
-        db.query(func.coalesce(func.sum(transaction_model.Transaction.amount), 0))
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
+
+
+def _dashboard_statement(user_id: UUID, month_start: date, next_month_start: date):
+    """
+    Dựng 1 câu SQL (nhiều CTE) trả về toàn bộ payload của DashboardResponse:
+    tổng thu/chi + chi tiêu tháng này (rollup), 10 giao dịch gần nhất, 2 biểu đồ 30 ngày,
+    tiền tệ và hạn mức của user. Dashboard chỉ tốn 1 round trip tới DB.
+    """
+    from models import user_model
+
+    txn = transaction_model.Transaction
+    rollup = daily_total_model.UserDailyTotal
+    user = user_model.User
+
+    totals = (
+        select(
+            func.coalesce(func.sum(rollup.total_amount).filter(rollup.type == "income"), 0).label("total_income"),
+            func.coalesce(func.sum(rollup.total_amount).filter(rollup.type == "expense"), 0).label("total_expense"),
+            func.coalesce(
+                func.sum(rollup.total_amount).filter(
+                    rollup.type == "expense",
+                    rollup.date >= month_start,
+                    rollup.date < next_month_start,
+                ),
+                0,
+            ).label("spent_this_month"),
         )
-        .scalar()
+        .where(rollup.user_id == user_id)
+        .cte("totals")
     )
-    balance = float(total_income) - float(total_expense)
 
-    recent_transactions = (
-        db.query(transaction_model.Transaction)
-        .filter(transaction_model.Transaction.user_id == user_id)
-        .order_by(
-            transaction_model.Transaction.date.desc(),
-            transaction_model.Transaction.created_at.desc(),
+    recent = (
+        select(
+            txn.id,
+            txn.type,
+            txn.emoji,
+            txn.amount,
+            txn.currency_code,
+            txn.date,
+            txn.category_name,
+            txn.note,
+            txn.created_at,
         )
+        .where(txn.user_id == user_id)
+        .order_by(txn.date.desc(), txn.created_at.desc())
         .limit(10)
-        .all()
+        .cte("recent")
     )
 
-    income_chart = (
-        db.query(
-            transaction_model.Transaction.date,
-            func.sum(transaction_model.Transaction.amount).label("total"),
-        )
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "income",
-        )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.desc())
-        .limit(30)
-        .all()
-    )
-    expense_chart = (
-        db.query(
-            transaction_model.Transaction.date,
-            func.sum(transaction_model.Transaction.amount).label("total"),
-        )
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
+    def _chart(txn_type: str):
+        return (
+            select(rollup.date.label("date"), func.sum(rollup.total_amount).label("total"))
+            .where(rollup.user_id == user_id, rollup.type == txn_type)
+            .group_by(rollup.date)
+            .order_by(rollup.date.desc())
+            .limit(30)
+            .cte(f"{txn_type}_chart")
         )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.desc())
-        .limit(30)
-        .all()
-    )
 
-    monthly_budget_status = get_monthly_budget_status(db=db, user_id=user_id)
+    income_chart = _chart("income")
+    expense_chart = _chart("expense")
+
+    return select(
+        totals.c.total_income,
+        totals.c.total_expense,
+        totals.c.spent_this_month,
+        select(user.currency_code).where(user.id == user_id).scalar_subquery().label("currency"),
+        select(user.monthly_budget).where(user.id == user_id).scalar_subquery().label("budget_limit"),
+        _json_rows(recent, recent.c.date.desc(), recent.c.created_at.desc()).label("recent_transactions"),
+        _json_rows(income_chart, income_chart.c.date.desc()).label("income_chart"),
+        _json_rows(expense_chart, expense_chart.c.date.desc()).label("expense_chart"),
+    ).select_from(totals)
+
+
+def _current_dashboard_statement(user_id: UUID):
+    # Ngày local như phần còn lại của dashboard và key của cached_response (tránh lệch tháng quanh nửa đêm UTC).
+    now = date.today()
+    month_start, next_month_start = _month_bounds(now.year, now.month)
+    return _dashboard_statement(user_id, month_start, next_month_start)
+
+
+def _dashboard_payload(row):
+    total_income = float(row.total_income or 0)
+    total_expense = float(row.total_expense or 0)
+    balance = total_income - total_expense
+    budget_limit = float(row.budget_limit or 0)
+    spent_this_month = float(row.spent_this_month or 0)
 
     return {
         "summary": {
-            "total_income": float(total_income or 0),
-            "total_expense": float(total_expense or 0),
+            "total_income": total_income,
+            "total_expense": total_expense,
             "total_balance": balance,
             "is_positive": balance >= 0,
-            "currency": getattr(user, "currency_code", "USD"),
+            "currency": row.currency or "USD",
             # Phase 4 budget status (read-only)
-            "budget_limit": monthly_budget_status["budget_limit"],
-            "spent_this_month": monthly_budget_status["spent_this_month"],
-            "remaining_budget": monthly_budget_status["remaining_budget"],
+            "budget_limit": budget_limit,
+            "spent_this_month": spent_this_month,
+            "remaining_budget": budget_limit - spent_this_month,
         },
-        "recent_transactions": recent_transactions,
-        "income_chart": [{"date": row.date, "total": float(row.total or 0)} for row in income_chart],
-        "expense_chart": [{"date": row.date, "total": float(row.total or 0)} for row in expense_chart],
+        "recent_transactions": row.recent_transactions,
+        "income_chart": [{"date": point["date"], "total": float(point["total"] or 0)} for point in row.income_chart],
+        "expense_chart": [{"date": point["date"], "total": float(point["total"] or 0)} for point in row.expense_chart],
     }
 
 
-def get_analytics_trends_data(db: Session, user_id: UUID):
-    income_data = (
-        db.query(
-            transaction_model.Transaction.date,
-            func.sum(transaction_model.Transaction.amount).label("total"),
-        )
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "income",
-        )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.asc())
+def get_dashboard_data(db: Session, user_id: UUID):
+    row = db.execute(_current_dashboard_statement(user_id)).one()
+    return _dashboard_payload(row)
+
+
+async def get_dashboard_data_async(db: AsyncSession, user_id: UUID):
+    row = (await db.execute(_current_dashboard_statement(user_id))).one()
+    return _dashboard_payload(row)
+
+
+def _trend_statements(user_id: UUID):
+    income_stmt = (
+        _daily_series(user_id, "income")
+        .order_by(daily_total_model.UserDailyTotal.date.asc())
         .limit(60)
-        .all()
     )
-
-    expense_data = (
-        db.query(
-            transaction_model.Transaction.date,
-            func.sum(transaction_model.Transaction.amount).label("total"),
-        )
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
-        )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.asc())
+    expense_stmt = (
+        _daily_series(user_id, "expense")
+        .order_by(daily_total_model.UserDailyTotal.date.asc())
         .limit(60)
-        .all()
     )
+    return income_stmt, expense_stmt
 
+
+def _trends_payload(income_data, expense_data):
     return {
         "income_trend": [{"date": str(row.date), "amount": float(row.total or 0)} for row in income_data],
         "expense_trend": [{"date": str(row.date), "amount": float(row.total or 0)} for row in expense_data],
     }
 
 
-def get_expense_daily_trend(db: Session, user_id: UUID, days: int = 30):
-    start_date = date.today() - timedelta(days=days - 1)
+def get_analytics_trends_data(db: Session, user_id: UUID):
+    income_stmt, expense_stmt = _trend_statements(user_id)
+    return _trends_payload(db.execute(income_stmt).all(), db.execute(expense_stmt).all())
 
-    expense_data = (
-        db.query(
-            transaction_model.Transaction.date.label("date"),
-            func.sum(transaction_model.Transaction.amount).label("total_amount"),
-        )
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
-            transaction_model.Transaction.date >= start_date,
-        )
-        .group_by(transaction_model.Transaction.date)
-        .order_by(transaction_model.Transaction.date.asc())
-        .all()
+
+async def get_analytics_trends_data_async(db: AsyncSession, user_id: UUID):
+    income_stmt, expense_stmt = _trend_statements(user_id)
+    income_data = (await db.execute(income_stmt)).all()
+    expense_data = (await db.execute(expense_stmt)).all()
+    return _trends_payload(income_data, expense_data)
+
+
+def _expense_daily_trend_statement(user_id: UUID, days: int):
+    start_date = date.today() - timedelta(days=days - 1)
+    return (
+        _daily_series(user_id, "expense")
+        .where(daily_total_model.UserDailyTotal.date >= start_date)
+        .order_by(daily_total_model.UserDailyTotal.date.asc())
     )
 
+
+def get_expense_daily_trend(db: Session, user_id: UUID, days: int = 30):
+    expense_data = db.execute(_expense_daily_trend_statement(user_id, days)).all()
     return [
-        {"date": row.date, "total_amount": float(row.total_amount or 0)}
+        {"date": row.date, "total_amount": float(row.total or 0)}
         for row in expense_data
     ]
 
 
-def get_financial_kpi_summary(db: Session, user_id: UUID):
-    total_income = (
-        db.query(func.sum(transaction_model.Transaction.amount))
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "income",
-        )
-        .scalar()
-        or Decimal(0)
-    )
-    total_expense = (
-        db.query(func.sum(transaction_model.Transaction.amount))
-        .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
-        )
-        .scalar()
-        or Decimal(0)
-    )
+async def get_expense_daily_trend_async(db: AsyncSession, user_id: UUID, days: int = 30):
+    expense_data = (await db.execute(_expense_daily_trend_statement(user_id, days))).all()
+    return [
+        {"date": row.date, "total_amount": float(row.total or 0)}
+        for row in expense_data
+    ]
 
+
+def _kpi_summary(total_income, total_expense):
     return {
         "total_income": total_income,
         "total_expense": total_expense,
@@ -542,29 +588,20 @@ def get_financial_kpi_summary(db: Session, user_id: UUID):
     }
 
 
+def get_financial_kpi_summary(db: Session, user_id: UUID):
+    total_income, total_expense = crud_daily_total.get_totals_by_type(db, user_id)
+    return _kpi_summary(total_income, total_expense)
+
+
+async def get_financial_kpi_summary_async(db: AsyncSession, user_id: UUID):
+    total_income, total_expense = await crud_daily_total.get_totals_by_type_async(db, user_id)
+    return _kpi_summary(total_income, total_expense)
+
+
 def get_period_summary(db: Session, user_id, start_date: date, end_date: date):
     try:
-        total_income = (
-            db.query(func.sum(transaction_model.Transaction.amount))
-            .filter(
-                transaction_model.Transaction.user_id == user_id,
-                transaction_model.Transaction.type == "income",
-                transaction_model.Transaction.date >= start_date,
-                transaction_model.Transaction.date <= end_date,
-            )
-            .scalar()
-            or Decimal(0)
-        )
-        total_expense = (
-            db.query(func.sum(transaction_model.Transaction.amount))
-            .filter(
-                transaction_model.Transaction.user_id == user_id,
-                transaction_model.Transaction.type == "expense",
-                transaction_model.Transaction.date >= start_date,
-                transaction_model.Transaction.date <= end_date,
-            )
-            .scalar()
-            or Decimal(0)
+        total_income, total_expense = crud_daily_total.get_totals_by_type(
+            db, user_id, start_date=start_date, end_date=end_date
         )
 
         return {
@@ -584,17 +621,17 @@ def get_period_summary(db: Session, user_id, start_date: date, end_date: date):
 def get_period_breakdown(db: Session, user_id, start_date: date, end_date: date):
     results = (
         db.query(
-            transaction_model.Transaction.category_name,
-            func.sum(transaction_model.Transaction.amount).label("total"),
+            daily_total_model.UserDailyTotal.category_name,
+            func.sum(daily_total_model.UserDailyTotal.total_amount).label("total"),
         )
         .filter(
-            transaction_model.Transaction.user_id == user_id,
-            transaction_model.Transaction.type == "expense",
-            transaction_model.Transaction.date >= start_date,
-            transaction_model.Transaction.date <= end_date,
+            daily_total_model.UserDailyTotal.user_id == user_id,
+            daily_total_model.UserDailyTotal.type == "expense",
+            daily_total_model.UserDailyTotal.date >= start_date,
+            daily_total_model.UserDailyTotal.date <= end_date,
         )
-        .group_by(transaction_model.Transaction.category_name)
-        .order_by(func.sum(transaction_model.Transaction.amount).desc())
+        .group_by(daily_total_model.UserDailyTotal.category_name)
+        .order_by(func.sum(daily_total_model.UserDailyTotal.total_amount).desc())
         .all()
     )
 
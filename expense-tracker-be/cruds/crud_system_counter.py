@@ -0,0 +1,147 @@
+# cruds/crud_system_counter.py
+"""
+Bộ đếm toàn hệ thống (bảng `system_counters`) cho Admin KPIs.
+
+Mọi thao tác ghi user / 2FA / transaction cộng delta vào đây TRƯỚC khi commit (cùng DB transaction),
+nên /admin/kpis chỉ đọc vài dòng thay vì SUM cả bảng transactions và COUNT cả bảng users.
+Giao dịch chỉ đi qua crud_daily_total (rollup) -> hook ở đó là đủ cho mọi đường ghi giao dịch.
+Lệch (xóa cascade, sửa tay trong DB...) được job reconcile_system_counters sửa định kỳ.
+Cùng các hook đó cũng cập nhật rollup daily_signups (biểu đồ tăng trưởng user).
+"""
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import daily_total_model, system_model, transaction_model, user_model
+
+logger = logging.getLogger(__name__)
+
+USERS = "users"
+USERS_2FA = "users_2fa"
+TRANSACTIONS = "transactions"
+TOTAL_BY_TYPE = {"income": "income_total", "expense": "expense_total"}
+COUNTER_SHARDS = 16  # Số dòng mỗi bộ đếm: giảm tranh chấp khóa khi nhiều user ghi cùng lúc
+
+
+def _shard(key: Optional[UUID]) -> int:
+    return key.int % COUNTER_SHARDS if key is not None else 0
+
+
+def add_counters(db: Session, deltas: Dict[str, Decimal], shard_key: Optional[UUID] = None) -> None:
+    """Cộng delta vào các bộ đếm (1 câu UPSERT nhiều dòng), không commit."""
+    values = [
+        {"name": name, "shard": _shard(shard_key), "value": delta}
+        for name, delta in deltas.items() if delta
+    ]
+    if not values:
+        return
+    table = system_model.SystemCounter
+    stmt = pg_insert(table).values(values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.name, table.shard],
+        set_={"value": table.value + stmt.excluded.value},
+    ))
+
+
+def _add_daily_signups(db: Session, day: date, delta: int) -> None:
+    table = system_model.DailySignup
+    stmt = pg_insert(table).values(date=day, count=delta)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.date],
+        set_={"count": table.count + stmt.excluded.count},
+    ))
+
+
+def track_transaction_delta(db: Session, user_id: UUID, txn_type: str, amount, count: int) -> None:
+    """Gọi từ crud_daily_total cùng lúc với rollup (amount/count âm khi xóa)."""
+    add_counters(db, {TOTAL_BY_TYPE[txn_type]: Decimal(str(amount)), TRANSACTIONS: count}, user_id)
+
+
+def track_user_created(db: Session, user: user_model.User) -> None:
+    add_counters(db, {USERS: 1, USERS_2FA: 1 if user.is_2fa_enabled else 0}, user.id)
+    # created_at do DB gán (server_default now()) -> ngày UTC hiện tại là ngày đăng ký.
+    _add_daily_signups(db, datetime.now(timezone.utc).date(), 1)
+
+
+def track_2fa_change(db: Session, user: user_model.User, enabled: bool) -> None:
+    """Gọi TRƯỚC khi gán user.is_2fa_enabled = enabled (chỉ đếm khi trạng thái thật sự đổi)."""
+    if bool(user.is_2fa_enabled) != bool(enabled):
+        add_counters(db, {USERS_2FA: 1 if enabled else -1}, user.id)
+
+
+def track_rollup_removed(db: Session, user_id: Optional[UUID] = None, category_id: Optional[UUID] = None) -> None:
+    """
+    Trừ các giao dịch sắp bị xóa theo cascade (xóa user / category) khỏi bộ đếm:
+    đọc từ rollup user_daily_totals nên không phải quét bảng transactions.
+    """
+    table = daily_total_model.UserDailyTotal
+    stmt = select(table.type, func.sum(table.total_amount), func.sum(table.transaction_count)).group_by(table.type)
+    if user_id is not None:
+        stmt = stmt.where(table.user_id == user_id)
+    if category_id is not None:
+        stmt = stmt.where(table.category_id == category_id)
+    for txn_type, amount, count in db.execute(stmt).all():
+        track_transaction_delta(db, user_id, txn_type, -(amount or 0), -(count or 0))
+
+
+def track_user_deleted(db: Session, user: user_model.User) -> None:
+    add_counters(db, {USERS: -1, USERS_2FA: -1 if user.is_2fa_enabled else 0}, user.id)
+    track_rollup_removed(db, user_id=user.id)
+    if user.created_at is not None:
+        _add_daily_signups(db, user.created_at.astimezone(timezone.utc).date(), -1)
+
+
+def get_counters(db: Session) -> Dict[str, Decimal]:
+    """Giá trị hiện tại của mọi bộ đếm: quét tối đa (số bộ đếm x COUNTER_SHARDS) dòng."""
+    table = system_model.SystemCounter
+    rows = db.execute(select(table.name, func.sum(table.value)).group_by(table.name)).all()
+    return {name: value or Decimal(0) for name, value in rows}
+
+
+def _actual_counters(db: Session) -> Dict[str, Decimal]:
+    user = user_model.User
+    txn = transaction_model.Transaction
+    actual = {
+        USERS: Decimal(db.scalar(select(func.count(user.id))) or 0),
+        USERS_2FA: Decimal(db.scalar(select(func.count(user.id)).where(user.is_2fa_enabled.is_(True))) or 0),
+        TRANSACTIONS: Decimal(0),
+        **{name: Decimal(0) for name in TOTAL_BY_TYPE.values()},
+    }
+    for txn_type, amount, count in db.execute(
+        select(txn.type, func.sum(txn.amount), func.count(txn.id)).group_by(txn.type)
+    ).all():
+        if txn_type in TOTAL_BY_TYPE:
+            actual[TOTAL_BY_TYPE[txn_type]] = amount or Decimal(0)
+            actual[TRANSACTIONS] += count
+    return actual
+
+
+def reconcile_system_counters(db: Session) -> Dict[str, Decimal]:
+    """
+    Job định kỳ: so bộ đếm với dữ liệu thật và cộng phần lệch vào shard 0.
+    Cả 2 phía được đọc trong CÙNG 1 snapshot (REPEATABLE READ) -> phần lệch tính ra không lẫn các giao dịch
+    đang ghi song song; ghi phần lệch là phép CỘNG nên không đè mất delta của các giao dịch đó.
+    Trả về {tên bộ đếm: phần lệch đã sửa}.
+    """
+    db.rollback()
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    try:
+        actual = _actual_counters(db)
+        current = get_counters(db)
+    finally:
+        db.rollback()  # Kết thúc snapshot; connection trả về pool với isolation level mặc định
+
+    drift = {name: value - current.get(name, Decimal(0)) for name, value in actual.items()}
+    drift = {name: delta for name, delta in drift.items() if delta}
+    if drift:
+        logger.warning(f"System counters drifted, correcting: {drift}")
+        add_counters(db, drift)
+        db.commit()
+    return drift
+
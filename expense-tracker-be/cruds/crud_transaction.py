@@ -1,14 +1,24 @@
+from collections import Counter
 from datetime import date
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import desc
+from sqlalchemy import and_, desc, func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from cruds.crud_category import get_accessible_category_for_user
-from models import transaction_model
+from core.cache import bump_user_data_version
+from core.config import settings
+from core.pagination import decode_cursor, encode_cursor
+from cruds import crud_daily_total
+from cruds.crud_category import (
+    _check_category_access,
+    get_accessible_category_for_user,
+    get_accessible_category_for_user_async,
+)
+from models import category_model, transaction_model
 
 
 ALLOWED_TRANSACTION_TYPES = {"income", "expense"}
@@ -47,57 +57,307 @@ def create_transaction(
         date=transaction_date or date.today(),
     )
     db.add(transaction)
+    crud_daily_total.add_transaction(db, transaction)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(transaction)
     return transaction
 
 
+# =========================================================
+# 📦 BULK INSERT (chat create_batch_transactions, POST /transactions/bulk)
+# =========================================================
+
+def _validate_bulk_items(items: List[Dict]) -> None:
+    if not items:
+        raise HTTPException(status_code=400, detail="No transactions to create.")
+    if len(items) > settings.TRANSACTION_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.TRANSACTION_BULK_MAX_ROWS} transactions per request.",
+        )
+    for index, item in enumerate(items):
+        if item.get("type") not in ALLOWED_TRANSACTION_TYPES:
+            raise HTTPException(status_code=400, detail=f"Row {index}: type must be 'income' or 'expense'.")
+        if Decimal(str(item.get("amount") or 0)) <= 0:
+            raise HTTPException(status_code=400, detail=f"Row {index}: amount must be greater than 0.")
+        if not item.get("category_id") and not (item.get("category_name") or "").strip():
+            raise HTTPException(status_code=400, detail=f"Row {index}: category ID or category name is required.")
+
+
+def _name_key(item: Dict):
+    return item["category_name"].strip().lower(), item["type"]
+
+
+def _resolve_bulk_categories(db: Session, user_id: UUID, items: List[Dict]) -> List:
+    """
+    Tìm category cho mọi dòng bằng 1 câu SELECT (theo id, hoặc tên không phân biệt hoa thường + loại;
+    category của user được ưu tiên hơn category mặc định). Tên chưa có -> tạo bằng 1 câu INSERT ... RETURNING.
+    """
+    category = category_model.Category
+    ids = {item["category_id"] for item in items if item.get("category_id")}
+    names = {_name_key(item) for item in items if not item.get("category_id")}
+
+    conditions = []
+    if ids:
+        conditions.append(category.id.in_(ids))
+    if names:
+        conditions.append(and_(
+            or_(category.user_id == user_id, category.user_id.is_(None)),
+            tuple_(func.lower(category.name), category.type).in_(names),
+        ))
+    found = db.scalars(select(category).where(or_(*conditions))).all()
+
+    by_id = {c.id: c for c in found}
+    by_name = {}
+    for c in sorted(found, key=lambda c: c.user_id is not None):  # Category của user ghi đè category mặc định
+        by_name[(c.name.lower(), c.type)] = c
+
+    for index, item in enumerate(items):
+        if item.get("category_id"):
+            try:
+                _check_category_access(by_id.get(item["category_id"]), user_id, item["type"])
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"Row {index}: {e.detail}")
+
+    missing = {}
+    for item in items:
+        if not item.get("category_id") and _name_key(item) not in by_name:
+            missing.setdefault(_name_key(item), item["category_name"].strip())
+    if missing:
+        created = db.scalars(
+            insert(category).returning(category),
+            [{"user_id": user_id, "name": name, "type": key[1]} for key, name in missing.items()],
+        ).all()
+        by_name.update({(c.name.lower(), c.type): c for c in created})
+
+    return [by_id[item["category_id"]] if item.get("category_id") else by_name[_name_key(item)] for item in items]
+
+
+def _drop_duplicate_rows(db: Session, user_id: UUID, rows: List[Dict], seen_keys: Optional[Counter] = None) -> List[Dict]:
+    """
+    Bỏ các dòng trùng (user_id, date, amount, note) với giao dịch đã có, so theo SỐ LẦN xuất hiện:
+    lần xuất hiện thứ k của 1 khóa trong file chỉ được tạo khi DB đang có ít hơn k giao dịch cùng khóa.
+    -> File có 2 dòng giống hệt (2 ly cafe cùng giá, cùng ngày) tạo đủ 2 giao dịch; import lại thì bỏ cả 2.
+    seen_keys: số lần mỗi khóa đã xuất hiện ở các batch trước của cùng lần import (được cập nhật tại chỗ).
+    Tra bằng 1 câu SELECT trên khóa md5 (ix_transactions_dedupe_key, hash index).
+    """
+    txn = transaction_model.Transaction
+    seen_keys = Counter() if seen_keys is None else seen_keys
+    keys = [transaction_model.dedupe_key(user_id, r["date"], r["amount"], r["note"]) for r in rows]
+    existing = db.execute(
+        select(txn.date, txn.amount, txn.note).where(
+            txn.user_id == user_id,
+            transaction_model.dedupe_key_expression(txn.user_id, txn.date, txn.amount, txn.note).in_(set(keys)),
+        )
+    ).all()
+    existing_counts = Counter(transaction_model.dedupe_key(user_id, d, a, n) for d, a, n in existing)
+
+    unique_rows = []
+    for row, key in zip(rows, keys):
+        seen_keys[key] += 1
+        if seen_keys[key] > existing_counts[key]:
+            existing_counts[key] += 1  # Dòng này sắp được tạo: lần trùng sau trong batch phải tính cả nó
+            unique_rows.append(row)
+    return unique_rows
+
+
+def create_transactions_bulk(
+    db: Session,
+    user_id: UUID,
+    items: List[Dict],
+    currency_code: str = "USD",
+    fallback_emoji: Optional[str] = None,
+    skip_duplicates: bool = False,
+    seen_keys: Optional[Counter] = None,
+):
+    """
+    Tạo nhiều giao dịch trong 1 DB transaction (tất cả hoặc không gì cả):
+    1 SELECT category + INSERT nhiều dòng ... RETURNING + 1 UPSERT rollup + 1 commit,
+    thay vì ~4 round trip và 1 commit cho mỗi dòng.
+    Mỗi item: type, amount, date?, category_id | category_name, note?, emoji?, currency_code?
+    skip_duplicates=True (import sao kê): bỏ qua dòng trùng (date, amount, note) với giao dịch đã có thay vì
+    tạo thêm; seen_keys dùng chung giữa các batch của 1 lần import (xem _drop_duplicate_rows).
+    Trả về các dòng (id, type, amount, category_id, category_name, date) đã tạo, theo thứ tự đầu vào.
+    """
+    _validate_bulk_items(items)
+    txn = transaction_model.Transaction
+    try:
+        categories = _resolve_bulk_categories(db, user_id, items)
+        rows = [
+            {
+                "user_id": user_id,
+                "category_id": category.id,
+                "category_name": category.name,
+                "type": item["type"],
+                "amount": Decimal(str(item["amount"])),
+                "currency_code": item.get("currency_code") or currency_code or "USD",
+                "date": item.get("date") or date.today(),
+                "emoji": item.get("emoji") or category.icon or fallback_emoji,
+                "note": item.get("note"),
+            }
+            for item, category in zip(items, categories)
+        ]
+        if skip_duplicates:
+            rows = _drop_duplicate_rows(db, user_id, rows, seen_keys)
+        created = []
+        if rows:  # Cả batch trùng -> chỉ commit category mới (nếu có)
+            # Core insert (không qua ORM, ORM tách batch theo cột NULL) + insertmanyvalues:
+            # SQLAlchemy gộp thành các câu INSERT nhiều dòng ... RETURNING.
+            table = txn.__table__
+            created = db.execute(
+                insert(table).returning(
+                    table.c.id, table.c.user_id, table.c.type, table.c.amount,
+                    table.c.category_id, table.c.category_name, table.c.date,
+                    sort_by_parameter_order=True,
+                ),
+                rows,
+            ).all()
+        crud_daily_total.add_transactions_bulk(db, created)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    bump_user_data_version(user_id)
+    return created
+
+
+def apply_keyset(stmt, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    ORDER BY (date, created_at, id) DESC + điều kiện keyset, dùng chung cho transactions/incomes/expenses.
+    Lấy dư 1 dòng (limit + 1) để keyset_page biết còn trang sau hay không.
+    """
+    txn = transaction_model.Transaction
+    keyset = decode_cursor(cursor)
+    if keyset is not None:
+        cursor_date, cursor_created_at, cursor_id = keyset
+        stmt = stmt.where(
+            # Điều kiện thừa trên cột đầu giúp planner chặn phạm vi scan cả với index (user_id, type, date).
+            txn.date <= cursor_date,
+            tuple_(txn.date, txn.created_at, txn.id) < tuple_(cursor_date, cursor_created_at, cursor_id),
+        )
+
+    stmt = stmt.order_by(txn.date.desc(), txn.created_at.desc(), txn.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def keyset_page(rows, limit: Optional[int] = None):
+    """Cắt dòng dư của apply_keyset -> (items, next_cursor); next_cursor = None ở trang cuối."""
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def check_transaction_filters(db: Session, user_id: UUID, type_filter: Optional[str], category_id: Optional[UUID]):
+    """Kiểm tra type + quyền truy cập category của bộ lọc; trả về category_id đã xác thực."""
+    if type_filter is not None:
+        _validate_transaction_type(type_filter)
+
+    if category_id:
+        category_id = get_accessible_category_for_user(db, category_id, user_id, type_filter).id
+    return category_id
+
+
+def apply_transaction_filters(
+    stmt,
+    user_id: UUID,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[UUID] = None,
+    type_filter: Optional[str] = None,
+):
+    """Bộ lọc chung của /transactions/ và export (category_id đã được kiểm tra quyền)."""
+    stmt = stmt.where(transaction_model.Transaction.user_id == user_id)
+    if type_filter:
+        stmt = stmt.where(transaction_model.Transaction.type == type_filter)
+    if start_date:
+        stmt = stmt.where(transaction_model.Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(transaction_model.Transaction.date <= end_date)
+    if category_id:
+        stmt = stmt.where(transaction_model.Transaction.category_id == category_id)
+    return stmt
+
+
+def _transactions_statement(
+    user_id: UUID,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[UUID] = None,
+    type_filter: Optional[str] = None,
+):
+    """SELECT dùng chung cho bản sync/async của list_transactions_for_user (category_id đã được kiểm tra quyền)."""
+    stmt = select(transaction_model.Transaction).options(joinedload(transaction_model.Transaction.category))
+    stmt = apply_transaction_filters(stmt, user_id, start_date, end_date, category_id, type_filter)
+    return apply_keyset(stmt, cursor, limit)
+
+
 def list_transactions_for_user(
     db: Session,
     user_id: UUID,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     category_id: Optional[UUID] = None,
     type_filter: Optional[str] = None,
 ):
-    """List all unified transactions for a user."""
+    """List unified transactions for a user, one keyset page at a time (limit=None -> everything)."""
+    category_id = check_transaction_filters(db, user_id, type_filter, category_id)
+    stmt = _transactions_statement(user_id, cursor, limit, start_date, end_date, category_id, type_filter)
+    items, next_cursor = keyset_page(db.execute(stmt).scalars(), limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def list_transactions_for_user_async(
+    db: AsyncSession,
+    user_id: UUID,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[UUID] = None,
+    type_filter: Optional[str] = None,
+):
+    """Async variant of list_transactions_for_user."""
     if type_filter is not None:
         _validate_transaction_type(type_filter)
 
-    query = (
-        db.query(transaction_model.Transaction)
-        .options(joinedload(transaction_model.Transaction.category))
-        .filter(transaction_model.Transaction.user_id == user_id)
-    )
-    if type_filter:
-        query = query.filter(transaction_model.Transaction.type == type_filter)
-    if start_date:
-        query = query.filter(transaction_model.Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(transaction_model.Transaction.date <= end_date)
     if category_id:
-        category = get_accessible_category_for_user(db, category_id, user_id, type_filter)
-        query = query.filter(transaction_model.Transaction.category_id == category.id)
+        category = await get_accessible_category_for_user_async(db, category_id, user_id, type_filter)
+        category_id = category.id
 
-    query = query.order_by(transaction_model.Transaction.date.desc()).offset(skip)
-    if limit is not None:
-        query = query.limit(limit)
-    return query.all()
+    stmt = _transactions_statement(user_id, cursor, limit, start_date, end_date, category_id, type_filter)
+    items, next_cursor = keyset_page((await db.execute(stmt)).scalars(), limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 
-def get_recent_transactions(db: Session, user_id: UUID, limit: int = 10):
-    """List recent transactions for a user."""
+def _recent_transactions_statement(user_id: UUID, limit: int):
     return (
-        db.query(transaction_model.Transaction)
-        .filter(transaction_model.Transaction.user_id == user_id)
+        select(transaction_model.Transaction)
+        .where(transaction_model.Transaction.user_id == user_id)
         .order_by(desc(transaction_model.Transaction.date))
         .limit(limit)
-        .all()
     )
 
 
+def get_recent_transactions(db: Session, user_id: UUID, limit: int = 10):
+    """List recent transactions for a user."""
+    return db.execute(_recent_transactions_statement(user_id, limit)).scalars().all()
+
+
+async def get_recent_transactions_async(db: AsyncSession, user_id: UUID, limit: int = 10):
+    """Async variant of get_recent_transactions."""
+    return (await db.execute(_recent_transactions_statement(user_id, limit))).scalars().all()
+
+
 def update_transaction(db: Session, transaction_id: UUID, user_id: UUID, update_data: dict):
     transaction = (
         db.query(transaction_model.Transaction)
@@ -120,10 +380,13 @@ def update_transaction(db: Session, transaction_id: UUID, user_id: UUID, update_
     else:
         update_data.pop("category_id", None)
 
+    crud_daily_total.remove_transaction(db, transaction)
     for key, value in update_data.items():
         if hasattr(transaction, key):
             setattr(transaction, key, value)
+    crud_daily_total.add_transaction(db, transaction)
     db.commit()
+    bump_user_data_version(user_id)
     db.refresh(transaction)
     return transaction
 
@@ -136,6 +399,8 @@ def delete_transaction(db: Session, transaction_id: UUID, user_id: UUID):
     )
     if not transaction:
         return None
+    crud_daily_total.remove_transaction(db, transaction)
     db.delete(transaction)
     db.commit()
+    bump_user_data_version(user_id)
     return transaction
@@ -1,7 +1,15 @@
 # crud_user.py
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from cruds import crud_system_counter
 from models import user_model
-from core.security import verify_password
+from services.password_hasher import password_hasher
+
+logger = logging.getLogger(__name__)
 
 def get_user_by_firebase_uid(db: Session, firebase_uid: str):
     """Tìm người dùng bằng Firebase UID."""
@@ -30,19 +38,75 @@ def create_user(db: Session,
         last_session_key=None
     )
     db.add(user)
+    db.flush()  # Có user.id để chọn shard bộ đếm
+    crud_system_counter.track_user_created(db, user)
     db.commit()
     db.refresh(user)
     return user
 
+def upsert_firebase_user(db: Session,
+                         firebase_uid: str,
+                         session_key: str,
+                         email: str = None,
+                         name: str = None,
+                         profile_image: str = None,
+                         is_email_verified: bool = False):
+    """
+    Đăng nhập Firebase trong 1 câu INSERT ... ON CONFLICT (firebase_uid) DO UPDATE ... RETURNING:
+    tạo user mới hoặc cập nhật email/tên/ảnh (giá trị rỗng không ghi đè) + is_email_verified,
+    đồng thời xoay last_session_key. Trả về (user, created).
+    """
+    table = user_model.User
+    stmt = pg_insert(table).values(
+        firebase_uid=firebase_uid,
+        email=email or None,
+        name=name or None,
+        profile_image=profile_image or None,
+        is_email_verified=bool(is_email_verified),
+        is_2fa_enabled=False,
+        restrict_multi_device=False,
+        otp_secret=None,
+        last_session_key=session_key,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.firebase_uid],
+        set_={
+            "email": func.coalesce(stmt.excluded.email, table.email),
+            "name": func.coalesce(stmt.excluded.name, table.name),
+            "profile_image": func.coalesce(stmt.excluded.profile_image, table.profile_image),
+            "is_email_verified": stmt.excluded.is_email_verified,
+            "last_session_key": stmt.excluded.last_session_key,
+        },
+    )
+    # xmax = 0 <=> dòng vừa được INSERT (không đi qua nhánh DO UPDATE).
+    user, created = db.execute(
+        stmt.returning(table, literal_column("xmax = 0").label("created")),
+        execution_options={"populate_existing": True},
+    ).one()
+    if created:
+        crud_system_counter.track_user_created(db, user)
+    # RETURNING đã có đủ cột: tách khỏi session để commit không expire -> không cần SELECT refresh.
+    db.expunge(user)
+    db.commit()
+    return user, created
+
 def authenticate_user(db: Session, email: str, password: str):
     """
     Kiểm tra email và mật khẩu.
     Nếu đúng -> Trả về User.
     Nếu sai -> Trả về False.
+    bcrypt chạy trên pool giới hạn (services/password_hasher.py): quá tải -> 429.
     """
     user = get_user_by_email(db, email=email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not password_hasher.verify(password, user.password):
         return False
+    if password_hasher.needs_rehash(user.password):
+        # BCRYPT_ROUNDS đã đổi: hash lại bằng mật khẩu vừa xác thực (bỏ qua nếu pool đang quá tải).
+        try:
+            user.password = password_hasher.hash(password)
+            db.commit()
+        except HTTPException:
+            logger.warning(f"Password rehash skipped for user {user.id}: hasher is busy")
     return user
\ No newline at end of file
@@ -4,6 +4,7 @@ import json
 from contextlib import asynccontextmanager, contextmanager
 
 # Thư viện ngoài
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -13,6 +14,7 @@ from firebase_admin import credentials
 # Thư viện nội bộ
 from core.config import settings
 from db.database import SessionLocal
+from cruds import crud_audit
 from cruds.crud_category import seed_default_categories
 from routes import (
     auth_route,
@@ -22,6 +24,7 @@ from routes import (
     transaction_route,
     dashboard_route,
     export_route,
+    import_route,
     analytics_route,
     summary_route,
     security_route,
@@ -31,6 +34,10 @@ from routes import (
 )
 
 from core.cache import init_redis, close_redis, check_redis_health
+from services.audit_sink import audit_sink
+from services.firebase_token_verifier import firebase_app_initialized, firebase_token_verifier
+from services.password_hasher import password_hasher
+from services.rate_limiter import RateLimitMiddleware, rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +48,7 @@ load_dotenv()  # Điểm mạnh: Load ENV sớm → an toàn, dễ config (e.g.,
 
 # Khởi tạo Firebase ngay khi file chạy
 # Logic này sẽ đọc chuỗi JSON từ Railway Variable
-if not firebase_admin._apps:  # Check singleton tốt, tránh init multiple.
+if not firebase_app_initialized():  # get_app() thay cho firebase_admin._apps (thuộc tính private).
     firebase_key_json = os.getenv("FIREBASE_SERVICE_ACCOUNT")
     if firebase_key_json:
         try:
@@ -101,6 +108,13 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Redis not available (app van chay binh thuong)")
 
+    # --- Audit log sink (thread nền ghi batch) ---
+    audit_sink.start()
+
+    # --- Chứng chỉ Firebase: tải sẵn + làm mới nền (thread riêng, không chặn startup) ---
+    if firebase_app_initialized():
+        firebase_token_verifier.start()
+
     # --- Seeding DB ---
     try:
         with get_db_session() as db:
@@ -110,6 +124,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Seeding error: {e}")
 
+    # --- Partition audit_logs cho tháng này + vài tháng tới (job Celery beat cũng chạy hằng ngày) ---
+    try:
+        with get_db_session() as db:
+            created = crud_audit.ensure_audit_partitions(db)
+            if created:
+                logger.info(f"Created audit partitions: {created}")
+    except Exception as e:
+        logger.error(f"Audit partition maintenance error: {e}")
+
     logger.info("---------------------------------------")
 
     yield  # 🚀 APP CHẠY TẠI ĐÂY
@@ -119,6 +142,10 @@ async def lifespan(app: FastAPI):
     # =========================
     logger.info("Application shutting down...")
 
+    # Ghi nốt audit log còn trong hàng đợi (chạy trong thread để không chặn event loop).
+    await anyio.to_thread.run_sync(audit_sink.stop, settings.AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
+    await anyio.to_thread.run_sync(password_hasher.shutdown)
+    await anyio.to_thread.run_sync(firebase_token_verifier.stop)
     await close_redis()
 
     logger.info("Cleanup completed")
@@ -131,6 +158,9 @@ app = FastAPI(
     lifespan=lifespan  # Attach lifespan – pro.
 )
 
+# Rate limit các endpoint đắt (chat, export, login, analytics). Thêm trước CORS -> CORS bọc ngoài, 429 vẫn có header CORS.
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, enabled=settings.RATE_LIMIT_ENABLED)
+
 # Cấu hình CORS (Cho phép Vercel truy cập)
 origins = settings.cors_origins
 
@@ -152,6 +182,7 @@ app.include_router(expense_route.router)  # Core expense flow (tiêu chí 4).
 app.include_router(transaction_route.router)  # Transactions – nơi cần race condition control (tiêu chí 3).
 app.include_router(dashboard_route.router)
 app.include_router(export_route.router)  # Export: Tiềm năng cho background job (tiêu chí 7).
+app.include_router(import_route.router)  # Import sao kê CSV/OFX (streaming, chống trùng).
 app.include_router(analytics_route.router)  # Analytics: Cần cache (tiêu chí 6).
 app.include_router(summary_route.router)
 app.include_router(security_route.router)  # Security: 2FA? (pyotp in reqs).
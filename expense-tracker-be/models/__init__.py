@@ -1,8 +1,10 @@
 from .user_model import User
 from .category_model import Category
 from .transaction_model import Transaction
+from .daily_total_model import UserDailyTotal
 from .audit_model import AuditLog
-from .system_model import SystemSetting
+from .system_model import SystemSetting, SystemCounter, DailySignup
+from .export_job_model import ExportJob
 # Nếu bạn vẫn còn file income/expense_model, hãy import nếu cần migration xóa chúng sau này
 # from .income_model import Income
 # from .expense_model import Expense
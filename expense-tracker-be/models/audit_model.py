@@ -1,6 +1,6 @@
 # models/audit_model.py
 import uuid
-from sqlalchemy import Column, String, DateTime, func, Text
+from sqlalchemy import DDL, Column, String, DateTime, Index, event, func, Text
 from sqlalchemy.dialects.postgresql import UUID
 from db.database import Base
 
@@ -14,4 +14,25 @@ class AuditLog(Base):
     status = Column(String(20), default="SUCCESS")   # "SUCCESS" hoặc "ERROR"
     details = Column(Text, nullable=True)            # Chi tiết lỗi hoặc dữ liệu thay đổi
     ip_address = Column(String(50), nullable=True)   # IP người thực hiện
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    # Khóa phân vùng (partition theo tháng) -> phải nằm trong primary key.
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC; mỗi bộ lọc có index riêng cùng thứ tự đó.
+        Index("ix_audit_logs_created_id", created_at.desc(), id.desc()),
+        Index("ix_audit_logs_actor_created_id", "actor_email", created_at.desc(), id.desc()),
+        Index("ix_audit_logs_action_created_id", "action", created_at.desc(), id.desc()),
+        Index("ix_audit_logs_status_created_id", "status", created_at.desc(), id.desc()),
+        # Partition tháng do migration / crud_audit.ensure_audit_partitions tạo; retention DROP cả partition.
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# create_all (chỉ dùng cho dev local): bảng cha partitioned chưa có partition nào -> thêm DEFAULT để INSERT được.
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
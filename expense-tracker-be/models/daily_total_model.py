@@ -0,0 +1,38 @@
+# models/daily_total_model.py
+from sqlalchemy import (
+    Column,
+    String,
+    Numeric,
+    Integer,
+    Date,
+    ForeignKey,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from db.database import Base
+
+# ======================================================
+# 📅 USER DAILY TOTAL MODEL (Rollup của bảng Transaction)
+# ======================================================
+class UserDailyTotal(Base):
+    """
+    Bảng tổng hợp theo ngày: mỗi dòng = tổng tiền + số giao dịch của 1 user
+    trong 1 ngày, theo 1 loại (income/expense) và 1 danh mục (kèm tên danh mục đã lưu trên giao dịch).
+    Được cập nhật trong cùng transaction với mọi thao tác ghi vào bảng `transactions`
+    (xem cruds/crud_daily_total.py), nên dashboard chỉ cần quét theo số ngày.
+    """
+    __tablename__ = "user_daily_totals"
+    __table_args__ = (
+        Index("ix_user_daily_totals_user_type_date", "user_id", "type", "date"),
+    )
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    type = Column(String(10), primary_key=True)  # 'income' hoặc 'expense'
+    # Xóa category (cascade xóa transaction ở ORM) thì rollup của category đó cũng bị xóa theo.
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    # Snapshot Transaction.category_name (user có thể đổi tên riêng cho từng giao dịch); NULL lưu thành ''.
+    category_name = Column(String(255), primary_key=True, server_default="")
+
+    total_amount = Column(Numeric(18, 2), nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
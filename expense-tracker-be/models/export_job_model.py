@@ -0,0 +1,42 @@
+# models/export_job_model.py
+import uuid
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Index, Text, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from db.database import Base
+
+
+# ======================================================
+# 📦 EXPORT JOB MODEL (Xuất file bất đồng bộ qua Celery)
+# ======================================================
+class ExportJob(Base):
+    """
+    Mỗi dòng = 1 yêu cầu xuất file. API chỉ tạo job và trả về ngay,
+    worker Celery (tasks/export_tasks.py) ghi file vào storage và cập nhật tiến độ ở đây.
+    """
+    __tablename__ = "export_jobs"
+    __table_args__ = (
+        # Đếm job đang chạy của user (giới hạn đồng thời) + danh sách job gần đây.
+        Index("ix_export_jobs_user_status", "user_id", "status"),
+        # Job dọn dẹp tìm file hết hạn.
+        Index("ix_export_jobs_expires_at", "expires_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/completed/failed/expired
+    format = Column(String(10), nullable=False, default="xlsx")  # xlsx | csv
+    filters = Column(JSONB, nullable=False, default=dict)  # type/start_date/end_date/category_id
+
+    total_rows = Column(Integer, nullable=True)  # Đếm trước khi ghi để tính % tiến độ
+    processed_rows = Column(Integer, nullable=False, default=0)
+
+    file_name = Column(String(255), nullable=True)
+    storage_key = Column(String(255), nullable=True)  # Khóa trong storage backend (local disk, ...)
+    file_size = Column(BigInteger, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,5 +1,5 @@
 # models/system_model.py
-from sqlalchemy import Column, Integer, Boolean, String, DateTime, func
+from sqlalchemy import Column, Integer, Boolean, String, Date, DateTime, Numeric, SmallInteger, func
 from db.database import Base
 
 class SystemSetting(Base):
@@ -9,4 +9,28 @@ class SystemSetting(Base):
     maintenance_mode = Column(Boolean, default=False)
     allow_signup = Column(Boolean, default=True)
     broadcast_message = Column(String(255), nullable=True)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SystemCounter(Base):
+    """
+    Bộ đếm toàn hệ thống cho Admin KPIs (tổng user, user bật 2FA, tổng thu/chi...).
+    Mỗi bộ đếm chia thành nhiều shard (theo user_id) để các giao dịch ghi song song
+    không tranh nhau khóa 1 dòng duy nhất; giá trị thật = SUM(value) theo name.
+    Xem cruds/crud_system_counter.py.
+    """
+    __tablename__ = "system_counters"
+
+    name = Column(String(50), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    value = Column(Numeric(20, 2), nullable=False, default=0)
+
+
+class DailySignup(Base):
+    """
+    Rollup số user đăng ký mỗi ngày (theo ngày UTC) cho biểu đồ tăng trưởng user của Admin.
+    crud_user.create_user cộng 1, xóa user trừ 1 (cùng transaction) -> biểu đồ chỉ đọc tối đa 365 dòng.
+    """
+    __tablename__ = "daily_signups"
+
+    date = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
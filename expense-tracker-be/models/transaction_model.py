@@ -1,4 +1,8 @@
+import hashlib
 import uuid
+from datetime import date as date_type
+from decimal import Decimal
+
 from sqlalchemy import (
     Column,
     String,
@@ -7,12 +11,41 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
-    func
+    Index,
+    cast,
+    func,
+    literal_column,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from db.database import Base
 
+# ======================================================
+# 🔑 KHÓA CHỐNG TRÙNG (user_id, date, amount, note) cho import sao kê
+# ======================================================
+# Chỉ dùng hàm IMMUTABLE để làm được expression index: date::text phụ thuộc DateStyle
+# nên ngày được đổi thành số ngày kể từ mốc cố định.
+DEDUPE_EPOCH = date_type(2000, 1, 1)
+
+
+def dedupe_key_expression(user_id, txn_date, amount, note):
+    """md5(user_id | số ngày | amount | note) phía SQL, khớp đúng biểu thức của index hash."""
+    sep = literal_column("'|'")
+    return func.md5(
+        cast(user_id, Text) + sep
+        + cast(txn_date - literal_column(f"DATE '{DEDUPE_EPOCH.isoformat()}'"), Text) + sep
+        + cast(amount, Text) + sep
+        + func.coalesce(note, literal_column("''"))
+    )
+
+
+def dedupe_key(user_id, txn_date: date_type, amount, note) -> str:
+    """Bản Python của dedupe_key_expression (numeric(14,2)::text luôn có đúng 2 chữ số thập phân)."""
+    amount_text = str(Decimal(str(amount)).quantize(Decimal("0.01")))
+    raw = f"{user_id}|{(txn_date - DEDUPE_EPOCH).days}|{amount_text}|{note or ''}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
 # ======================================================
 # 🔄 TRANSACTION MODEL
 # ======================================================
@@ -30,7 +63,27 @@ class Transaction(Base):
     emoji = Column(String(64), nullable=True)
     note = Column(Text, nullable=True)
     date = Column(Date, nullable=False, default=func.current_date())
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Tổng/biểu đồ theo loại + khoảng ngày: covering index -> Index Only Scan, không cần đọc heap.
+        Index(
+            "ix_transactions_user_type_date",
+            "user_id", "type", "date",
+            postgresql_include=["amount", "category_id", "category_name"],
+        ),
+        # Danh sách (keyset pagination) / giao dịch gần đây: khớp đúng ORDER BY date DESC, created_at DESC, id DESC.
+        Index(
+            "ix_transactions_user_date_created_id",
+            "user_id", date.desc(), created_at.desc(), id.desc(),
+        ),
+        # Import sao kê: tra trùng theo khóa md5 (chỉ so sánh bằng -> hash index nhỏ hơn B-tree trên note dài).
+        Index(
+            "ix_transactions_dedupe_key",
+            dedupe_key_expression(user_id, date, amount, note),
+            postgresql_using="hash",
+        ),
+    )
 
     # Quan hệ
     user = relationship("User", back_populates="transactions")
@@ -1,6 +1,9 @@
 import uuid
 from sqlalchemy import (
+    DDL,
     Column,
+    Index,
+    event,
     String,
     Text,
     Date,
@@ -27,7 +30,7 @@ class User(Base):
     gender = Column(String(20), nullable=True)
     birthday = Column(Date, nullable=True)
     profile_image = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     currency_code = Column(String(3), nullable=False, default="USD")
     currency_symbol = Column(String(5), nullable=False, default="$")
     is_2fa_enabled: sa.Column[bool] = sa.Column(sa.Boolean, default=False, nullable=False)
@@ -51,4 +54,20 @@ class User(Base):
         primaryjoin="and_(User.id==Transaction.user_id, Transaction.type=='expense')",
         viewonly=True
     )
-    categories = relationship("Category", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    categories = relationship("Category", back_populates="user", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Danh sách user cho Admin: keyset ORDER BY created_at DESC, id DESC (KPI new_users_24h cũng dùng index này).
+        Index("ix_users_created_id", created_at.desc(), id.desc()),
+        # Tìm theo tiền tố email / tên (ILIKE 'abc%') bằng trigram GIN index.
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
+
+# create_all (chỉ dùng cho dev local): index trigram cần extension pg_trgm.
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
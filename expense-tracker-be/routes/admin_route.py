@@ -1,11 +1,13 @@
 # routes/admin_route.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 import time
 from sqlalchemy import text
 
+from core.pagination import MAX_PAGE_SIZE
 from db.database import get_db
 from services.auth_token_db import get_current_admin_user
 from models import user_model
@@ -30,22 +32,54 @@ def get_admin_kpis(db: Session = Depends(get_db)):
 # ✅ SỬA: Đổi từ "/stats/user-growth" thành "/charts/user-growth"
 @router.get("/charts/user-growth", response_model=List[admin_schemas.AdminUserGrowth])
 def get_admin_user_growth(days: int = 30, db: Session = Depends(get_db)):
+    if days not in crud_admin.USER_GROWTH_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"days must be one of {', '.join(map(str, crud_admin.USER_GROWTH_WINDOWS))}.",
+        )
     return crud_admin.admin_get_user_growth(db, days=days)
 
 
 # --- Audit Logs ---
-@router.get("/logs", response_model=List[audit_schemas.AuditLogOut])
-def get_system_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud_audit.get_audit_logs(db, skip=skip, limit=limit)
+@router.get("/logs", response_model=audit_schemas.AuditLogListOut)
+def get_system_logs(
+        cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        actor_email: Optional[str] = Query(None),
+        action: Optional[str] = Query(None),
+        status: Optional[str] = Query(None),
+        start_time: Optional[datetime] = Query(None),
+        end_time: Optional[datetime] = Query(None),
+        db: Session = Depends(get_db),
+):
+    """Audit logs, newest first, one cursor page at a time; a time range only scans the matching monthly partitions."""
+    items, next_cursor = crud_audit.list_audit_logs(
+        db, cursor=cursor, limit=limit, actor_email=actor_email, action=action, status=status,
+        start_time=start_time, end_time=end_time,
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 
 # =========================================================
 # 2. USER MANAGEMENT (GIỮ NGUYÊN)
 # =========================================================
 
-@router.get("/users", response_model=List[admin_schemas.AdminUserListOut])
-def get_all_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud_admin.admin_get_all_users(db, skip=skip, limit=limit)
+@router.get("/users", response_model=admin_schemas.AdminUserPageOut)
+def get_all_users(
+        cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        search: Optional[str] = Query(None, max_length=255, description="Email or name prefix"),
+        is_admin: Optional[bool] = Query(None),
+        is_2fa_enabled: Optional[bool] = Query(None),
+        is_email_verified: Optional[bool] = Query(None),
+        db: Session = Depends(get_db),
+):
+    """Users, newest first, one cursor page at a time, with transaction count and last activity date per user."""
+    items, next_cursor = crud_admin.admin_list_users(
+        db, cursor=cursor, limit=limit, search=search, is_admin=is_admin,
+        is_2fa_enabled=is_2fa_enabled, is_email_verified=is_email_verified,
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.put("/users/{user_id}", response_model=user_schemas.UserOut)
@@ -1,27 +1,29 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 from typing import Dict, Any, Optional
 from uuid import UUID
 
-from cruds.crud_analytics import get_analytics_summary_data
-from db.database import get_db
+from cruds.crud_analytics import get_analytics_summary_data_async
+from core.cache import cached_response
+from db.database import get_async_db
 from schemas.analytics_schemas import AnalyticsSummary, AnalyticsFilter
-from services.auth_token_db import get_current_user_db  # Giả định user dependency
+from services.auth_token_db import get_current_user_db_async  # Giả định user dependency
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
 @router.get("/summary", response_model=AnalyticsSummary)
-def get_analytics_summary(
+@cached_response("analytics:summary", AnalyticsSummary)
+async def get_analytics_summary(
         # ✅ Sử dụng Query Params cho bộ lọc
         type: str = Query('all', description="Transaction type: 'all', 'income', or 'expense'"),
         start_date: Optional[date] = Query(None, description="Start date for filtering"),
         end_date: Optional[date] = Query(None, description="End date for filtering"),
         category_id: Optional[UUID] = Query(None, description="Category ID (UUID) for filtering"),
 
-        current_user=Depends(get_current_user_db),
-        db: Session = Depends(get_db)
+        current_user=Depends(get_current_user_db_async),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy dữ liệu tổng hợp (Bar, Pie, Bảng chi tiết) cho trang Analytics.
@@ -37,7 +39,7 @@ def get_analytics_summary(
     )
 
     # 2. Gọi hàm CRUD để lấy dữ liệu
-    summary_data = get_analytics_summary_data(db, current_user.id, filters)
+    summary_data = await get_analytics_summary_data_async(db, current_user.id, filters)
 
     # 3. Trả về dữ liệu (FastAPI sẽ tự động map với AnalyticsSummary)
     return summary_data
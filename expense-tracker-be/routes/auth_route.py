@@ -6,9 +6,10 @@ from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
 from cruds import crud_user, crud_audit
+from core.cache import invalidate_auth_user_cache
 from db.database import get_db
 from schemas import UserOut, UserSyncPayload, UserUpdate, Token, SupportRequest
-from services import auth_service
+from services import auth_service, session_registry
 from services.auth_token_db import extract_token, verify_token_and_get_payload, get_current_user_db
 from core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
 
@@ -33,6 +34,8 @@ def login_sync_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Sessio
     new_session_key = str(uuid.uuid4())
     user.last_session_key = new_session_key
     db.add(user); db.commit(); db.refresh(user)
+    invalidate_auth_user_cache(user.id)
+    session_registry.register_session(user, new_session_key)
 
     if user.is_2fa_enabled:
         pending_token = create_access_token(
@@ -68,7 +71,7 @@ def update_profile(data: UserUpdate, current_user=Depends(get_current_user_db),
     return auth_service.update_user_profile(db, current_user, data)
 
 @router.post("/api/public/support-request")
-async def submit_support_request(req: SupportRequest, request: Request, db: Session = Depends(get_db)):
+def submit_support_request(req: SupportRequest, request: Request, db: Session = Depends(get_db)):
     try:
         user = crud_user.get_user_by_email(db, req.email)
         if not user:
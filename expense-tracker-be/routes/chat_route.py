@@ -1,7 +1,5 @@
 # routes/chat_route.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db.database import get_db
 from schemas.chat_schema import ChatRequest
 from services.auth_token_db import get_current_user_db
 from services.chat_service import process_chat_message
@@ -12,12 +10,11 @@ router = APIRouter(prefix="/chat", tags=["Chatbot"])
 @router.post("/send")
 async def send_message(
     payload: ChatRequest,
-    current_user = Depends(get_current_user_db),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_user_db)
 ):
     try:
-        # Truyền history vào service
-        response_text = await process_chat_message(db, current_user, payload.message, payload.history)
+        # Truyền history vào service (agent tự mở DB session riêng trong worker thread)
+        response_text = await process_chat_message(current_user, payload.message, payload.history)
         return {"reply": response_text}
     except Exception as e:
         print(f"Chat Error: {e}")
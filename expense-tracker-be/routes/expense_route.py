@@ -11,6 +11,7 @@ from cruds.crud_expense import (
     get_expense_summary as crud_get_expense_summary,
     get_expense_daily_trend as crud_get_expense_daily_trend,
     list_expenses_for_user_filtered)
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from db.database import get_db
 from schemas import ExpenseOut, ExpenseCreate
 from schemas.expense_schemas import ExpenseListOut, ExpenseTrendItem
@@ -38,18 +39,18 @@ def create_expense(payload: ExpenseCreate, current_user=Depends(get_current_user
 def list_expenses(
     current_user=Depends(get_current_user_db),
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
-    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     category_id: Optional[UUID] = Query(None),
 ):
-    """Danh sách chi tiêu của người dùng kèm cài đặt tiền tệ."""
+    """Danh sách chi tiêu của người dùng (phân trang theo cursor) kèm cài đặt tiền tệ."""
     # CRUD đã trả về dict có items, currency_code, currency_symbol, khớp với ExpenseListOut
     return list_expenses_for_user_filtered(
         db=db,
         user_id=current_user.id,
-        skip=skip,
+        cursor=cursor,
         limit=limit,
         start_date=start_date,
         end_date=end_date,
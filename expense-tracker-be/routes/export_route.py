@@ -1,90 +1,152 @@
 # routes/export_route.py
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from io import BytesIO
-import pandas as pd
-from cruds.crud_income import list_incomes_for_user
-from cruds.crud_expense import list_expenses_for_user
+
+from cruds import crud_export_job
+from cruds.crud_transaction import check_transaction_filters
 from db.database import get_db
+from schemas.export_schemas import ExportJobCreate, ExportJobOut
 from services.auth_token_db import get_current_user_db
+from services.export_service import EXPORT_FORMATS, FILE_CHUNK_SIZE, export_statement, stream_export
+from services.export_storage import get_export_storage
+from tasks.export_tasks import run_export_job
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
+FORMAT_QUERY = Query("xlsx", pattern="^(xlsx|csv)$", description="xlsx hoặc csv")
 
-@router.get("/income")
-def export_income(current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    """Xuất danh sách thu nhập thành Excel"""
-    raw_data = list_incomes_for_user(db, current_user.id)
-    # Lấy list items từ object trả về
-    incomes = raw_data.get("items", []) if isinstance(raw_data, dict) else getattr(raw_data, "items", [])
-
-    # 1. Tạo DataFrame (Có 5 Cột: Category, Amount, Date, Note, Emoji)
-    df = pd.DataFrame([
-        {
-            "Category": i.category_name or "",
-            "Amount": float(i.amount or 0),
-            "Date": i.date.isoformat(),
-            "Note": i.note or "",
-            "Emoji": (i.category.icon if i.category else "") or i.emoji or ""
-        }
-        for i in incomes
-    ])
-
-    # 2. Tính tổng
-    total_amount = df["Amount"].sum() if not df.empty else 0
-
-    # 3. Thêm dòng TOTAL
-    if not df.empty:
-        # ✅ SỬA LỖI: Thêm đủ 5 phần tử tương ứng với 5 cột
-        # Category="TOTAL", Amount=total, Date="", Note="", Emoji=""
-        df.loc[len(df)] = ["TOTAL", total_amount, "", "", ""]
-
-    # 4. Xuất file
-    stream = BytesIO()
-    df.to_excel(stream, index=False)
-    stream.seek(0)
+
+def _export_response(db: Session, user_id, filename: str, export_format: str, type_filter=None,
+                     start_date=None, end_date=None, category_id=None):
+    """Kiểm tra bộ lọc trên session của request rồi stream file (không giữ toàn bộ dữ liệu trong RAM)."""
+    category_id = check_transaction_filters(db, user_id, type_filter, category_id)
+    stmt = export_statement(user_id, type_filter, start_date, end_date, category_id)
 
     return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=incomes.xlsx"}
+        stream_export(export_format, stmt),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"}
     )
 
 
+@router.get("/transactions")
+def export_transactions(
+    format: str = FORMAT_QUERY,
+    type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    category_id: Optional[UUID] = Query(None),
+    current_user=Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+):
+    """Xuất giao dịch (cùng bộ lọc với /transactions/) thành Excel/CSV"""
+    return _export_response(db, current_user.id, "transactions", format, type, start_date, end_date, category_id)
+
+
+@router.get("/income")
+def export_income(
+    format: str = FORMAT_QUERY,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    category_id: Optional[UUID] = Query(None),
+    current_user=Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+):
+    """Xuất danh sách thu nhập thành Excel/CSV"""
+    return _export_response(db, current_user.id, "incomes", format, "income", start_date, end_date, category_id)
+
+
 @router.get("/expense")
-def export_expense(current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    """Xuất danh sách chi tiêu thành Excel"""
-    raw_data = list_expenses_for_user(db, current_user.id)
-    expenses = raw_data.get("items", []) if isinstance(raw_data, dict) else getattr(raw_data, "items", [])
-
-    # 1. Tạo DataFrame (Có 5 Cột)
-    df = pd.DataFrame([
-        {
-            "Category": e.category_name or "",
-            "Amount": float(e.amount or 0),
-            "Date": e.date.isoformat(),
-            "Note": e.note or "",
-            "Emoji": (e.category.icon if e.category else "") or e.emoji or "",
-        }
-        for e in expenses
-    ])
-
-    # 2. Tính tổng
-    total_amount = df["Amount"].sum() if not df.empty else 0
-
-    # 3. Thêm dòng TOTAL
-    if not df.empty:
-        # ✅ SỬA LỖI: Thêm đủ 5 phần tử tương ứng với 5 cột
-        df.loc[len(df)] = ["TOTAL", total_amount, "", "", ""]
-
-    # 4. Xuất file
-    stream = BytesIO()
-    df.to_excel(stream, index=False)
-    stream.seek(0)
+def export_expense(
+    format: str = FORMAT_QUERY,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    category_id: Optional[UUID] = Query(None),
+    current_user=Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+):
+    """Xuất danh sách chi tiêu thành Excel/CSV"""
+    return _export_response(db, current_user.id, "expenses", format, "expense", start_date, end_date, category_id)
+
+
+# =========================================================
+# 📦 EXPORT BẤT ĐỒNG BỘ (Celery): tạo job -> xem tiến độ -> tải file
+# =========================================================
+
+def _job_out(job) -> ExportJobOut:
+    return ExportJobOut(
+        id=job.id,
+        status=job.status,
+        format=job.format,
+        filters=job.filters or {},
+        total_rows=job.total_rows,
+        processed_rows=job.processed_rows or 0,
+        progress=crud_export_job.job_progress(job),
+        file_name=job.file_name,
+        file_size=job.file_size,
+        error=job.error,
+        download_url=f"{router.prefix}/jobs/{job.id}/download" if job.status == "completed" else None,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+    )
+
+
+@router.post("/jobs", response_model=ExportJobOut, status_code=202)
+def create_export_job(
+    payload: ExportJobCreate,
+    current_user=Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+):
+    """Đưa yêu cầu xuất file vào hàng đợi, trả về ngay (không giữ API worker trong lúc ghi file)"""
+    category_id = check_transaction_filters(db, current_user.id, payload.type, payload.category_id)
+    filters = payload.model_dump(mode="json", exclude={"format"}, exclude_none=True)
+    if category_id:
+        filters["category_id"] = str(category_id)
+
+    job = crud_export_job.create_export_job(db, current_user.id, payload.format, filters)
+    try:
+        run_export_job.delay(str(job.id))
+    except Exception as e:
+        crud_export_job.mark_failed(db, job, f"Could not enqueue export: {e}")
+        raise HTTPException(status_code=503, detail="Export queue is unavailable, please try again later.")
+
+    db.refresh(job)  # Chế độ eager: task đã chạy xong trên session khác
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobOut)
+def get_export_job(job_id: UUID, current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
+    """Xem trạng thái / tiến độ của job xuất file"""
+    return _job_out(crud_export_job.get_export_job_for_user(db, job_id, current_user.id))
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(job_id: UUID, current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
+    """Tải file của job đã hoàn tất (410 nếu file đã hết hạn)"""
+    job = crud_export_job.get_export_job_for_user(db, job_id, current_user.id)
+    if job.status == "expired":
+        raise HTTPException(status_code=410, detail="Export file has expired")
+    if job.status != "completed" or not job.storage_key:
+        raise HTTPException(status_code=409, detail=f"Export is not ready (status: {job.status})")
+
+    try:
+        source = get_export_storage().open(job.storage_key)
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Export file has expired")
+
+    def _iter_file():
+        with source:
+            while chunk := source.read(FILE_CHUNK_SIZE):
+                yield chunk
 
     return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=expenses.xlsx"}
-    )
\ No newline at end of file
+        _iter_file(),
+        media_type=EXPORT_FORMATS[job.format],
+        headers={"Content-Disposition": f"attachment; filename={job.file_name}"}
+    )
@@ -0,0 +1,42 @@
+# routes/import_route.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from services.auth_token_db import get_current_user_db
+from services.import_service import IMPORT_FORMATS, import_statement, open_statement
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+def _detect_format(file: UploadFile, requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "qfx":  # Quicken: cùng cú pháp OFX
+        return "ofx"
+    if extension not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported file type, upload a .csv or .ofx statement.")
+    return extension
+
+
+@router.post("/transactions")
+def import_transactions(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ofx)$", description="Mặc định đoán theo đuôi file"),
+    current_user=Depends(get_current_user_db),
+):
+    """
+    Import sao kê ngân hàng (CSV/OFX) từ app khác: tự đoán danh mục, bỏ qua giao dịch trùng.
+    Response là NDJSON: 1 dòng "progress" sau mỗi batch đã lưu, dòng cuối "completed" (hoặc "failed").
+    """
+    if file.size is not None and file.size > settings.IMPORT_MAX_FILE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File is larger than {settings.IMPORT_MAX_FILE_MB} MB.")
+
+    rows = open_statement(file.file, _detect_format(file, format))
+    return StreamingResponse(
+        import_statement(current_user.id, rows, currency_code=current_user.currency_code),
+        media_type="application/x-ndjson",
+    )
@@ -5,6 +5,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from cruds.crud_income import list_incomes_for_user_filtered, create_income as crud_create_income, delete_income as crud_delete_income, update_income as crud_update_income, get_income_summary
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from db.database import get_db
 from schemas import IncomeOut, IncomeCreate
 from schemas.income_schemas import IncomeListOut, IncomeSummaryOut
@@ -38,18 +39,18 @@ def create_income(
 def list_incomes(
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
-    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     category_id: Optional[UUID] = Query(None),
 ):
-    """Danh sách thu nhập của người dùng kèm cài đặt tiền tệ."""
+    """Danh sách thu nhập của người dùng (phân trang theo cursor) kèm cài đặt tiền tệ."""
     # CRUD đã trả về dict có items, currency_code, currency_symbol, khớp với IncomeListOut
     return list_incomes_for_user_filtered(
         db=db,
         user_id=current_user.id,
-        skip=skip,
+        cursor=cursor,
         limit=limit,
         start_date=start_date,
         end_date=end_date,
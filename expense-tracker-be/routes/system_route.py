@@ -3,6 +3,7 @@ import time
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from core.cache import get_response_cache_stats
 from db.database import get_db
 from services.auth_token_db import get_current_admin_user, get_current_user_db
 from cruds import crud_system
@@ -27,6 +28,11 @@ def get_settings(
 ):
     return crud_system.get_system_settings(db)
 
+# API cho ADMIN: Số liệu hit/miss của response cache (theo từng worker process)
+@router.get("/cache-stats")
+def get_cache_stats(current_admin = Depends(get_current_admin_user)):
+    return get_response_cache_stats()
+
 # ✅ ĐÃ CHUYỂN TỪ ADMIN SANG ĐÂY (Đường dẫn sẽ là /system/health)
 @router.get("/health")
 def check_system_health(db: Session = Depends(get_db)):
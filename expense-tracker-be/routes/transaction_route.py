@@ -1,34 +1,45 @@
 # routes/transaction_route.py
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
 from typing import List, Optional
 from uuid import UUID
 
-from cruds.crud_summary import get_financial_summary_from_transactions, get_expense_by_category as crud_get_expense_by_category
-from cruds.crud_transaction import get_recent_transactions, create_transaction, delete_transaction, update_transaction, list_transactions_for_user
-from db.database import get_db
-from schemas import TransactionOut, SummaryOut, RecentTransactionOut
-from services.auth_token_db import get_current_user_db
+from cruds.crud_summary import (
+    get_financial_summary_from_transactions_async,
+    get_expense_by_category_async as crud_get_expense_by_category_async,
+)
+from cruds.crud_transaction import (
+    create_transactions_bulk,
+    get_recent_transactions_async,
+    list_transactions_for_user_async,
+)
+from core.cache import cached_response
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from db.database import get_async_db, get_db
+from schemas import TransactionListOut, SummaryOut, RecentTransactionOut, TransactionBulkCreate, TransactionBulkOut
+from services.auth_token_db import get_current_user_db, get_current_user_db_async
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
-@router.get("/", response_model=List[TransactionOut])
-def list_transactions(
-    current_user=Depends(get_current_user_db),
-    db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
-    limit: Optional[int] = Query(None, ge=1, le=500),
+@router.get("/", response_model=TransactionListOut)
+@cached_response("transactions:list", TransactionListOut)
+async def list_transactions(
+    current_user=Depends(get_current_user_db_async),
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     category_id: Optional[UUID] = Query(None),
     type: Optional[str] = Query(None, pattern="^(income|expense)$"),
 ):
-    """Get all income + expense transactions."""
-    return list_transactions_for_user(
+    """Get income + expense transactions, newest first, one cursor page at a time."""
+    return await list_transactions_for_user_async(
         db=db,
         user_id=current_user.id,
-        skip=skip,
+        cursor=cursor,
         limit=limit,
         start_date=start_date,
         end_date=end_date,
@@ -37,8 +48,9 @@ def list_transactions(
     )
 
 @router.get("/summary", response_model=SummaryOut)
-def get_summary(current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    summary = get_financial_summary_from_transactions(db, current_user.id)
+@cached_response("transactions:summary", SummaryOut)
+async def get_summary(current_user=Depends(get_current_user_db_async), db: AsyncSession = Depends(get_async_db)):
+    summary = await get_financial_summary_from_transactions_async(db, current_user.id)
     return {
         "total_income": summary["total_income"],
         "total_expense": summary["total_expense"],
@@ -46,16 +58,33 @@ def get_summary(current_user=Depends(get_current_user_db), db: Session = Depends
     }
 
 @router.get("/category-summary", response_model=List[dict])
-def get_expense_by_category(current_user=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    return crud_get_expense_by_category(db, current_user.id)
+@cached_response("transactions:category_summary", List[dict])
+async def get_expense_by_category(current_user=Depends(get_current_user_db_async), db: AsyncSession = Depends(get_async_db)):
+    return await crud_get_expense_by_category_async(db, current_user.id)
 
 
 @router.get("/recent", response_model=List[RecentTransactionOut])
-def get_recent_transactions_route(
-    current_user=Depends(get_current_user_db),
-    db: Session = Depends(get_db),
+@cached_response("transactions:recent", List[RecentTransactionOut])
+async def get_recent_transactions_route(
+    current_user=Depends(get_current_user_db_async),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, description="Number of recent transactions to return")
 ):
     """Lấy danh sách các giao dịch thu nhập và chi tiêu gần đây."""
-    # Hàm crud_transaction.get_recent_transactions cần phải được import
-    return get_recent_transactions(db, current_user.id, limit=limit)
+    return await get_recent_transactions_async(db, current_user.id, limit=limit)
+
+
+@router.post("/bulk", response_model=TransactionBulkOut, status_code=201)
+def create_transactions_bulk_route(
+    payload: TransactionBulkCreate,
+    current_user=Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+):
+    """Import many transactions at once (CSV/bank import): all rows are saved, or none if any row is invalid."""
+    created = create_transactions_bulk(
+        db,
+        current_user.id,
+        [item.model_dump() for item in payload.items],
+        currency_code=current_user.currency_code,
+    )
+    return {"created": len(created), "ids": [row.id for row in created]}
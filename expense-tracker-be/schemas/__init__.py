@@ -12,10 +12,11 @@ from .category_schemas import (
 from .income_schemas import IncomeBase, IncomeCreate, IncomeOut
 from .expense_schemas import ExpenseBase, ExpenseCreate, ExpenseOut
 from .transaction_schemas import (
-    TransactionBase, TransactionCreate, TransactionOut, RecentTransactionOut
+    TransactionBase, TransactionCreate, TransactionOut, TransactionListOut, RecentTransactionOut,
+    TransactionBulkItem, TransactionBulkCreate, TransactionBulkOut
 )
 from .dashboard_schemas import (
     SummaryOut, CategorySummaryOut, SummaryStats,
     ChartPoint, DashboardResponse
 )
-from .export_schemas import ExportResponse
+from .export_schemas import ExportResponse, ExportJobCreate, ExportJobOut
@@ -1,7 +1,7 @@
 # schemas/admin_schemas.py (TẠO FILE MỚI)
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 from .user_schemas import UserOut # Import UserOut để tái sử dụng
 
@@ -16,10 +16,18 @@ class AdminUserListOut(BaseModel):
     created_at: datetime
     is_admin: bool
     is_2fa_enabled: bool
+    is_email_verified: Optional[bool] = False
+    transaction_count: int = 0              # Tổng số giao dịch (từ rollup)
+    last_activity: Optional[date] = None    # Ngày giao dịch gần nhất
 
     class Config:
         from_attributes = True
 
+class AdminUserPageOut(BaseModel):
+    """1 trang user (mới nhất trước); truyền next_cursor vào `cursor` để lấy trang sau."""
+    items: List[AdminUserListOut]
+    next_cursor: Optional[str] = None
+
 class AdminUserUpdate(BaseModel):
     """Schema Admin dùng để cập nhật User"""
     name: Optional[str] = None
@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class AuditAction(str, Enum):
@@ -28,3 +28,10 @@ class AuditLogOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AuditLogListOut(BaseModel):
+    """One keyset page of audit logs, newest first; pass next_cursor back as `cursor` to get the next page."""
+
+    items: List[AuditLogOut]
+    next_cursor: Optional[str] = None
@@ -38,6 +38,7 @@ class ExpenseOut(ExpenseBase):
 class ExpenseListOut(BaseModel):
     """Schema phản hồi cho danh sách chi tiêu kèm cài đặt tiền tệ."""
     items: List[ExpenseOut]
+    next_cursor: Optional[str] = None  # None = trang cuối
     currency_code: str
     currency_symbol: str
 
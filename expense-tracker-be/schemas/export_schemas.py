@@ -1,15 +1,17 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
 from uuid import UUID
 from schemas.analytics_schemas import AnalyticsFilter
 
 
 class ExportStatus(str, Enum):
     pending = "pending"
+    running = "running"
     completed = "completed"
     failed = "failed"
+    expired = "expired"  # File đã bị dọn sau EXPORT_RESULT_TTL_HOURS
 
 class ExportResponse(BaseModel):
     message: str
@@ -21,3 +23,28 @@ class ExportResponse(BaseModel):
     expiry_time: Optional[datetime] = None  # Nếu dùng Signed URL (link tự hủy sau 15p), cần báo cho FE biết
 
 
+class ExportJobCreate(BaseModel):
+    """Body của POST /export/jobs (cùng bộ lọc với /transactions/)"""
+    format: str = Field("xlsx", pattern="^(xlsx|csv)$")
+    type: Optional[str] = Field(None, pattern="^(income|expense)$")
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    category_id: Optional[UUID] = None
+
+
+class ExportJobOut(BaseModel):
+    """Trạng thái 1 job xuất file; download_url chỉ có khi status = completed"""
+    id: UUID
+    status: ExportStatus
+    format: str
+    filters: Dict[str, Any]
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    progress: float = 0  # 0 -> 100 (%)
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
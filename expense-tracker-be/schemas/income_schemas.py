@@ -34,6 +34,7 @@ class IncomeOut(IncomeBase):
 class IncomeListOut(BaseModel):
     """Schema phản hồi cho danh sách thu nhập kèm cài đặt tiền tệ."""
     items: List[IncomeOut]
+    next_cursor: Optional[str] = None  # None = trang cuối
     currency_code: str
     currency_symbol: str
 
@@ -1,5 +1,6 @@
 from datetime import date, datetime
-from typing import Optional
+from decimal import Decimal
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -37,6 +38,13 @@ class TransactionOut(TransactionBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TransactionListOut(BaseModel):
+    """One keyset page of transactions; pass next_cursor back as `cursor` to get the next page."""
+
+    items: List[TransactionOut]
+    next_cursor: Optional[str] = None
+
+
 class RecentTransactionOut(BaseModel):
     """Schema for recent transactions."""
 
@@ -50,3 +58,29 @@ class RecentTransactionOut(BaseModel):
     note: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionBulkItem(BaseModel):
+    """One row of a bulk import; category is matched by ID, or by name (case-insensitive) and created if missing."""
+
+    type: str = Field(..., pattern="^(income|expense)$")
+    amount: Decimal = Field(..., gt=0)
+    category_id: Optional[UUID] = None
+    category_name: Optional[str] = Field(None, max_length=100)
+    currency_code: Optional[str] = Field(None, max_length=3)
+    note: Optional[str] = None
+    emoji: Optional[str] = Field(None, max_length=64)
+    date: Optional[date] = None  # Mặc định: hôm nay
+
+
+class TransactionBulkCreate(BaseModel):
+    """Schema for POST /transactions/bulk (all rows are inserted in one DB transaction)."""
+
+    items: List[TransactionBulkItem] = Field(..., min_length=1)
+
+
+class TransactionBulkOut(BaseModel):
+    """Result of a bulk insert: IDs in the same order as the request items."""
+
+    created: int
+    ids: List[UUID]
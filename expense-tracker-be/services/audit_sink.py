@@ -0,0 +1,126 @@
+# services/audit_sink.py
+"""
+Ghi audit log bất đồng bộ theo batch.
+
+crud_audit chỉ đưa sự kiện vào 1 hàng đợi trong process (không đụng session của request),
+1 thread nền gom tối đa AUDIT_BATCH_SIZE sự kiện rồi INSERT nhiều dòng trên connection riêng:
+- Request admin / chat tool không còn tốn thêm 1 commit + 1 refresh cho audit.
+- Lỗi ghi audit không thể rollback session của caller.
+- Hàng đợi có giới hạn: đầy thì caller chờ tối đa AUDIT_ENQUEUE_TIMEOUT_MS (backpressure),
+  quá thời gian đó sự kiện được ghi thẳng trên connection riêng thay vì bị bỏ.
+- main.lifespan gọi stop() khi tắt app để ghi nốt các sự kiện còn trong hàng đợi.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from core.config import settings
+from db.database import engine
+from models import audit_model
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditSink:
+    def __init__(
+            self,
+            max_queue_size: int,
+            batch_size: int,
+            flush_interval: float,
+            enqueue_timeout: float,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "direct_writes": 0, "dropped": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+
+    def emit(self, event: Dict) -> None:
+        """Đưa 1 sự kiện vào hàng đợi; tự khởi động thread nền (script/worker không qua lifespan)."""
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+            self.stats["enqueued"] += 1
+        except queue.Full:
+            logger.warning("Audit queue is full, writing event %s directly", event.get("action"))
+            self.stats["direct_writes"] += 1
+            self._write([event])
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ghi hết hàng đợi rồi dừng thread nền (chờ tối đa `timeout` giây)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("Audit sink did not drain within %ss, %d events pending", timeout, self._queue.qsize())
+            self._thread = None
+
+    def _next_batch(self) -> Tuple[List[Dict], bool]:
+        """Chờ sự kiện đầu tiên, rồi gom thêm tới khi đủ batch_size hoặc hết flush_interval."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write(batch)
+                self.stats["batches"] += 1
+
+    def _write(self, events: List[Dict]) -> None:
+        """1 câu INSERT nhiều dòng trên connection riêng; lỗi chỉ được log lại."""
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(audit_model.AuditLog.__table__), events)
+            self.stats["written"] += len(events)
+        except Exception:
+            self.stats["dropped"] += len(events)
+            logger.exception("Failed to write %d audit events", len(events))
+
+
+audit_sink = AuditSink(
+    max_queue_size=settings.AUDIT_QUEUE_MAX_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_MS / 1000,
+)
+# Process không chạy lifespan (script, Celery worker): vẫn ghi nốt hàng đợi khi thoát.
+atexit.register(audit_sink.stop, settings.AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
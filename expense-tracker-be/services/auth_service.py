@@ -3,7 +3,9 @@ from datetime import timedelta
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from cruds import crud_user
+from core.cache import bump_user_data_version, invalidate_auth_user_cache
 from core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from services import session_registry
 
 PENDING_TOKEN_EXPIRE_MINUTES = 5
 
@@ -21,24 +23,19 @@ def sync_firebase_user(db: Session, decoded_token: dict, payload_email: str, pay
     picture = payload_picture or decoded_token.get("picture")
     is_verified_firebase = decoded_token.get("email_verified", False)
 
-    user = crud_user.get_user_by_firebase_uid(db, uid)
-    if not user:
-        user = crud_user.create_user(db, firebase_uid=uid, email=email, name=name, profile_image=picture)
-    else:
-        updated = False
-        if email and user.email != email: user.email = email; updated = True
-        if name and user.name != name: user.name = name; updated = True
-        if picture and user.profile_image != picture: user.profile_image = picture; updated = True
-        if user.is_email_verified != is_verified_firebase:
-            user.is_email_verified = is_verified_firebase
-            updated = True
-        if updated:
-            db.add(user); db.commit(); db.refresh(user)
-
-    # Tạo Session Key mới (Đá session cũ)
+    # Tạo/cập nhật user + Session Key mới (Đá session cũ) trong 1 câu upsert, 1 commit
     new_session_key = str(uuid.uuid4())
-    user.last_session_key = new_session_key
-    db.add(user); db.commit(); db.refresh(user)
+    user, _ = crud_user.upsert_firebase_user(
+        db,
+        firebase_uid=uid,
+        session_key=new_session_key,
+        email=email,
+        name=name,
+        profile_image=picture,
+        is_email_verified=is_verified_firebase,
+    )
+    invalidate_auth_user_cache(user.id)
+    session_registry.register_session(user, new_session_key)
 
     # Phase 3: Gate API thật bằng 2FA
     # Nếu bật 2FA: không cấp access token, chỉ cấp pending token short-lived.
@@ -85,12 +82,19 @@ def update_user_profile(db: Session, user, data):
     if data.has_onboard is not None: user.has_onboard = data.has_onboard
 
     # Ràng buộc bảo mật Single Device
+    single_device_enabled = False
     if data.restrict_multi_device is not None:
         if data.restrict_multi_device is True and not user.is_2fa_enabled:
             raise HTTPException(status_code=400, detail="Security Requirement: You must enable 2FA before activating Single Device Mode.")
+        single_device_enabled = data.restrict_multi_device and not user.restrict_multi_device
         user.restrict_multi_device = data.restrict_multi_device
 
     db.add(user)
     db.commit()
     db.refresh(user)
+    invalidate_auth_user_cache(user.id)
+    if single_device_enabled:
+        # Vừa bật Single Device: chỉ giữ lại phiên đăng nhập mới nhất
+        session_registry.revoke_user_sessions(user.id, keep=user.last_session_key)
+    bump_user_data_version(user.id)  # Budget/currency hiển thị trên dashboard
     return user
@@ -1,14 +1,25 @@
 # services/auth_token_db.py (Đã sửa lỗi Import)
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from core.cache import (
+    get_auth_user_cache, get_auth_user_cache_sync, set_auth_user_cache, set_auth_user_cache_sync,
+)
 from core.config import settings
 from fastapi import Depends, HTTPException, Header
 from fastapi.security import OAuth2PasswordBearer
 from firebase_admin import auth as fb_auth
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from starlette import status
 
 from cruds.crud_user import create_user, get_user_by_firebase_uid
-from db.database import get_db
+from db.database import get_async_db, get_db
+from services import session_registry
+from services.firebase_token_verifier import firebase_token_verifier
 from models import user_model
 # ✅ SỬA LỖI Ở ĐÂY: Import User từ user_model
 from models.user_model import User
@@ -35,9 +46,9 @@ def extract_token(authorization: str) -> str:
 # Verify Token with Firebase
 # ----------------------
 def verify_token_and_get_payload(id_token: str):
-    """Xác minh Firebase ID token và trả payload."""
+    """Xác minh Firebase ID token và trả payload (cache tới exp, chứng chỉ Google giữ sẵn trong bộ nhớ)."""
     try:
-        decoded = fb_auth.verify_id_token(id_token)
+        decoded = firebase_token_verifier.verify(id_token)
         return decoded
     except fb_auth.ExpiredIdTokenError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -52,22 +63,25 @@ def verify_token_and_get_payload(id_token: str):
 # ----------------------
 # Dependency: get current user
 # ----------------------
-def get_current_user_db(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _decode_access_token(token: str):
+    """Giải mã access token -> (email, session_key, user_id). Chặn token pending_2fa."""
+    credentials_exception = _credentials_exception()
+
     try:
         # Giải mã Token
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         token_use: str = payload.get("token_use")
         email: str = payload.get("sub")
         token_session_key: str = payload.get("session_key")  # Lấy key từ token
+        token_user_id: str = payload.get("id")
 
         if email is None:
             raise credentials_exception
@@ -79,12 +93,79 @@ def get_current_user_db(
     except JWTError:
         raise credentials_exception
 
+    return email, token_session_key, token_user_id
+
+
+# ----------------------
+# Cache user đã xác thực (key = claim `id` của token)
+# ----------------------
+# Không bao giờ đưa hash mật khẩu / OTP secret lên cache; nếu cần, ORM sẽ tự lazy-load từ DB.
+_UNCACHED_USER_COLUMNS = {"password", "otp_secret"}
+_CACHED_USER_COLUMNS = [c for c in User.__table__.columns if c.key not in _UNCACHED_USER_COLUMNS]
+
+
+def _user_to_cache(user: User) -> dict:
+    data = {}
+    for column in _CACHED_USER_COLUMNS:
+        value = getattr(user, column.key)
+        if isinstance(value, (uuid.UUID, date, datetime, Decimal)):
+            value = value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+        data[column.key] = value
+    return data
+
+
+def _user_from_cache(data: dict) -> User:
+    values = {}
+    for column in _CACHED_USER_COLUMNS:
+        value = data.get(column.key)
+        if value is not None:
+            python_type = column.type.python_type
+            if python_type is uuid.UUID:
+                value = uuid.UUID(value)
+            elif python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is Decimal:
+                value = Decimal(value)
+        values[column.key] = value
+
+    user = User(**values)
+    # Đánh dấu như vừa load từ DB (có identity key, không có thay đổi chờ flush) để merge(load=False).
+    make_transient_to_detached(user)
+    return user
+
+
+def _cached_user_matches(data: dict, email: str, token_user_id: str) -> bool:
+    return bool(data) and data.get("email") == email and data.get("id") == token_user_id
+
+
+def _revoked_session_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Session expired. You have logged in on another device.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-    # Tìm user trong DB
-    user = db.query(user_model.User).filter(user_model.User.email == email).first()
-    if user is None:
-        raise credentials_exception
 
+async def _check_session_registry(token_user_id: str, token_session_key: str) -> None:
+    """
+    Tra sổ phiên trên Redis (services/session_registry.py) trước khi đụng tới user:
+    phiên bị thu hồi -> 401 ngay trên mọi worker. Phiên có trong sổ vẫn phải qua _check_single_device.
+    """
+    if await session_registry.check_session(token_user_id, token_session_key) is False:
+        raise _revoked_session_exception()
+
+
+def _check_session_registry_sync(token_user_id: str, token_session_key: str) -> None:
+    if session_registry.check_session_sync(token_user_id, token_session_key) is False:
+        raise _revoked_session_exception()
+
+
+def _check_single_device(user: User, token_session_key: str):
+    """Luôn chạy (kể cả khi sổ phiên trên Redis trả lời): so session_key của token với users.last_session_key."""
+    if user.last_session_key == session_registry.SESSION_RESET_MARKER:
+        raise _revoked_session_exception()  # Admin đã thu hồi mọi phiên
     # ============================================================
     # ✅ LOGIC SINGLE DEVICE MODE (CHỈ KÍCH HOẠT NẾU USER BẬT)
     # ============================================================
@@ -92,12 +173,59 @@ def get_current_user_db(
 
         # Kiểm tra xem key trong token có khớp với key mới nhất trong DB không
         if token_session_key != user.last_session_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Session expired. You have logged in on another device.",  # Thông báo bị đá
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            raise _revoked_session_exception()  # Thông báo bị đá
+
+
+def _load_user_by_email(db: Session, email: str):
+    return db.query(user_model.User).filter(user_model.User.email == email).first()
+
+
+def get_current_user_db(
+        token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_db)
+):
+    """
+    Dependency `def` (FastAPI chạy trong threadpool) vì mọi thao tác trên Session đồng bộ
+    (merge/query) đều có thể chạm DB -> không bao giờ chặn event loop. Redis dùng client đồng bộ.
+    """
+    email, token_session_key, token_user_id = _decode_access_token(token)
+    _check_session_registry_sync(token_user_id, token_session_key)
+
+    cached = get_auth_user_cache_sync(token_user_id) if token_user_id else None
+    if _cached_user_matches(cached, email, token_user_id):
+        # Gắn bản cache vào session của request mà không cần SELECT (route vẫn có thể sửa + commit user).
+        user = db.merge(_user_from_cache(cached), load=False)
+    else:
+        user = _load_user_by_email(db, email)
+        if user is None:
+            raise _credentials_exception()
+        if token_user_id and str(user.id) == token_user_id:
+            set_auth_user_cache_sync(token_user_id, _user_to_cache(user))
+
+    _check_single_device(user, token_session_key)
+    return user
+
 
+async def get_current_user_db_async(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Bản async của get_current_user_db cho các route chạy trên async_engine (không chiếm threadpool)."""
+    email, token_session_key, token_user_id = _decode_access_token(token)
+    await _check_session_registry(token_user_id, token_session_key)
+
+    cached = await get_auth_user_cache(token_user_id) if token_user_id else None
+    if _cached_user_matches(cached, email, token_user_id):
+        user = await db.merge(_user_from_cache(cached), load=False)
+    else:
+        result = await db.execute(select(user_model.User).where(user_model.User.email == email))
+        user = result.scalars().first()
+        if user is None:
+            raise _credentials_exception()
+        if token_user_id and str(user.id) == token_user_id:
+            await set_auth_user_cache(token_user_id, _user_to_cache(user))
+
+    _check_single_device(user, token_session_key)
     return user
 
 # ----------------------
@@ -0,0 +1,288 @@
+# services/chat_intent.py
+"""
+Nhận diện ý định (intent) của tin nhắn chatbot bằng luật cố định, không gọi LLM.
+- Fast path: câu hỏi phổ biến ("số dư", "xem 5 giao dịch cuối", "tháng này tiêu bao nhiêu") được trả lời
+  bằng cách gọi thẳng tool chỉ đọc, chỉ câu mơ hồ mới phải gọi LLM. Thao tác ghi duy nhất được nhận diện
+  là lệnh đặt ngân sách rõ ràng ("đặt ngân sách 5tr"), và chỉ chạy sau khi user xác nhận (xem chat_service).
+- Chat cache: các câu diễn đạt khác nhau nhưng cùng nghĩa
+  ("số dư", "còn bao nhiêu tiền", "what's my balance") quy về cùng 1 tool + tham số.
+"""
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from core.text import normalize_text, unaccent
+
+# Tool chỉ đọc: kết quả chỉ đổi khi dữ liệu đổi (đã có data_version lo phần invalidate).
+READ_ONLY_TOOLS = {"get_balance", "get_statistics", "analyze_spending", "get_history"}
+# Intent mà router tự xử lý được (có đủ tham số) -> không cần LLM. Chỉ tool chỉ đọc: câu hỏi về ngân sách
+# ("ngân sách tháng 5 là bao nhiêu?", "ngân sách 10tr có đủ không?") rất dễ bị hiểu nhầm thành lệnh ghi.
+FAST_PATH_TOOLS = READ_ONLY_TOOLS
+# Tool ghi mà router nhận diện được: không chạy ngay, chat_service hỏi lại và chỉ chạy khi user trả lời "có".
+CONFIRM_TOOLS = {"set_budget"}
+
+HISTORY_DEFAULT_LIMIT = 5
+HISTORY_MAX_LIMIT = 20
+
+# Có các động từ này -> không bao giờ đi fast path/cache (để LLM xử lý ghi/sửa/xóa).
+_WRITE_HINTS = re.compile(r"\b(ghi|them|xoa|sua|add|record|delete|remove|update|reset)\b")
+_ENGLISH_HINTS = re.compile(
+    r"\b(how|what|my|did|i|is|show|the|balance|spent|spend|spending|total|income|expenses?|chart|breakdown|"
+    r"today|yesterday|week|month|year|last|recent|transactions?|history|budget|set)\b"
+)
+
+# =========================================================
+# ✅ BỘ PHÂN LOẠI NHỎ: cộng điểm theo từ khóa (văn bản đã bỏ dấu)
+# =========================================================
+# "create_transaction" chỉ để "giành điểm": thắng -> trả về None, nhường cho LLM. "set_budget" thắng chỉ
+# thành intent khi là lệnh rõ ràng (_budget_args), câu hỏi về ngân sách vẫn qua LLM.
+INTENT_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "get_balance": {
+        "so du": 3, "balance": 3, "con bao nhieu": 2, "con lai bao nhieu": 2, "how much money": 2,
+    },
+    "get_statistics": {
+        "bao nhieu": 1, "tong": 2, "thong ke": 2, "chi tieu": 1, "tieu": 1, "xai": 1, "thu nhap": 1,
+        "kiem duoc": 1, "how much": 1, "total": 1.5, "statistics": 2, "stats": 2, "spent": 1.5, "spend": 1.5,
+        "spending": 2, "earned": 1, "income": 1, "expense": 1, "expenses": 1,
+    },
+    "analyze_spending": {
+        "bieu do": 3, "chart": 3, "co cau": 3, "breakdown": 3, "pie": 2,
+    },
+    "get_history": {
+        "lich su": 3, "history": 3, "giao dich": 1.5, "transaction": 1.5, "transactions": 1.5,
+        "cuoi": 1, "gan nhat": 1, "gan day": 1, "moi nhat": 1, "last": 1, "recent": 1, "latest": 1,
+    },
+    "set_budget": {
+        "ngan sach": 3, "budget": 3, "dinh muc": 3,
+    },
+    "create_transaction": {
+        "mua": 2, "an": 1.5, "uong": 1.5, "nhan luong": 3, "luong": 1.5, "tra tien": 2, "dong tien": 2,
+        "vua": 1.5, "bought": 2, "paid": 2, "received": 2, "salary": 2,
+    },
+}
+MIN_INTENT_SCORE = 2.0
+MIN_INTENT_MARGIN = 1.0
+
+_KEYWORD_PATTERNS = {
+    intent: [(re.compile(rf"\b{re.escape(keyword)}\b"), weight) for keyword, weight in keywords.items()]
+    for intent, keywords in INTENT_KEYWORDS.items()
+}
+
+_PERIOD_PATTERNS = {
+    "today": re.compile(r"\b(hom nay|today)\b"),
+    "yesterday": re.compile(r"\b(hom qua|yesterday)\b"),
+    "this_week": re.compile(r"\b(tuan nay|this week)\b"),
+    "last_week": re.compile(r"\b(tuan truoc|tuan roi|last week)\b"),
+    "this_month": re.compile(r"\b(thang nay|this month)\b"),
+    "last_month": re.compile(r"\b(thang truoc|thang roi|last month)\b"),
+    "this_year": re.compile(r"\b(nam nay|this year)\b"),
+}
+
+# 50k, 10tr, 1tr5, 2.5 triệu, 500 nghìn, 200.000, 1,5tr ...
+_AMOUNT_PATTERN = re.compile(
+    r"(?<![\w.,])(\d+(?:[.,]\d+)*)\s*(k|nghin|ngan|tr|trieu|cu|m|ty|b)?(\d)?(?!\w)"
+)
+_AMOUNT_UNITS = {
+    "k": 1_000, "nghin": 1_000, "ngan": 1_000,
+    "tr": 1_000_000, "trieu": 1_000_000, "cu": 1_000_000, "m": 1_000_000,
+    "ty": 1_000_000_000, "b": 1_000_000_000,
+}
+
+# Lệnh đặt ngân sách: bắt đầu bằng động từ mệnh lệnh, không phải câu hỏi ("ngân sách 10tr có đủ không?",
+# "what is my budget"), và ngoài số tiền chỉ còn từ chỉ ngân sách / từ đệm.
+_BUDGET_COMMAND = re.compile(r"^(dat|cai dat|cai|doi|set|change)\b")
+_QUESTION_HINTS = re.compile(r"\b(bao nhieu|khong|chua|co du|du|sao|what|how|is|enough|should|can)\b")
+_BUDGET_WORDS = re.compile(
+    r"\b(dat|cai dat|cai|doi|set|change|ngan sach|budget|dinh muc|muc|moi|new|monthly|thanh|to|la|vnd|dong)\b"
+)
+_CONFIRM_REPLIES = {"co", "ok", "oke", "okay", "yes", "y", "dong y", "xac nhan", "confirm", "co nhe", "yes please"}
+
+# Từ đệm không làm hẹp câu hỏi. Bỏ mốc thời gian, từ khóa của các intent chỉ đọc và các từ này mà vẫn còn
+# từ khác (VD: "cafe", "food", "grab") -> câu hỏi hẹp hơn kết quả tool (tổng mọi danh mục) -> LLM.
+_FILLER_WORDS = {
+    # vi
+    "toi", "minh", "em", "cua", "la", "vay", "the", "a", "nhe", "nha", "oi", "roi", "het", "cho", "xem", "coi",
+    "ve", "tien", "chi", "thu", "hien", "tai", "cac", "nhung", "duoc", "da",
+    # en
+    "what", "is", "are", "was", "my", "i", "me", "did", "do", "have", "has", "been", "how", "show", "tell",
+    "give", "see", "an", "of", "so", "far", "please", "can", "you", "all", "up", "money",
+}
+_EXPLAINED_PATTERNS = [
+    re.compile(rf"\b{re.escape(keyword)}\b")
+    for keyword in sorted((k for tool in READ_ONLY_TOOLS for k in INTENT_KEYWORDS[tool]), key=len, reverse=True)
+]
+
+
+def parse_amounts(message: str) -> List[float]:
+    """
+    Các số tiền trong câu theo cách viết của người Việt:
+    "50k" -> 50000, "10tr" -> 10000000, "1tr5" -> 1500000, "2,5 triệu" -> 2500000, "200.000" -> 200000.
+    """
+    amounts = []
+    for number, unit, tail in _AMOUNT_PATTERN.findall(unaccent(message)):
+        if unit:
+            # Có đơn vị: "2.5tr"/"2,5tr" là số thập phân, "1.500k" là phân cách hàng nghìn.
+            parts = re.split(r"[.,]", number)
+            if len(parts) == 2 and len(parts[1]) != 3:
+                value = float(f"{parts[0]}.{parts[1]}")
+            else:
+                value = float("".join(parts))
+            if tail:  # "1tr5" = 1.5tr
+                value += int(tail) / 10
+            amounts.append(value * _AMOUNT_UNITS[unit])
+        elif not tail:
+            amounts.append(float(re.sub(r"[.,]", "", number)))
+    return amounts
+
+
+def resolve_period(period: str, today: date) -> Tuple[date, date]:
+    """Khoảng ngày [start, end] của 1 mốc tương đối, khớp quy tắc "TỰ TÍNH NGÀY" trong system prompt."""
+    if period == "today":
+        return today, today
+    if period == "yesterday":
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if period == "this_week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "last_week":
+        end = today - timedelta(days=today.weekday() + 1)
+        return end - timedelta(days=6), end
+    if period == "this_month":
+        return today.replace(day=1), today
+    if period == "last_month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    if period == "this_year":
+        return today.replace(month=1, day=1), today
+    raise ValueError(f"Unknown period: {period}")
+
+
+def _find_periods(text: str) -> List[str]:
+    return [name for name, pattern in _PERIOD_PATTERNS.items() if pattern.search(text)]
+
+
+def _strip_periods(text: str) -> str:
+    """Bỏ mốc thời gian TRƯỚC khi chấm điểm từ khóa: "last" trong "last week" không phải từ khóa get_history."""
+    for pattern in _PERIOD_PATTERNS.values():
+        text = pattern.sub(" ", text)
+    return " ".join(text.split())
+
+
+def _awaiting_answer(history: List[Dict]) -> bool:
+    """Bot vừa hỏi lại (slot-filling) -> câu trả lời của user thuộc giao dịch đang dở, không phải tra cứu."""
+    if not history:
+        return False
+    last = history[-1]
+    return last.get("role") == "bot" and last.get("content", "").rstrip().endswith("?")
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """Intent có điểm cao nhất, hoặc None nếu điểm thấp / 2 intent sát nút (câu mơ hồ)."""
+    scores = sorted(
+        ((sum(weight for pattern, weight in patterns if pattern.search(text)), intent)
+         for intent, patterns in _KEYWORD_PATTERNS.items()),
+        reverse=True,
+    )
+    (best_score, best), (runner_up, _) = scores[0], scores[1]
+    if best_score < MIN_INTENT_SCORE or best_score - runner_up < MIN_INTENT_MARGIN:
+        return None
+    return best
+
+
+def _tool_args(tool: str, text: str, periods: List[str], today: date) -> Optional[Dict]:
+    """Trích tham số cho tool (text đã bỏ mốc thời gian); None nếu thiếu/thừa thông tin (VD: 2 mốc thời gian)."""
+    has_digits = bool(re.search(r"\d", text))
+
+    if tool == "get_balance":
+        # "số dư tháng này": get_balance hay get_statistics đều hợp lý -> không đoán
+        return {} if not periods and not has_digits else None
+
+    if tool in ("get_statistics", "analyze_spending"):
+        if len(periods) != 1 or has_digits:  # Không có mốc, so sánh nhiều mốc, hoặc ngày cụ thể -> LLM
+            return None
+        start, end = resolve_period(periods[0], today)
+        return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+    if tool == "get_history":
+        numbers = [int(n) for n in re.findall(r"\b\d+\b", text)]
+        if periods or len(numbers) > 1:  # "hôm qua tiêu gì" cần lọc theo ngày -> LLM
+            return None
+        limit = numbers[0] if numbers else HISTORY_DEFAULT_LIMIT
+        return {"limit": limit} if 0 < limit <= HISTORY_MAX_LIMIT else None
+
+    return None
+
+
+def _budget_args(message: str, text: str, periods: List[str]) -> Optional[Dict]:
+    """{"amount"} nếu là lệnh đặt ngân sách tháng này rõ ràng với đúng 1 số tiền, ngược lại None -> LLM."""
+    if (not _BUDGET_COMMAND.match(text) or "?" in message or _QUESTION_HINTS.search(text)
+            or any(period != "this_month" for period in periods)):
+        return None
+    amounts = parse_amounts(message)
+    if len(amounts) != 1 or amounts[0] <= 0:
+        return None
+    rest = _BUDGET_WORDS.sub(" ", _strip_periods(normalize_text(_AMOUNT_PATTERN.sub(" ", unaccent(message)))))
+    if any(word not in _FILLER_WORDS for word in rest.split()):  # "tháng sau", "tuần", "ăn uống" ... -> LLM
+        return None
+    return {"amount": amounts[0]}
+
+
+def is_confirmation(message: str) -> bool:
+    """Câu trả lời đồng ý ("có", "ok", "yes") cho câu hỏi xác nhận của bot."""
+    return normalize_text(message) in _CONFIRM_REPLIES
+
+
+def _unexplained_words(tool: str, text: str) -> List[str]:
+    """Các từ còn lại (text đã bỏ mốc thời gian) sau khi bỏ từ khóa intent, từ đệm (và số lượng của get_history)."""
+    for pattern in _EXPLAINED_PATTERNS:
+        text = pattern.sub(" ", text)
+    return [
+        word for word in text.split()
+        if word not in _FILLER_WORDS and not (tool == "get_history" and word.isdigit())
+    ]
+
+
+def detect_language(message: str, text: str = None) -> str:
+    text = normalize_text(message) if text is None else text
+    return "en" if message.isascii() and _ENGLISH_HINTS.search(text) else "vi"
+
+
+def route_message(message: str, history: List[Dict] = None, today: date = None) -> Optional[Dict]:
+    """
+    Trả về {"tool", "args", "lang"} nếu câu chắc chắn ánh xạ thẳng vào 1 tool (FAST_PATH_TOOLS, hoặc
+    CONFIRM_TOOLS cần user xác nhận) và được giải thích trọn vẹn bởi intent + tham số (không còn
+    danh mục / cửa hàng / từ lạ), ngược lại None -> để LLM xử lý.
+    """
+    normalized = normalize_text(message)
+    if not normalized or _WRITE_HINTS.search(normalized) or _awaiting_answer(history or []):
+        return None
+
+    periods = _find_periods(normalized)
+    text = _strip_periods(normalized)
+    tool = classify_intent(text)
+    if tool == "set_budget":
+        args = _budget_args(message, text, periods)
+    elif tool in FAST_PATH_TOOLS:
+        args = _tool_args(tool, text, periods, today or date.today())
+        if _unexplained_words(tool, text):
+            args = None
+    else:
+        return None
+
+    if args is None:
+        return None
+    return {"tool": tool, "args": args, "lang": detect_language(message, normalized)}
+
+
+def intent_matches_tool_calls(intent: Dict, tool_calls: List[Tuple[str, Dict]]) -> bool:
+    """
+    Chỉ lưu cache khi LLM thực sự gọi đúng tool + tham số đã đoán và không gọi tool ghi nào:
+    nếu LLM hiểu khác (VD: tự chọn khoảng ngày khác) thì câu trả lời không khớp key.
+    """
+    if not tool_calls or any(name not in READ_ONLY_TOOLS for name, _ in tool_calls):
+        return False
+    expected = {k: str(v) for k, v in intent["args"].items()}
+    return any(
+        name == intent["tool"] and {k: str(v) for k, v in (args or {}).items()} == expected
+        for name, args in tool_calls
+    )
@@ -1,224 +1,228 @@
 ﻿# services/chat_service.py
 import hashlib
+import json
+import threading
 from datetime import date
-from typing import List, Dict
+from typing import List, Dict, Optional
+from uuid import UUID
+
+import anyio
+from cachetools import TTLCache
 
 # 1. Import AI Core
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 
-# 2. âœ… IMPORT CHUáº¨N CHO LANGCHAIN 0.3
+# 2. ✅ IMPORT CHUẨN CHO LANGCHAIN 0.3
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 
 # 3. Import Internal Modules
 from sqlalchemy.orm import Session
 
-from core.cache import set_cached, get_cached
+from core.cache import set_cached, get_cached, delete_cached, get_data_versions, get_data_versions_sync
 from core.config import settings
+from db.database import SessionLocal
 from models import user_model
+from services.chat_intent import (
+    CONFIRM_TOOLS, READ_ONLY_TOOLS, intent_matches_tool_calls, is_confirmation, route_message,
+)
 from services.chat_tools import get_finbot_tools
 from cruds.crud_category import get_user_category_names_string
 
-# =========================================================
-# âœ… CACHE HELPERS
-# =========================================================
-def generate_cache_key(user_id: int, message: str, history: List[Dict]) -> str:
-    """
-    Táº¡o cache key cÃ³ context (trÃ¡nh cache sai)
-    """
-    recent_history = history[-3:] if history else []
-    raw = f"{user_id}:{message}:{recent_history}"
-    return "chat:" + hashlib.md5(raw.encode()).hexdigest()
+CHAT_CACHE_TTL_SECONDS = 600
+# Lệnh ghi chờ xác nhận ("đặt ngân sách 5tr" -> "có"): FE không gửi lịch sử chat nên lưu trên Redis theo user.
+CHAT_PENDING_TTL_SECONDS = 120
 
 
-def is_cacheable_query(message: str) -> bool:
-    """
-    Chá»‰ cache cÃ¡c cÃ¢u há»i read-only (trÃ¡nh sai dá»¯ liá»‡u)
-    """
-    keywords = [
-        "bao nhiÃªu", "thá»‘ng kÃª", "sá»‘ dÆ°", "biá»ƒu Ä‘á»“",
-        "how much", "statistics", "balance", "report"
-    ]
-    message_lower = message.lower()
-    return any(k in message_lower for k in keywords)
+def _pending_key(user_id) -> str:
+    return f"chat_pending:{user_id}"
 
 
-async def process_chat_message(
-        db: Session,
-        user: user_model.User,
-        user_message: str,
-        history: List[Dict] = None):
+# =========================================================
+# ✅ CACHE HELPERS (key theo intent, không theo câu chữ)
+# =========================================================
+def generate_cache_key(user_id, intent: Dict, versions) -> str:
     """
-    HÃ m xá»­ lÃ½ tin nháº¯n Chatbot chÃ­nh:
-    1. Khá»Ÿi táº¡o LLM (Gemini)
-    2. Chuáº©n bá»‹ Tools & Context
-    3. XÃ¢y dá»±ng System Prompt
-    4. Gá»i Agent thá»±c thi
+    chat:{user}:{phiên bản dữ liệu}:{ngôn ngữ}:{tool}:{hash tham số}
+    Thêm/sửa/xóa giao dịch bump data_version -> câu trả lời cũ (VD: "số dư") không bao giờ bị đọc lại.
+    Key bỏ qua phần còn lại của câu: route_message chỉ trả intent khi câu được giải thích trọn vẹn
+    bởi tool + tham số ("tháng này tiêu cafe bao nhiêu" -> None), nên 2 câu cùng key luôn cùng câu trả lời.
     """
+    user_version, global_version = versions
+    args_hash = hashlib.md5(json.dumps(intent["args"], sort_keys=True).encode()).hexdigest()
+    return f"chat:{user_id}:{user_version}.{global_version}:{intent['lang']}:{intent['tool']}:{args_hash}"
 
-    # --- 1. Khá»Ÿi táº¡o Gemini Model (Singleton-like behavior) ---
-    history = history or []
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash-lite", # âœ… ÄÃ£ sá»­a: dÃ¹ng model 1.5-flash chuáº©n
-        temperature=0,
-        google_api_key=settings.google_genai_api_key
-    )
-    # =====================================================
-    # âœ… CACHE CHECK
-    # =====================================================
-    cache_key = generate_cache_key(user.id, user_message, history)
 
-    if is_cacheable_query(user_message):
-        cached = await get_cached(cache_key)
-        if cached is not None:
-            return cached
-
-    # 2. Láº¥y Tools & Context
-    tools = get_finbot_tools(db, user)
-    category_context = get_user_category_names_string(db, user.id)
-
-    # Chuáº©n bá»‹ thá»i gian
-    today = date.today()
-    weekday_map = ["Hai", "Ba", "TÆ°", "NÄƒm", "SÃ¡u", "Báº£y", "Chá»§ Nháº­t"]
-    weekday_str = weekday_map[today.weekday()]
-
-    # Khu vá»±c Admin
-    admin_str = ""
-    if user.is_admin:
-        admin_str = """
-            7. **QUáº¢N TRá»Š VIÃŠN (Admin Mode):**
-                - **Tá»•ng quan:** Há»i "tÃ¬nh hÃ¬nh há»‡ thá»‘ng", "sá»‘ liá»‡u toÃ n sÃ n" -> DÃ¹ng `admin_get_kpi`.
-                - **GiÃ¡m sÃ¡t:** Há»i "ai vá»«a lÃ m gÃ¬", "xem log", "nháº­t kÃ½" -> DÃ¹ng `admin_get_logs`.
-                - **Tra cá»©u:** Há»i "check user A", "tÃ¬m thÃ´ng tin email B" -> DÃ¹ng `admin_search_user`.
-                - **Cá»¨U Há»˜ (Quan trá»ng):** Náº¿u nghe lá»‡nh "Reset báº£o máº­t", "Gá»¡ 2FA", "Cá»©u user A" -> DÃ¹ng `admin_emergency_reset`.
+# =========================================================
+# ✅ SYSTEM PROMPT (dựng 1 lần / vai trò, không format lại mỗi request)
+# =========================================================
+# current_date, weekday, categories (ngoặc kép {{...}}) là biến của prompt, điền lúc invoke;
+# {admin_instructions} được điền 1 lần khi dựng agent cho từng vai trò.
+ADMIN_INSTRUCTIONS = """
+            7. **QUẢN TRỊ VIÊN (Admin Mode):**
+                - **Tổng quan:** Hỏi "tình hình hệ thống", "số liệu toàn sàn" -> Dùng `admin_get_kpi`.
+                - **Giám sát:** Hỏi "ai vừa làm gì", "xem log", "nhật ký" -> Dùng `admin_get_logs`.
+                - **Tra cứu:** Hỏi "check user A", "tìm thông tin email B" -> Dùng `admin_search_user`.
+                - **CỨU HỘ (Quan trọng):** Nếu nghe lệnh "Reset bảo mật", "Gỡ 2FA", "Cứu user A" -> Dùng `admin_emergency_reset`.
             """
 
-    # 3. SYSTEM PROMPT (Báº¢N ÄÃƒ TINH Gá»ŒN & Sáº®P Xáº¾P Há»¢P LÃ)
-    SYSTEM_TEMPLATE = """
-        Báº¡n lÃ  FinBot, trá»£ lÃ½ tÃ i chÃ­nh cÃ¡ nhÃ¢n thÃ´ng minh vÃ  táº­n tá»¥y.
+SYSTEM_TEMPLATE = """
+        Bạn là FinBot, trợ lý tài chính cá nhân thông minh và tận tụy.
 
-        # THÃ”NG TIN NGá»® Cáº¢NH
-        - HÃ´m nay: {{current_date}} (Thá»© {{weekday}}).
-        - Danh má»¥c hiá»‡n cÃ³: {categories}
+        # THÔNG TIN NGỮ CẢNH
+        - Hôm nay: {{current_date}} (Thứ {{weekday}}).
+        - Danh mục hiện có: {{categories}}
 
-        # NHIá»†M Vá»¤ & CÃ”NG Cá»¤ (CHá»ŒN TOOL PHÃ™ Há»¢P):
+        # NHIỆM VỤ & CÔNG CỤ (CHỌN TOOL PHÙ HỢP):
 
-        1. **GHI CHÃ‰P (create_transaction):**
-            - DÃ¹ng khi user nÃ³i: "vá»«a Äƒn 50k", "nháº­n lÆ°Æ¡ng 10tr", "mua Ã¡o táº·ng máº¹".
-            - **Tá»° Äá»˜NG:** Suy luáº­n Loáº¡i, Sá»‘ tiá»n, Danh má»¥c (khá»›p danh sÃ¡ch).
-            - **QUAN TRá»ŒNG:** Náº¿u user liá»‡t kÃª NHIá»€U khoáº£n (VD: "Äƒn sÃ¡ng 30k VÃ€ cafe 20k"), hÃ£y dÃ¹ng tool `create_batch_transactions` Ä‘á»ƒ ghi táº¥t cáº£ trong 1 láº§n gá»i.
-            - **GHI CHÃš:** TrÃ­ch xuáº¥t chi tiáº¿t phá»¥ (VD: "táº·ng máº¹") vÃ o tham sá»‘ `note`.
+        1. **GHI CHÉP (create_transaction):**
+            - Dùng khi user nói: "vừa ăn 50k", "nhận lương 10tr", "mua áo tặng mẹ".
+            - **TỰ ĐỘNG:** Suy luận Loại, Số tiền, Danh mục (khớp danh sách).
+            - **QUAN TRỌNG:** Nếu user liệt kê NHIỀU khoản (VD: "ăn sáng 30k VÀ cafe 20k"), hãy dùng tool `create_batch_transactions` để ghi tất cả trong 1 lần gọi.
+            - **GHI CHÚ:** Trích xuất chi tiết phụ (VD: "tặng mẹ") vào tham số `note`.
 
-        2. **CÃ€I Äáº¶T NGÃ‚N SÃCH (set_budget):**
-            - DÃ¹ng khi user nÃ³i: "Ä‘áº·t ngÃ¢n sÃ¡ch thÃ¡ng nÃ y 5 triá»‡u", "Ä‘á»‹nh má»©c tiÃªu lÃ  10tr".
-            - Bot tráº£ lá»i xÃ¡c nháº­n sá»‘ tiá»n Ä‘Ã£ cÃ i.
+        2. **CÀI ĐẶT NGÂN SÁCH (set_budget):**
+            - Dùng khi user nói: "đặt ngân sách tháng này 5 triệu", "định mức tiêu là 10tr".
+            - Bot trả lời xác nhận số tiền đã cài.
 
-        3. **TRA Cá»¨U Lá»ŠCH Sá»¬ (get_history):**
-            - DÃ¹ng khi user há»i: "hÃ´m qua tiÃªu gÃ¬", "sÃ¡ng nay lÃ m gÃ¬", "vá»«a nháº­p cÃ¡i gÃ¬", "check láº¡i 3 giao dá»‹ch cuá»‘i".
-            - Tool tráº£ vá» danh sÃ¡ch chi tiáº¿t (ngÃ y, tiá»n, note). HÃ£y Ä‘á»c nÃ³ vÃ  bÃ¡o cÃ¡o láº¡i.
+        3. **TRA CỨU LỊCH SỬ (get_history):**
+            - Dùng khi user hỏi: "hôm qua tiêu gì", "sáng nay làm gì", "vừa nhập cái gì", "check lại 3 giao dịch cuối".
+            - Tool trả về danh sách chi tiết (ngày, tiền, note). Hãy đọc nó và báo cáo lại.
 
-        4. **PHÃ‚N TÃCH & Váº¼ BIá»‚U Äá»’ (analyze_spending):**
-            - DÃ¹ng khi user há»i: "váº½ biá»ƒu Ä‘á»“", "cÆ¡ cáº¥u chi tiÃªu", "xem thá»‘ng kÃª dáº¡ng biá»ƒu Ä‘á»“".
-            - **QUY Táº®C:** Tool tráº£ vá» tháº» `[CHART_DATA_START]...`. Giá»¯ nguyÃªn tháº» nÃ y, khÃ´ng xÃ³a, khÃ´ng bá»c markdown.
+        4. **PHÂN TÍCH & VẼ BIỂU ĐỒ (analyze_spending):**
+            - Dùng khi user hỏi: "vẽ biểu đồ", "cơ cấu chi tiêu", "xem thống kê dạng biểu đồ".
+            - **QUY TẮC:** Tool trả về thẻ `[CHART_DATA_START]...`. Giữ nguyên thẻ này, không xóa, không bọc markdown.
 
-        5. **THá»NG KÃŠ (get_statistics) & Sá» DÆ¯ (get_balance):**
-            - DÃ¹ng khi há»i tá»•ng quÃ¡t: "thÃ¡ng nÃ y tiÃªu bao nhiÃªu", "sá»‘ dÆ°".
-            - Tá»° TÃNH NGÃ€Y: "ThÃ¡ng nÃ y" (1 -> nay), "ThÃ¡ng trÆ°á»›c" (1 -> cuá»‘i thÃ¡ng trÆ°á»›c), "HÃ´m qua" (nay - 1).
+        5. **THỐNG KÊ (get_statistics) & SỐ DƯ (get_balance):**
+            - Dùng khi hỏi tổng quát: "tháng này tiêu bao nhiêu", "số dư".
+            - TỰ TÍNH NGÀY: "Tháng này" (1 -> nay), "Tháng trước" (1 -> cuối tháng trước), "Hôm qua" (nay - 1).
 
-        6. **TÆ¯ Váº¤N TÃ€I CHÃNH (financial_advice) - [Má»šI]:**
-            - DÃ¹ng khi user há»i: "tÃ´i tiÃªu tháº¿ nÃ y cÃ³ á»•n khÃ´ng?", "gá»£i Ã½ cÃ¡ch tiáº¿t kiá»‡m".
-            - **HÃ€NH Äá»˜NG:** Tá»° Äá»˜NG gá»i tool `get_statistics` hoáº·c `get_balance` Ä‘á»ƒ xem sá»‘ liá»‡u trÆ°á»›c khi khuyÃªn.
-            - **Ná»˜I DUNG:** Dá»±a trÃªn sá»‘ liá»‡u thá»±c táº¿ Ä‘á»ƒ Ä‘Æ°a ra lá»i khuyÃªn ngáº¯n gá»n, há»¯u Ã­ch.
+        6. **TƯ VẤN TÀI CHÍNH (financial_advice) - [MỚI]:**
+            - Dùng khi user hỏi: "tôi tiêu thế này có ổn không?", "gợi ý cách tiết kiệm".
+            - **HÀNH ĐỘNG:** TỰ ĐỘNG gọi tool `get_statistics` hoặc `get_balance` để xem số liệu trước khi khuyên.
+            - **NỘI DUNG:** Dựa trên số liệu thực tế để đưa ra lời khuyên ngắn gọn, hữu ích.
 
         {admin_instructions}
 
-        # ðŸ›¡ï¸ CÆ  CHáº¾ Báº¢O Vá»† NGá»® Cáº¢NH (CONTEXT GUARD) - Æ¯U TIÃŠN Sá» 1:
+        # 🛡️ CƠ CHẾ BẢO VỆ NGỮ CẢNH (CONTEXT GUARD) - ƯU TIÊN SỐ 1:
 
-        Báº¡n pháº£i phÃ¢n tÃ­ch Lá»ŠCH Sá»¬ CHAT trÆ°á»›c khi quyáº¿t Ä‘á»‹nh gá»i tool.
+        Bạn phải phân tích LỊCH SỬ CHAT trước khi quyết định gọi tool.
 
-        **TÃŒNH HUá»NG Cáº¤M (Anti-Hijacking):**
-        - Khi báº¡n vá»«a há»i User: "Báº¡n muá»‘n ghi vÃ o ngÃ y nÃ o?" hoáº·c "Sá»‘ tiá»n lÃ  bao nhiÃªu?".
-        - VÃ  User tráº£ lá»i cá»¥t lá»§n (VD: "2024-12-03", "150k", "hÃ´m qua").
-        - **SAI:** Gá»i tool `get_statistics` hay `analyze_spending` (Cáº¤M vÃ¬ User khÃ´ng cÃ³ Ã½ Ä‘á»‹nh tra cá»©u).
-        - **ÄÃšNG:** Gá»i ngay `create_transaction` Ä‘á»ƒ hoÃ n táº¥t giao dá»‹ch Ä‘ang dá»Ÿ.
+        **TÌNH HUỐNG CẤM (Anti-Hijacking):**
+        - Khi bạn vừa hỏi User: "Bạn muốn ghi vào ngày nào?" hoặc "Số tiền là bao nhiêu?".
+        - Và User trả lời cụt lủn (VD: "2024-12-03", "150k", "hôm qua").
+        - **SAI:** Gọi tool `get_statistics` hay `analyze_spending` (CẤM vì User không có ý định tra cứu).
+        - **ĐÚNG:** Gọi ngay `create_transaction` để hoàn tất giao dịch đang dở.
 
-        **VÃ Dá»¤ MáºªU (Few-Shot):**
+        **VÍ DỤ MẪU (Few-Shot):**
         --------------------------------------------------
-        [Lá»‹ch sá»­]:
-        Bot: "Khoáº£n nÃ y vÃ o ngÃ y nÃ o áº¡?"
+        [Lịch sử]:
+        Bot: "Khoản này vào ngày nào ạ?"
         User: "2024-12-03"
-        [Suy nghÄ© AI]: User Ä‘ang tráº£ lá»i ngÃ y cho giao dá»‹ch trÆ°á»›c -> Gá»i `create_transaction(date_str='2024-12-03', ...)`
+        [Suy nghĩ AI]: User đang trả lời ngày cho giao dịch trước -> Gọi `create_transaction(date_str='2024-12-03', ...)`
         --------------------------------------------------
 
-        # âš ï¸ QUY Táº®C Xá»¬ LÃ Há»˜I THOáº I (TUÃ‚N THá»¦):
-        1. **Æ¯U TIÃŠN SLOT-FILLING:** Náº¿u Ä‘ang thu tháº­p thÃ´ng tin (tiá»n, ngÃ y, má»¥c), pháº£i hoÃ n thÃ nh viá»‡c Ghi chÃ©p trÆ°á»›c khi lÃ m viá»‡c khÃ¡c.
-        2. **KHÃ”NG Láº C Äá»€:** Tháº¥y ngÃ y thÃ¡ng/con sá»‘ -> Kiá»ƒm tra xem cÃ³ giao dá»‹ch nÃ o Ä‘ang chá» khÃ´ng -> Náº¿u cÃ³: Äiá»n vÃ o vÃ  LÆ°u. Náº¿u khÃ´ng: Má»›i Ä‘Æ°á»£c tra cá»©u.
-        3. **PHáº¢N Há»’I:** Náº¿u gá»i `create_transaction` thÃ nh cÃ´ng, Báº®T BUá»˜C thÃªm tháº» `[REFRESH]` vÃ o cuá»‘i cÃ¢u tráº£ lá»i.
-        4. **Logic:** Tháº¥y ngÃ y thÃ¡ng -> Kiá»ƒm tra xem cÃ³ giao dá»‹ch nÃ o Ä‘ang chá» ngÃ y khÃ´ng -> Náº¿u cÃ³: Äiá»n vÃ o vÃ  LÆ°u. Náº¿u khÃ´ng: Má»›i Ä‘Æ°á»£c tra cá»©u.
+        # ⚠️ QUY TẮC XỬ LÝ HỘI THOẠI (TUÂN THỦ):
+        1. **ƯU TIÊN SLOT-FILLING:** Nếu đang thu thập thông tin (tiền, ngày, mục), phải hoàn thành việc Ghi chép trước khi làm việc khác.
+        2. **KHÔNG LẠC ĐỀ:** Thấy ngày tháng/con số -> Kiểm tra xem có giao dịch nào đang chờ không -> Nếu có: Điền vào và Lưu. Nếu không: Mới được tra cứu.
+        3. **PHẢN HỒI:** Nếu gọi `create_transaction` thành công, BẮT BUỘC thêm thẻ `[REFRESH]` vào cuối câu trả lời.
+        4. **Logic:** Thấy ngày tháng -> Kiểm tra xem có giao dịch nào đang chờ ngày không -> Nếu có: Điền vào và Lưu. Nếu không: Mới được tra cứu.
         
-        # ðŸŒ NGÃ”N NGá»® & PHONG CÃCH TRáº¢ Lá»œI (LANGUAGE & STYLE):
-        1. **NHáº¬N DIá»†N NGÃ”N NGá»® (AUTO-DETECT):**
-           - Náº¿u User dÃ¹ng Tiáº¿ng Viá»‡t: Tráº£ lá»i báº±ng Tiáº¿ng Viá»‡t (Vui váº», thÃ¢n thiá»‡n).
+        # 🌍 NGÔN NGỮ & PHONG CÁCH TRẢ LỜI (LANGUAGE & STYLE):
+        1. **NHẬN DIỆN NGÔN NGỮ (AUTO-DETECT):**
+           - Nếu User dùng Tiếng Việt: Trả lời bằng Tiếng Việt (Vui vẻ, thân thiện).
            - If User uses English: Respond in English (Friendly, helpful).
         
-        2. **Dá»ŠCH THUáº¬T Káº¾T QUáº¢ TOOL (TRANSLATION):**
-           - Tool cÃ³ thá»ƒ tráº£ vá» thÃ´ng bÃ¡o Tiáº¿ng Viá»‡t (VD: "âœ… ÄÃ£ thÃªm THU NHáº¬P...").
-           - **Náº¿u Ä‘ang chat Tiáº¿ng Anh:** HÃ£y **Dá»ŠCH** ná»™i dung thÃ´ng bÃ¡o Ä‘Ã³ sang Tiáº¿ng Anh cho User hiá»ƒu.
-           - **QUAN TRá»ŒNG:** Tuyá»‡t Ä‘á»‘i **GIá»® NGUYÃŠN** cÃ¡c tháº» ká»¹ thuáº­t nhÆ° `[REFRESH]`, `[CHART_DATA_START]`, `[ADMIN_...]`. KhÃ´ng Ä‘Æ°á»£c dá»‹ch hay xÃ³a chÃºng.
+        2. **DỊCH THUẬT KẾT QUẢ TOOL (TRANSLATION):**
+           - Tool có thể trả về thông báo Tiếng Việt (VD: "✅ Đã thêm THU NHẬP...").
+           - **Nếu đang chat Tiếng Anh:** Hãy **DỊCH** nội dung thông báo đó sang Tiếng Anh cho User hiểu.
+           - **QUAN TRỌNG:** Tuyệt đối **GIỮ NGUYÊN** các thẻ kỹ thuật như `[REFRESH]`, `[CHART_DATA_START]`, `[ADMIN_...]`. Không được dịch hay xóa chúng.
 
-        3. **THÃI Äá»˜:**
-           - Náº¿u tool tráº£ vá» cáº£nh bÃ¡o (âš ï¸): Láº·p láº¡i cáº£nh bÃ¡o Ä‘Ã³ (Dá»‹ch náº¿u cáº§n).
+        3. **THÁI ĐỘ:**
+           - Nếu tool trả về cảnh báo (⚠️): Lặp lại cảnh báo đó (Dịch nếu cần).
         """
 
-    # Format Prompt
-    formatted_system_prompt = SYSTEM_TEMPLATE.format(
-        current_date=today.strftime("%Y-%m-%d"),
-        weekday=weekday_str,
-        categories=category_context,
-        admin_instructions=admin_str
-    )
+WEEKDAY_NAMES = ["Hai", "Ba", "Tư", "Năm", "Sáu", "Bảy", "Chủ Nhật"]
 
-    # --- 5. Xá»­ lÃ½ Lá»‹ch sá»­ Chat ---
-    chat_history = []
-    recent_history = history[-6:]
 
-    for msg in recent_history:
-        if msg['role'] == 'user':
-            chat_history.append(HumanMessage(content=msg['content']))
-        elif msg['role'] == 'bot':
-            clean_content = msg['content'].split("[CHART_DATA_START]")[0]
-            chat_history.append(AIMessage(content=clean_content))
+# =========================================================
+# ✅ GIỚI HẠN SỐ AGENT CHẠY ĐỒNG THỜI
+# =========================================================
+_chat_limiter = None
 
-    # --- 6. Táº¡o Agent & Thá»±c thi ---
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", formatted_system_prompt),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-        ("placeholder", "{agent_scratchpad}"),
-    ])
 
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=False)
+def _get_chat_limiter() -> anyio.CapacityLimiter:
+    """Tạo lười trong event loop; tối đa CHAT_MAX_CONCURRENCY agent chạy song song mỗi worker."""
+    global _chat_limiter
+    if _chat_limiter is None:
+        _chat_limiter = anyio.CapacityLimiter(settings.CHAT_MAX_CONCURRENCY)
+    return _chat_limiter
+
+
+async def process_chat_message(
+        user: user_model.User,
+        user_message: str,
+        history: List[Dict] = None):
+    """
+    Hàm xử lý tin nhắn Chatbot chính:
+    0. Lệnh ghi đang chờ xác nhận: "có" -> chạy lệnh; câu khác -> hủy lệnh chờ
+    1. Router luật cố định nhận diện intent (câu phổ biến + tham số đã chuẩn hóa);
+       lệnh ghi (CONFIRM_TOOLS) chỉ được lưu lại và hỏi xác nhận
+    2. Kiểm tra cache theo intent (chỉ với tool chỉ đọc)
+    3. Fast path: gọi thẳng tool + trả lời theo mẫu, không gọi LLM
+    4. Câu mơ hồ: đẩy việc chạy Agent (LLM + tools dùng SQLAlchemy sync) sang thread pool có giới hạn,
+       để event loop không bị chặn trong suốt vòng gọi LLM
+    5. Lưu cache nếu câu trả lời khớp intent
+    """
+    history = history or []
+    pending_key = _pending_key(user.id)
+    if is_confirmation(user_message):
+        intent = await get_cached(pending_key)
+    else:
+        intent = None
+    # Lệnh chờ chỉ sống đúng 1 lượt: "có" ở câu sau nữa (VD: trả lời câu hỏi khác của LLM) không được ghi nhầm.
+    await delete_cached(pending_key)
+
+    if intent is None:
+        intent = route_message(user_message, history)
+        if intent is not None and intent["tool"] in CONFIRM_TOOLS:
+            if await set_cached(pending_key, intent, ex=CHAT_PENDING_TTL_SECONDS):
+                return render_confirm_prompt(intent)
+            intent = None  # Redis lỗi -> không lưu được lệnh chờ, để LLM xử lý
+
+    # =====================================================
+    # ✅ CACHE CHECK
+    # =====================================================
+    cache_key = None
+    if intent is not None and intent["tool"] in READ_ONLY_TOOLS:
+        versions = await get_data_versions(user.id)
+        if versions is not None:  # Redis lỗi -> không cache (không thể invalidate)
+            cache_key = generate_cache_key(user.id, intent, versions)
+            cached = await get_cached(cache_key)
+            if cached is not None:
+                return cached
 
     try:
-        result = agent_executor.invoke({
-            "input": user_message,
-            "chat_history": chat_history,
-            "current_date": today.strftime("%Y-%m-%d"),
-            "weekday": weekday_str
-        })
-        output = result["output"]
+        # =================================================
+        # ✅ FAST PATH (không LLM)
+        # =================================================
+        if intent is not None:
+            output = await anyio.to_thread.run_sync(_run_fast_path, user.id, intent)
+            if output is not None:
+                if cache_key:
+                    await set_cached(cache_key, output, ex=CHAT_CACHE_TTL_SECONDS)
+                return output
+
+        output, tool_calls = await anyio.to_thread.run_sync(
+            _run_agent, user.id, user_message, history, limiter=_get_chat_limiter()
+        )
 
         # =================================================
-        # âœ… SAVE CACHE (chá»‰ khi safe)
+        # ✅ SAVE CACHE (chỉ khi safe)
         # =================================================
-        if is_cacheable_query(user_message):
-            try:
-                await set_cached(cache_key, output, ex=600)
-            except Exception:
-                pass
+        if cache_key and intent_matches_tool_calls(intent, tool_calls):
+            await set_cached(cache_key, output, ex=CHAT_CACHE_TTL_SECONDS)
 
         return output
 
@@ -227,9 +231,212 @@ async def process_chat_message(
 
         error_msg = str(e)
 
-        print(f"âŒ Chatbot Error: {error_msg}")
+        print(f"❌ Chatbot Error: {error_msg}")
 
         if "Name cannot be empty" in error_msg or "function_response" in error_msg:
-            return "âœ… Giao dá»‹ch Ä‘Ã£ Ä‘Æ°á»£c ghi nháº­n thÃ nh cÃ´ng! [REFRESH] (AI gáº·p chÃºt trá»¥c tráº·c khi hiá»ƒn thá»‹ pháº£n há»“i chi tiáº¿t, nhÆ°ng dá»¯ liá»‡u cá»§a báº¡n Ä‘Ã£ Ä‘Æ°á»£c lÆ°u an toÃ n)."
+            return "✅ Giao dịch đã được ghi nhận thành công! [REFRESH] (AI gặp chút trục trặc khi hiển thị phản hồi chi tiết, nhưng dữ liệu của bạn đã được lưu an toàn)."
+
+        return "Xin lỗi, hệ thống đang bận hoặc gặp lỗi kết nối AI. Bạn vui lòng thử lại sau giây lát nhé!"
+
+
+# =========================================================
+# ✅ FAST PATH: gọi thẳng tool + trả lời theo mẫu
+# =========================================================
+FAST_REPLIES = {
+    "vi": {
+        "get_balance": "💰 Số dư hiện tại của bạn: {balance} (Tổng thu {income} - Tổng chi {expense}).",
+        "get_statistics": "📊 Từ {start} đến {end}: thu {income}, chi {expense}, chênh lệch {net}.",
+        "analyze_spending": "📈 Cơ cấu chi tiêu từ {start} đến {end}:\n{chart}",
+        "analyze_spending_empty": "Không có dữ liệu chi tiêu từ {start} đến {end}.",
+        "get_history": "🧾 {limit} giao dịch gần nhất của bạn:\n{lines}",
+        "get_history_empty": "Bạn chưa có giao dịch nào.",
+        "set_budget": "[REFRESH] ✅ Đã cập nhật ngân sách tháng: {amount}.",
+        "set_budget_confirm": "Bạn muốn đặt ngân sách tháng này là {amount}? Trả lời \"có\" để xác nhận.",
+    },
+    "en": {
+        "get_balance": "💰 Your current balance: {balance} (Total income {income} - Total expense {expense}).",
+        "get_statistics": "📊 From {start} to {end}: income {income}, expense {expense}, net {net}.",
+        "analyze_spending": "📈 Spending breakdown from {start} to {end}:\n{chart}",
+        "analyze_spending_empty": "No spending data from {start} to {end}.",
+        "get_history": "🧾 Your {limit} most recent transactions:\n{lines}",
+        "get_history_empty": "You have no transactions yet.",
+        "set_budget": "[REFRESH] ✅ Monthly budget updated: {amount}.",
+        "set_budget_confirm": "Set this month's budget to {amount}? Reply \"yes\" to confirm.",
+    },
+}
+
+
+def _money(value) -> str:
+    return f"{float(value):,.0f}"
+
+
+def render_fast_reply(intent: Dict, result) -> Optional[str]:
+    """Định dạng kết quả tool thành câu trả lời; None nếu tool báo lỗi (-> để LLM xử lý)."""
+    if isinstance(result, str) and result.startswith(("Lỗi", "❌")):
+        return None
+
+    tool, args = intent["tool"], intent["args"]
+    templates = FAST_REPLIES[intent["lang"]]
+
+    if tool == "get_balance":
+        return templates[tool].format(
+            balance=_money(result["Dư"]), income=_money(result["Thu"]), expense=_money(result["Chi"])
+        )
+    if tool == "get_statistics":
+        stats = json.loads(result)
+        return templates[tool].format(
+            start=args["start_date"], end=args["end_date"], income=_money(stats["total_income"]),
+            expense=_money(stats["total_expense"]), net=_money(stats["net_balance"]),
+        )
+    if tool == "analyze_spending":
+        key = "analyze_spending_empty" if result == "NO_DATA" else tool
+        return templates[key].format(start=args["start_date"], end=args["end_date"], chart=result)
+    if tool == "get_history":
+        if result == "Không có giao dịch nào.":
+            return templates["get_history_empty"]
+        return templates[tool].format(limit=args["limit"], lines=result.rstrip())
+    if tool == "set_budget":
+        return templates[tool].format(amount=_money(args["amount"]))
+    return None
+
+
+def render_confirm_prompt(intent: Dict) -> str:
+    return FAST_REPLIES[intent["lang"]][f"{intent['tool']}_confirm"].format(amount=_money(intent["args"]["amount"]))
+
+
+def _run_fast_path(user_id: UUID, intent: Dict) -> Optional[str]:
+    """Chạy trong worker thread (DB session riêng), thường chỉ vài ms."""
+    db = SessionLocal()
+    try:
+        user = db.get(user_model.User, user_id)
+        tool = next(t for t in get_finbot_tools(db, user) if t.name == intent["tool"])
+        return render_fast_reply(intent, tool.invoke(intent["args"]))
+    finally:
+        db.close()
+
+
+def _run_agent(user_id: UUID, user_message: str, history: List[Dict]):
+    """
+    Chạy trong worker thread với DB session RIÊNG: session của request thuộc về event loop
+    và không được dùng chung giữa các thread.
+    """
+    db = SessionLocal()
+    try:
+        user = db.get(user_model.User, user_id)
+        return _invoke_agent(db, user, user_message, history)
+    finally:
+        db.close()
+
+
+# =========================================================
+# ✅ LLM + AGENT DÙNG CHUNG TRONG PROCESS
+# =========================================================
+_llm = None
+_role_agents = {}
+_agent_lock = threading.Lock()
+
+
+def _get_llm() -> ChatGoogleGenerativeAI:
+    """1 client Gemini cho cả process -> tái sử dụng connection thay vì bắt tay lại mỗi request."""
+    global _llm
+    with _agent_lock:
+        if _llm is None:
+            _llm = ChatGoogleGenerativeAI(
+                model="gemini-2.5-flash-lite", # ✅ Đã sửa: dùng model 1.5-flash chuẩn
+                temperature=0,
+                google_api_key=settings.google_genai_api_key
+            )
+        return _llm
+
+
+def _get_role_agent(is_admin: bool, tools):
+    """
+    Agent (prompt | llm.bind_tools | parser) dựng 1 lần cho mỗi vai trò user/admin.
+    Schema tools của cùng 1 vai trò luôn giống nhau nên chỉ bind lần đầu; hàm thực thi
+    (gắn với db/user của request) được truyền riêng cho AgentExecutor mỗi lần chạy.
+    """
+    role = "admin" if is_admin else "user"
+    agent = _role_agents.get(role)
+    if agent is not None:
+        return agent
+
+    llm = _get_llm()
+    with _agent_lock:
+        if role not in _role_agents:
+            system_prompt = SYSTEM_TEMPLATE.format(admin_instructions=ADMIN_INSTRUCTIONS if is_admin else "")
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", system_prompt),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("human", "{input}"),
+                ("placeholder", "{agent_scratchpad}"),
+            ])
+            _role_agents[role] = create_tool_calling_agent(llm, tools, prompt)
+        return _role_agents[role]
+
+
+# =========================================================
+# ✅ CACHE DANH MỤC CHO PROMPT (theo user + phiên bản dữ liệu)
+# =========================================================
+# Key gồm data_version của user và global: mọi thao tác ghi category (kể cả default category
+# của admin) đều bump phiên bản -> entry cũ không bao giờ được đọc lại, không cần xóa tay.
+_category_context_cache = TTLCache(
+    maxsize=settings.CHAT_CATEGORY_CACHE_SIZE,
+    ttl=settings.CHAT_CATEGORY_CACHE_TTL_SECONDS,
+)
+_category_context_lock = threading.Lock()
+
+
+def get_category_context(db: Session, user_id: UUID) -> str:
+    versions = get_data_versions_sync(user_id)
+    if versions is None:
+        return get_user_category_names_string(db, user_id)
+
+    key = (user_id, *versions)
+    with _category_context_lock:
+        context = _category_context_cache.get(key)
+    if context is None:
+        context = get_user_category_names_string(db, user_id)
+        with _category_context_lock:
+            _category_context_cache[key] = context
+    return context
+
+
+def _prepare_agent(db: Session, user: user_model.User):
+    """Phần chuẩn bị theo từng request: tools gắn db/user + AgentExecutor nhẹ + danh mục (đã cache)."""
+    tools = get_finbot_tools(db, user)
+    agent_executor = AgentExecutor(
+        agent=_get_role_agent(user.is_admin, tools), tools=tools, verbose=False, return_intermediate_steps=True
+    )
+    return agent_executor, get_category_context(db, user.id)
+
+
+def _invoke_agent(db: Session, user: user_model.User, user_message: str, history: List[Dict]):
+    """Trả về (câu trả lời, [(tên tool, tham số)] mà LLM đã gọi)."""
+    # --- 1. Agent dựng sẵn + Tools & Context của request ---
+    agent_executor, category_context = _prepare_agent(db, user)
+
+    # Chuẩn bị thời gian
+    today = date.today()
+    weekday_str = WEEKDAY_NAMES[today.weekday()]
+
+    # --- 2. Xử lý Lịch sử Chat ---
+    chat_history = []
+    recent_history = history[-6:]
+
+    for msg in recent_history:
+        if msg['role'] == 'user':
+            chat_history.append(HumanMessage(content=msg['content']))
+        elif msg['role'] == 'bot':
+            clean_content = msg['content'].split("[CHART_DATA_START]")[0]
+            chat_history.append(AIMessage(content=clean_content))
 
-        return "Xin lá»—i, há»‡ thá»‘ng Ä‘ang báº­n hoáº·c gáº·p lá»—i káº¿t ná»‘i AI. Báº¡n vui lÃ²ng thá»­ láº¡i sau giÃ¢y lÃ¡t nhÃ©!"
+    # --- 3. Thực thi ---
+    result = agent_executor.invoke({
+        "input": user_message,
+        "chat_history": chat_history,
+        "current_date": today.strftime("%Y-%m-%d"),
+        "weekday": weekday_str,
+        "categories": category_context
+    })
+    tool_calls = [(action.tool, action.tool_input) for action, _ in result["intermediate_steps"]]
+    return result["output"], tool_calls
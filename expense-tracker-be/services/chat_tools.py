@@ -1,11 +1,14 @@
 # services/chat_tools.py
+from fastapi import HTTPException
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from datetime import date
 from decimal import Decimal
 import json
-from cruds import crud_income, crud_expense, crud_summary, crud_transaction, crud_admin, crud_audit, crud_user
+from core.cache import bump_user_data_version, invalidate_auth_user_cache
+from cruds import crud_income, crud_expense, crud_summary, crud_transaction, crud_admin, crud_audit, crud_user, crud_system_counter
+from services import session_registry
 from models import user_model, category_model
 from sqlalchemy import func
 from typing import List
@@ -40,6 +43,12 @@ class SetBudgetInput(BaseModel):
 class AdminSearchInput(BaseModel):
     email: str = Field(description="Email user cần tìm")
 
+class SystemLogsInput(BaseModel):
+    limit: int = Field(default=5, description="Số lượng (tối đa 50)")
+    actor_email: str = Field(default="", description="Chỉ lấy log của email này")
+    action: str = Field(default="", description="VD: DELETE_USER, GRANT_ADMIN, EMERGENCY_RESET")
+    status: str = Field(default="", description="VD: SUCCESS, ERROR, PENDING")
+
 class BatchTransactionInput(BaseModel):
     transactions: List[CreateTransactionInput] = Field(description="Danh sách các giao dịch cần ghi")
 
@@ -86,6 +95,8 @@ def get_finbot_tools(db: Session, user: user_model.User):
             user.monthly_budget = Decimal(str(amount))
             db.commit();
             db.refresh(user)
+            invalidate_auth_user_cache(user.id)
+            bump_user_data_version(user.id)
             return f"[REFRESH] ✅ Đã cập nhật ngân sách: {amount:,.0f}."
         except Exception as e:
             return f"Lỗi: {str(e)}"
@@ -129,21 +140,28 @@ def get_finbot_tools(db: Session, user: user_model.User):
             return f"Lỗi: {str(e)}"
 
     def create_batch_transactions_func(transactions: List[CreateTransactionInput]):
-        results = []
         try:
-            for item in transactions:
-                # Gọi lại logic của hàm đơn lẻ để tái sử dụng code
-                res = create_transaction_func(
-                    type=item.type,
-                    amount=item.amount,
-                    category_name=item.category_name,
-                    note=item.note,
-                    date_str=item.date_str
-                )
-                results.append(res)
-
+            # Ghi tất cả trong 1 DB transaction (1 dòng lỗi -> không dòng nào được lưu)
+            items = [{
+                "type": item.type.lower().strip(),
+                "amount": item.amount,
+                "category_name": item.category_name,
+                "note": item.note,
+                "date": date.fromisoformat(item.date_str) if item.date_str else None,
+            } for item in transactions]
+            created = crud_transaction.create_transactions_bulk(
+                db, user.id, items, user.currency_code or "USD", fallback_emoji="🤖"
+            )
+
+            results = [
+                f"{'THU NHẬP' if row.type == 'income' else 'CHI TIÊU'}: {float(row.amount):,.0f} "
+                f"({row.category_name}). Ghi chú: {item['note']}"
+                for row, item in zip(created, items)
+            ]
             # Trả về 1 chuỗi kết quả duy nhất
             return f"[REFRESH] ✅ Đã ghi nhận {len(results)} giao dịch:\n- " + "\n- ".join(results)
+        except HTTPException as e:
+            return f"❌ Lỗi ghi hàng loạt: {e.detail}"
         except Exception as e:
             return f"❌ Lỗi ghi hàng loạt: {str(e)}"
 
@@ -168,9 +186,12 @@ def get_finbot_tools(db: Session, user: user_model.User):
         except Exception as e: return f"Lỗi: {e}"
 
     # 2. Xem Log hệ thống (Ai vừa làm gì?)
-    def get_admin_logs_func(limit: int = 5):
+    def get_admin_logs_func(limit: int = 5, actor_email: str = "", action: str = "", status: str = ""):
         try:
-            logs = crud_audit.get_audit_logs(db, limit=limit)
+            logs, _ = crud_audit.list_audit_logs(
+                db, limit=max(1, min(limit, 50)), actor_email=actor_email or None, action=action or None,
+                status=status or None,
+            )
             if not logs: return "Không có nhật ký nào."
 
             data = []
@@ -216,11 +237,14 @@ def get_finbot_tools(db: Session, user: user_model.User):
                 return f"❌ Không tìm thấy user: {email}"
 
             # CƯỠNG CHẾ RESET
+            crud_system_counter.track_2fa_change(db, target_user, False)
             target_user.is_2fa_enabled = False  # Tắt 2FA
             target_user.otp_secret = None  # Xóa mã bí mật
-            target_user.last_session_key = "RESET_BY_ADMIN"  # Đổi key -> Session cũ sẽ bị vô hiệu hóa ngay lập tức
+            target_user.last_session_key = session_registry.SESSION_RESET_MARKER  # Dự phòng khi Redis lỗi
 
             db.commit()
+            invalidate_auth_user_cache(target_user.id)
+            session_registry.revoke_user_sessions(target_user.id)  # Mọi phiên bị đá ngay trên mọi worker
 
             # Ghi log
             crud_audit.log_action(db, actor_email=user.email, action="EMERGENCY_RESET", target=email,
@@ -255,7 +279,8 @@ def get_finbot_tools(db: Session, user: user_model.User):
             StructuredTool.from_function(func=get_admin_kpi_func, name="get_system_stats",
                                          description="Admin: Xem tổng quan KPI hệ thống."),
             StructuredTool.from_function(func=get_admin_logs_func, name="get_system_logs",
-                                         description="Admin: Xem nhật ký hoạt động."),
+                                         description="Admin: Xem nhật ký hoạt động (lọc theo email, action, status).",
+                                         args_schema=SystemLogsInput),
             StructuredTool.from_function(func=admin_search_user_func, name="check_user_info",
                                          description="Admin: Tra cứu user theo email.", args_schema=AdminSearchInput),
             StructuredTool.from_function(func=admin_reset_security_func, name="admin_emergency_reset",
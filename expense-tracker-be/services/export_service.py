@@ -0,0 +1,133 @@
+# services/export_service.py
+"""
+Engine xuất file CSV/Excel dạng streaming.
+
+Dữ liệu được đọc bằng server-side cursor (yield_per) và ghi từng dòng ra file,
+nên bộ nhớ giữ phẳng kể cả với user có hàng trăm nghìn giao dịch:
+- CSV: gửi từng chunk cho client ngay khi được tạo.
+- Excel: openpyxl write-only ghi ra file tạm trên đĩa, sau đó stream file theo chunk
+  (định dạng xlsx là file zip, chỉ hoàn chỉnh khi đóng workbook).
+"""
+import csv
+import io
+import tempfile
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional
+from uuid import UUID
+
+from openpyxl import Workbook
+from sqlalchemy import func, select
+
+from cruds.crud_transaction import apply_transaction_filters
+from db.database import SessionLocal
+from models import category_model, transaction_model
+
+EXPORT_COLUMNS = ("Category", "Amount", "Date", "Note", "Emoji")
+EXPORT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_BATCH_SIZE = 1000  # Số dòng mỗi lần fetch từ server-side cursor
+CSV_CHUNK_ROWS = 500  # Số dòng CSV gom lại trước khi gửi 1 chunk
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def export_statement(
+    user_id: UUID,
+    type_filter: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[UUID] = None,
+):
+    """Chỉ SELECT đúng 5 cột cần xuất; emoji lấy qua JOIN thay vì lazy-load category từng dòng."""
+    txn = transaction_model.Transaction
+    category = category_model.Category
+    stmt = (
+        select(
+            txn.category_name,
+            txn.amount,
+            txn.date,
+            txn.note,
+            func.coalesce(func.nullif(category.icon, ""), txn.emoji, "").label("emoji"),
+        )
+        .outerjoin(category, category.id == txn.category_id)
+    )
+    stmt = apply_transaction_filters(stmt, user_id, start_date, end_date, category_id, type_filter)
+    return stmt.order_by(txn.date.desc(), txn.created_at.desc(), txn.id.desc())
+
+
+def iter_export_rows(stmt) -> Iterator[tuple]:
+    """
+    Duyệt kết quả bằng server-side cursor trên session riêng
+    (session của request có thể đã đóng trong lúc response còn đang stream).
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in result:
+            yield (
+                row.category_name or "",
+                float(row.amount or 0),
+                row.date.isoformat(),
+                row.note or "",
+                row.emoji or "",
+            )
+    finally:
+        db.close()
+
+
+def _with_total(rows: Iterable[tuple]) -> Iterator[tuple]:
+    """Cộng dồn khi ghi và thêm dòng TOTAL ở cuối (chỉ khi có dữ liệu), giống bản pandas cũ."""
+    total = Decimal("0")
+    has_rows = False
+    for row in rows:
+        has_rows = True
+        total += Decimal(str(row[1]))
+        yield row
+    if has_rows:
+        yield ("TOTAL", float(total), "", "", "")
+
+
+def stream_csv(rows: Iterable[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")  # BOM để Excel đọc đúng UTF-8 (emoji, tiếng Việt)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for i, row in enumerate(_with_total(rows), start=1):
+        writer.writerow(row)
+        if i % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(rows: Iterable[tuple]) -> Iterator[bytes]:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(EXPORT_COLUMNS)
+    for row in _with_total(rows):
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while chunk := tmp.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+STREAM_WRITERS = {
+    "csv": stream_csv,
+    "xlsx": stream_xlsx,
+}
+
+
+def stream_export(export_format: str, stmt) -> Iterator[bytes]:
+    return STREAM_WRITERS[export_format](iter_export_rows(stmt))
+
+
+def export_file_name(prefix: str, export_format: str) -> str:
+    return f"{prefix}_{date.today().isoformat()}.{export_format}"
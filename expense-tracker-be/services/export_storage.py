@@ -0,0 +1,56 @@
+# services/export_storage.py
+"""
+Nơi lưu file export đã tạo xong. Mặc định là ổ đĩa local (EXPORT_STORAGE_DIR);
+muốn dùng S3/GCS... chỉ cần viết class có cùng 3 method rồi đăng ký vào STORAGE_BACKENDS.
+Lưu ý: với backend local, API và worker Celery phải dùng chung thư mục (cùng máy hoặc volume chung).
+"""
+import os
+import shutil
+from typing import BinaryIO, Dict, Type
+
+from core.config import settings
+
+
+class LocalExportStorage:
+    def __init__(self, base_dir: str):
+        self.base_dir = os.path.abspath(base_dir)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.base_dir, key))
+        if not path.startswith(self.base_dir + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key: str, source: BinaryIO) -> int:
+        """Ghi file (ghi ra file tạm rồi rename -> không bao giờ đọc phải file dở dang). Trả về số byte."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".part"
+        with open(tmp_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+STORAGE_BACKENDS: Dict[str, Type] = {
+    "local": LocalExportStorage,
+}
+
+_storage = None
+
+
+def get_export_storage():
+    global _storage
+    if _storage is None:
+        backend = STORAGE_BACKENDS[settings.EXPORT_STORAGE_BACKEND]
+        _storage = backend(settings.EXPORT_STORAGE_DIR)
+    return _storage
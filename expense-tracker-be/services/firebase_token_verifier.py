@@ -0,0 +1,214 @@
+# services/firebase_token_verifier.py
+"""
+Xác minh Firebase ID token trong process, không phụ thuộc mạng trên đường nóng.
+
+fb_auth.verify_id_token tải chứng chỉ công khai của Google ở lần gọi đầu (và mỗi khi hết hạn cache HTTP)
+ngay trong request, rồi xác minh lại chữ ký cho mọi lần gọi dù cùng 1 token. Ở đây:
+- Payload đã xác minh được cache theo sha256(token) tới đúng `exp` của token (TLRUCache):
+  login dồn dập / /auth/sync lặp lại với cùng token không tốn thêm lần kiểm chữ ký RSA nào.
+- Chứng chỉ được giữ trong bộ nhớ và 1 thread nền tải lại TRƯỚC khi hết hạn (theo Cache-Control max-age);
+  main.lifespan gọi start() để tải sẵn lúc khởi động -> request đầu tiên không phải chờ tải chứng chỉ.
+- Token có `kid` lạ (Google vừa xoay khóa) -> tải lại chứng chỉ ngay 1 lần rồi xác minh.
+- Các bước kiểm tra claim giống firebase_admin (aud, iss, sub, alg, kid) và ném đúng các lỗi của fb_auth
+  (ExpiredIdTokenError / InvalidIdTokenError) nên verify_token_and_get_payload giữ nguyên cách map lỗi.
+- fetch_certs / project_id truyền vào được -> thử offline bằng cặp khóa tự sinh
+  (xem tests/test_firebase_tokens.py).
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from cachetools import TLRUCache
+from firebase_admin import auth as fb_auth
+from google.auth import jwt as google_jwt
+from jose import JWTError
+from jose import jwt as jose_jwt
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ID_TOKEN_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ID_TOKEN_ISSUER_PREFIX = "https://securetoken.google.com/"
+DEFAULT_CERT_MAX_AGE_SECONDS = 3600  # Google thường trả max-age ~ vài giờ; thiếu header thì dùng mức này
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+CertFetcher = Callable[[], Tuple[Dict[str, str], int]]
+
+
+def fetch_google_certs(url: str = ID_TOKEN_CERT_URL, timeout: float = 10) -> Tuple[Dict[str, str], int]:
+    """Tải chứng chỉ x509 (kid -> PEM) của Google -> (certs, max-age giây)."""
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+    return response.json(), int(match.group(1)) if match else DEFAULT_CERT_MAX_AGE_SECONDS
+
+
+def _default_app():
+    import firebase_admin
+
+    try:
+        return firebase_admin.get_app()
+    except ValueError:  # Firebase chưa initialize_app (thiếu FIREBASE_SERVICE_ACCOUNT)
+        return None
+
+
+def firebase_app_initialized() -> bool:
+    return _default_app() is not None
+
+
+def _default_project_id() -> Optional[str]:
+    app = _default_app()
+    return app.project_id if app is not None else None
+
+
+class FirebaseTokenVerifier:
+    def __init__(
+            self,
+            cache_size: int,
+            refresh_margin: float,
+            retry_interval: float,
+            fetch_certs: CertFetcher = fetch_google_certs,
+            project_id: Optional[str] = None,
+            timer: Callable[[], float] = time.time,
+    ):
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._fetch_certs = fetch_certs
+        self._project_id = project_id
+        self._timer = timer
+        self._payloads = TLRUCache(maxsize=cache_size, ttu=lambda _key, payload, _now: payload["exp"], timer=timer)
+        self._payload_lock = threading.Lock()
+        self._certs: Dict[str, str] = {}
+        self._certs_expire_at = 0.0
+        self._certs_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"cache_hits": 0, "verified": 0, "cert_fetches": 0}
+        self._stats_lock = threading.Lock()  # verify() chạy song song trên threadpool: += không nguyên tử
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @property
+    def project_id(self) -> Optional[str]:
+        return self._project_id or _default_project_id()
+
+    # --- Chứng chỉ ---
+    def refresh_certs(self) -> None:
+        """Tải lại chứng chỉ (single-flight: các thread khác chờ rồi dùng luôn kết quả)."""
+        with self._certs_lock:
+            self._refresh_certs_locked()
+
+    def _refresh_certs_locked(self) -> None:
+        certs, max_age = self._fetch_certs()
+        self._certs = certs
+        self._certs_expire_at = self._timer() + max_age
+        self._count("cert_fetches")
+
+    def _get_certs(self, kid: Optional[str]) -> Dict[str, str]:
+        certs = self._certs
+        if self._timer() < self._certs_expire_at and (kid is None or kid in certs):
+            return certs
+        with self._certs_lock:
+            # Thread khác có thể vừa tải xong trong lúc chờ khóa.
+            if not (self._timer() < self._certs_expire_at and (kid is None or kid in self._certs)):
+                try:
+                    self._refresh_certs_locked()
+                except Exception as e:
+                    if not self._certs:
+                        raise fb_auth.CertificateFetchError(f"Failed to fetch public key certificates: {e}", e)
+                    logger.warning(f"Firebase cert refresh failed, using cached certificates: {e}")
+            return self._certs
+
+    # --- Thread làm mới chứng chỉ ---
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="firebase-certs", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh_certs()
+                wait = max(self._certs_expire_at - self._timer() - self.refresh_margin, self.retry_interval)
+            except Exception as e:
+                logger.warning(f"Firebase cert refresh failed, retrying in {self.retry_interval}s: {e}")
+                wait = self.retry_interval
+            self._stop.wait(wait)
+
+    # --- Xác minh token ---
+    def verify(self, id_token: str) -> dict:
+        """Trả payload đã xác minh của Firebase ID token (cache tới exp)."""
+        if not isinstance(id_token, str) or not id_token:
+            raise fb_auth.InvalidIdTokenError("ID token must be a non-empty string.")
+        project_id = self.project_id
+        if not project_id or os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+            # Chưa cấu hình Firebase / chạy emulator: để firebase_admin tự xử lý (và tự báo lỗi).
+            return fb_auth.verify_id_token(id_token)
+
+        key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+        with self._payload_lock:
+            cached = self._payloads.get(key)
+        if cached is not None:
+            self._count("cache_hits")
+            return dict(cached)
+
+        payload = self._verify_signed(id_token, project_id)
+        with self._payload_lock:
+            self._payloads[key] = payload
+        self._count("verified")
+        return dict(payload)
+
+    def _verify_signed(self, id_token: str, project_id: str) -> dict:
+        try:
+            header = jose_jwt.get_unverified_header(id_token)
+        except JWTError as e:
+            raise fb_auth.InvalidIdTokenError(f"Malformed Firebase ID token: {e}", e)
+        kid = header.get("kid")
+        if not kid:
+            raise fb_auth.InvalidIdTokenError('Firebase ID token has no "kid" claim.')
+        if header.get("alg") != "RS256":
+            raise fb_auth.InvalidIdTokenError(
+                f'Firebase ID token has incorrect algorithm. Expected "RS256" but got "{header.get("alg")}".'
+            )
+
+        certs = self._get_certs(kid)
+        if kid not in certs:
+            raise fb_auth.InvalidIdTokenError("Firebase ID token was signed with an unknown key.")
+        try:
+            payload = google_jwt.decode(id_token, certs={kid: certs[kid]}, audience=project_id)
+        except (ValueError, json.JSONDecodeError) as e:
+            if "Token expired" in str(e):
+                raise fb_auth.ExpiredIdTokenError("The Firebase ID token is expired.", e)
+            raise fb_auth.InvalidIdTokenError(f"Firebase ID token could not be verified: {e}", e)
+
+        if payload.get("iss") != ID_TOKEN_ISSUER_PREFIX + project_id:
+            raise fb_auth.InvalidIdTokenError('Firebase ID token has incorrect "iss" (issuer) claim.')
+        subject = payload.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise fb_auth.InvalidIdTokenError('Firebase ID token has an invalid "sub" (subject) claim.')
+        payload["uid"] = subject  # Giống fb_auth.verify_id_token
+        return payload
+
+
+firebase_token_verifier = FirebaseTokenVerifier(
+    cache_size=settings.FIREBASE_TOKEN_CACHE_SIZE,
+    refresh_margin=settings.FIREBASE_CERT_REFRESH_MARGIN_SECONDS,
+    retry_interval=settings.FIREBASE_CERT_RETRY_SECONDS,
+)
@@ -0,0 +1,387 @@
+# services/import_service.py
+"""
+Import sao kê ngân hàng (CSV/OFX) dạng streaming.
+
+File upload được đọc tuần tự theo dòng/chunk, mỗi IMPORT_BATCH_SIZE giao dịch được ghi bằng
+create_transactions_bulk (1 commit / batch), nên bộ nhớ giữ phẳng kể cả với file hàng trăm nghìn dòng:
+- Danh mục: đoán từ nội dung giao dịch (merchant) dựa trên category sẵn có của user.
+- Trùng lặp: dòng trùng (date, amount, note) với giao dịch đã có bị bỏ qua -> import lại cùng 1 file an toàn.
+  So theo số lần xuất hiện, nên các dòng giống hệt nhau trong cùng 1 file vẫn được tạo đủ (bộ đếm khóa md5
+  giữ trong bộ nhớ suốt lần import, vài chục byte / dòng khác nhau).
+- Tiến độ: mỗi batch trả về 1 dòng JSON (NDJSON) cho client.
+"""
+import csv
+import html
+import io
+import json
+import logging
+import re
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from core.config import settings
+from core.text import normalize_text
+from cruds.crud_category import list_all_categories_for_user
+from cruds.crud_transaction import create_transactions_bulk
+from db.database import SessionLocal
+from models import transaction_model
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ofx")
+FALLBACK_CATEGORY = "Other"
+MAX_REPORTED_ERRORS = 20
+HISTORY_MERCHANTS_LIMIT = 5000  # Số merchant gần nhất dùng để học danh mục từ lịch sử
+READ_CHUNK_SIZE = 64 * 1024
+
+# Tên cột hay gặp trong file xuất của ngân hàng / app khác (đã bỏ dấu, chữ thường).
+CSV_COLUMNS = {
+    "date": ("date", "ngay", "ngay giao dich", "transaction date", "posted date", "booking date", "value date"),
+    "amount": ("amount", "so tien", "value", "gia tri"),
+    "debit": ("debit", "withdrawal", "withdrawals", "ghi no", "tien ra", "chi"),
+    "credit": ("credit", "deposit", "deposits", "ghi co", "tien vao", "thu"),
+    "type": ("type", "loai", "transaction type"),
+    "category": ("category", "danh muc"),
+    "note": ("description", "note", "memo", "payee", "merchant", "details", "narrative",
+             "noi dung", "dien giai", "mo ta", "ghi chu"),
+}
+_TYPE_VALUES = {
+    "income": "income", "thu": "income", "thu nhap": "income", "credit": "income", "cr": "income",
+    "expense": "expense", "chi": "expense", "chi tieu": "expense", "debit": "expense", "dr": "expense",
+}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%Y%m%d", "%m/%d/%Y")
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_MERCHANT_NOISE = re.compile(r"\b\d+\b")  # Mã tham chiếu, số thẻ... đổi theo từng giao dịch
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+# =========================================================
+# 🔢 PARSE GIÁ TRỊ
+# =========================================================
+
+def parse_amount(text: str) -> Decimal:
+    """"1,234.56", "1.234,56", "-50000", "(12.50)", "50 000 ₫" -> Decimal (có dấu)."""
+    raw = (text or "").strip()
+    negative = raw.startswith("(") and raw.endswith(")") or "-" in raw
+    digits = re.sub(r"[^\d.,]", "", raw)
+    if not digits:
+        raise ImportRowError(f"invalid amount {text!r}")
+
+    if "." in digits and "," in digits:
+        # Dấu xuất hiện sau cùng là dấu thập phân.
+        decimal_sep = "." if digits.rfind(".") > digits.rfind(",") else ","
+        digits = digits.replace("," if decimal_sep == "." else ".", "").replace(decimal_sep, ".")
+    elif "." in digits or "," in digits:
+        sep = "." if "." in digits else ","
+        parts = digits.split(sep)
+        if len(parts) > 2 or len(parts[-1]) == 3:  # "200.000", "1,234,567" -> phân cách hàng nghìn
+            digits = "".join(parts)
+        else:
+            digits = ".".join(parts)
+
+    try:
+        value = Decimal(digits)
+    except InvalidOperation:
+        raise ImportRowError(f"invalid amount {text!r}")
+    return -value if negative else value
+
+
+def parse_date(text: str) -> date:
+    raw = (text or "").strip()
+    # Bỏ phần giờ: "2024-01-31 10:00:00", "2024-01-31T10:00", OFX "20240131120000[-5:EST]"
+    candidates = [raw, raw.split(" ")[0], raw.split("T")[0], raw[:8]]
+    for value in candidates:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+    raise ImportRowError(f"invalid date {text!r}")
+
+
+def _parse_type(text: str) -> Optional[str]:
+    return _TYPE_VALUES.get(normalize_text(text or ""))
+
+
+# =========================================================
+# 📄 ĐỌC FILE THEO DÒNG / CHUNK
+# =========================================================
+
+def _text_stream(source: BinaryIO) -> io.TextIOWrapper:
+    # utf-8-sig: bỏ BOM của file Excel xuất ra; byte lỗi thay bằng � thay vì dừng cả file.
+    return io.TextIOWrapper(source, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _match_columns(header: List[str]) -> Dict[str, int]:
+    columns = {}
+    normalized = [normalize_text(name) for name in header]
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    return columns
+
+
+def iter_csv_rows(source: BinaryIO) -> Iterator[Tuple[int, Dict]]:
+    """
+    (số dòng, {date, amount, type?, category?, note?}) cho từng dòng dữ liệu.
+    Dấu phân cách (, ; tab |) đoán từ vài KB đầu; header phải có cột ngày và số tiền (hoặc ghi nợ/ghi có).
+    Header được kiểm tra ngay khi gọi hàm (trước khi response bắt đầu stream) -> lỗi trả về 400.
+    """
+    stream = _text_stream(source)
+    sample = stream.read(8192)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(stream, dialect)
+    header = next(reader, None)
+    columns = _match_columns(header or [])
+    if "date" not in columns or not ("amount" in columns or "debit" in columns or "credit" in columns):
+        raise HTTPException(
+            status_code=400,
+            detail="CSV header must contain a date column and an amount (or debit/credit) column.",
+        )
+
+    def cell(row, field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    def rows():
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            amount = cell(row, "amount")
+            if not amount:  # Sao kê tách 2 cột ghi nợ / ghi có
+                debit, credit = cell(row, "debit"), cell(row, "credit")
+                amount = f"-{debit}" if debit and not credit else credit
+            yield reader.line_num, {
+                "date": cell(row, "date"),
+                "amount": amount,
+                "type": cell(row, "type"),
+                "category": cell(row, "category"),
+                "note": cell(row, "note"),
+            }
+
+    return rows()
+
+
+def _iter_ofx_tags(stream: io.TextIOWrapper) -> Iterator[Tuple[bool, str, str]]:
+    """(is_closing, TAG, value) đọc theo chunk: OFX 1.x (SGML) có thể không xuống dòng lần nào."""
+    buffer = ""
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        buffer += chunk
+        # Giữ lại phần sau dấu '<' cuối cùng (tag có thể bị cắt giữa 2 chunk).
+        cut = len(buffer) if not chunk else buffer.rfind("<")
+        for match in _OFX_TAG.finditer(buffer, 0, max(cut, 0)):
+            yield match.group(1) == "/", match.group(2).upper(), html.unescape(match.group(3).strip())
+        if not chunk:
+            return
+        buffer = buffer[cut:] if cut > 0 else buffer
+
+
+def iter_ofx_rows(source: BinaryIO) -> Iterator[Tuple[int, Dict]]:
+    """(thứ tự giao dịch, {...}) cho từng <STMTTRN> (OFX 1.x SGML và 2.x XML)."""
+    stream = _text_stream(source)
+    index = 0
+    current = None
+    for is_closing, tag, value in _iter_ofx_tags(stream):
+        if tag == "STMTTRN":
+            if current is not None:  # SGML: </STMTTRN> là tùy chọn
+                index += 1
+                yield index, _ofx_row(current)
+            current = None if is_closing else {}
+        elif current is None:
+            continue
+        elif not is_closing:
+            current[tag] = value
+        elif tag == "BANKTRANLIST":  # SGML: giao dịch cuối không có </STMTTRN>
+            index += 1
+            yield index, _ofx_row(current)
+            current = None
+    if current is not None:
+        index += 1
+        yield index, _ofx_row(current)
+
+
+def _ofx_row(fields: Dict) -> Dict:
+    name, memo = fields.get("NAME") or fields.get("PAYEE", ""), fields.get("MEMO", "")
+    note = name if not memo or memo == name else (f"{name} - {memo}" if name else memo)
+    return {
+        "date": fields.get("DTPOSTED", ""),
+        "amount": fields.get("TRNAMT", ""),
+        "type": "",
+        "category": "",
+        "note": note,
+    }
+
+
+# =========================================================
+# 🏷️ ĐOÁN DANH MỤC
+# =========================================================
+
+def merchant_key(note: str) -> str:
+    """"GRAB*FOOD 123456 HCM" và "Grab food 987654 hcm" cùng 1 merchant."""
+    return " ".join(_MERCHANT_NOISE.sub(" ", normalize_text(note or "")).split())
+
+
+class CategoryMapper:
+    """
+    Đoán category cho mỗi dòng, chỉ dùng category sẵn có của user (+ mặc định), theo thứ tự:
+    1. Cột "category" trong file khớp tên category.
+    2. Merchant đã từng được user xếp vào category nào (học từ lịch sử giao dịch).
+    3. Từ khóa trong tên category xuất hiện trong nội dung ("GRAB FOOD" -> "Food & Drink").
+    4. "Other" của đúng loại.
+    """
+
+    def __init__(self, db, user_id: UUID):
+        categories = list_all_categories_for_user(db, user_id)
+        self.by_name: Dict[Tuple[str, str], UUID] = {}
+        self.type_by_name: Dict[str, set] = {}
+        self.keywords: Dict[str, List[Tuple[re.Pattern, int, UUID]]] = {"income": [], "expense": []}
+        # Category của user đứng trước category mặc định (user_id DESC) -> giữ cái gặp đầu tiên.
+        for category in categories:
+            name = normalize_text(category.name)
+            self.by_name.setdefault((name, category.type), category.id)
+            self.type_by_name.setdefault(name, set()).add(category.type)
+            for word in name.split():
+                if len(word) >= 4 and word != normalize_text(FALLBACK_CATEGORY):
+                    self.keywords[category.type].append((re.compile(rf"\b{word}\b"), len(word), category.id))
+
+        self.history: Dict[Tuple[str, str], UUID] = {}
+        txn = transaction_model.Transaction
+        recent = (
+            select(txn.note, txn.type, txn.category_id, func.count().label("uses"))
+            .where(txn.user_id == user_id, txn.note.isnot(None), txn.note != "")
+            .group_by(txn.note, txn.type, txn.category_id)
+            .order_by(func.max(txn.date).desc())
+            .limit(HISTORY_MERCHANTS_LIMIT)
+        )
+        for note, txn_type, category_id, uses in sorted(db.execute(recent).all(), key=lambda r: r.uses):
+            self.history[(merchant_key(note), txn_type)] = category_id  # Dùng nhiều nhất ghi đè sau cùng
+
+    def infer_type(self, category: str) -> Optional[str]:
+        types = self.type_by_name.get(normalize_text(category or ""), set())
+        return next(iter(types)) if len(types) == 1 else None
+
+    def resolve(self, txn_type: str, note: str, category: str) -> Dict:
+        """{category_id} nếu đoán được, ngược lại {category_name} (tạo mới nếu cột category có tên lạ)."""
+        if category:
+            category_id = self.by_name.get((normalize_text(category), txn_type))
+            return {"category_id": category_id} if category_id else {"category_name": category[:255]}
+
+        key = merchant_key(note)
+        if key:
+            category_id = self.history.get((key, txn_type))
+            if category_id:
+                return {"category_id": category_id}
+
+            best = max(
+                ((length, category_id) for pattern, length, category_id in self.keywords[txn_type]
+                 if pattern.search(key)),
+                default=None,
+                key=lambda match: match[0],
+            )
+            if best:
+                return {"category_id": best[1]}
+
+        category_id = self.by_name.get((normalize_text(FALLBACK_CATEGORY), txn_type))
+        return {"category_id": category_id} if category_id else {"category_name": FALLBACK_CATEGORY}
+
+
+# =========================================================
+# 🚚 PIPELINE
+# =========================================================
+
+def _to_item(raw: Dict, mapper: CategoryMapper) -> Dict:
+    txn_date = parse_date(raw["date"])
+    amount = parse_amount(raw["amount"])
+    if amount == 0:
+        raise ImportRowError("amount is 0")
+
+    # Loại: cột type > dấu số tiền (âm = chi) > loại của category trong file > thu.
+    txn_type = _parse_type(raw["type"])
+    if txn_type is None:
+        txn_type = "expense" if amount < 0 else (mapper.infer_type(raw["category"]) or "income")
+
+    note = raw["note"] or None
+    item = {"type": txn_type, "amount": abs(amount), "date": txn_date, "note": note}
+    item.update(mapper.resolve(txn_type, note, raw["category"]))
+    return item
+
+
+def _event(name: str, stats: Dict, **extra) -> bytes:
+    return (json.dumps({"event": name, **stats, **extra}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def open_statement(source: BinaryIO, import_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Bộ đọc dòng theo định dạng file (csv/ofx)."""
+    if import_format == "csv":
+        return iter_csv_rows(source)
+    return iter_ofx_rows(source)
+
+
+def import_statement(
+        user_id: UUID,
+        rows: Iterator[Tuple[int, Dict]],
+        currency_code: str = "USD",
+        batch_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Dòng của open_statement -> batch -> create_transactions_bulk(skip_duplicates=True), yield 1 dòng NDJSON mỗi batch.
+    Chạy trên session riêng (response đang stream khi session của request đã đóng).
+    Các batch đã commit được giữ lại nếu giữa chừng lỗi; import lại file sẽ bỏ qua các dòng đã có.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    stats = {"processed": 0, "inserted": 0, "duplicates": 0, "skipped": 0}
+    errors = []
+
+    db = SessionLocal()
+    try:
+        mapper = CategoryMapper(db, user_id)
+        batch: List[Dict] = []
+        seen_keys = Counter()  # Khóa trùng đã gặp ở các batch trước (dòng trùng có thể nằm ở 2 batch khác nhau)
+
+        def flush():
+            created = create_transactions_bulk(
+                db, user_id, batch, currency_code=currency_code, skip_duplicates=True, seen_keys=seen_keys
+            )
+            stats["inserted"] += len(created)
+            stats["duplicates"] += len(batch) - len(created)
+            batch.clear()
+
+        for line, raw in rows:
+            stats["processed"] += 1
+            try:
+                batch.append(_to_item(raw, mapper))
+            except ImportRowError as e:
+                stats["skipped"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "error": str(e)})
+            if len(batch) >= batch_size:
+                flush()
+                yield _event("progress", stats)
+        if batch:
+            flush()
+        yield _event("completed", stats, errors=errors)
+    except HTTPException as e:
+        yield _event("failed", stats, error=e.detail, errors=errors)
+    except Exception:
+        logger.exception("Statement import failed for user %s", user_id)
+        yield _event("failed", stats, error="Import failed, rows before this point were saved.", errors=errors)
+    finally:
+        db.close()
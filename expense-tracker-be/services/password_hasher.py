@@ -0,0 +1,103 @@
+# services/password_hasher.py
+"""
+Băm / kiểm tra mật khẩu (bcrypt) trên 1 pool thread riêng có giới hạn.
+
+bcrypt tốn ~0.25s CPU mỗi lần (cost 12) và nhả GIL khi chạy, nên:
+- Tối đa PASSWORD_HASH_WORKERS phép bcrypt chạy cùng lúc trên mỗi worker API: 1 đợt login dồn dập
+  không chiếm hết CPU của các request khác.
+- Tối đa PASSWORD_HASH_MAX_QUEUE yêu cầu được xếp hàng chờ; quá mức đó trả 429 + Retry-After ngay
+  thay vì để request treo tới timeout.
+- Route sync dùng verify()/hash() (thread của Starlette chờ kết quả), code async dùng averify()/ahash().
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from core.config import settings
+from core.security import get_password_hash, password_needs_rehash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_queue: int, rounds: int, retry_after: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers + max_queue  # Đang chạy + đang chờ
+        self.rounds = rounds
+        self.retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"completed": 0, "rejected": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """Đưa 1 phép bcrypt vào pool; hàng đợi đầy -> 429."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many login attempts are being processed. Please retry shortly.",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.stats["completed"] += 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # --- Sync (route def / crud) ---
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(verify_password, password, hashed_password).result()
+
+    def hash(self, password: str) -> str:
+        return self._submit(get_password_hash, password, self.rounds).result()
+
+    # --- Async (route async def) ---
+    async def averify(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(verify_password, password, hashed_password))
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, password, self.rounds))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return password_needs_rehash(hashed_password, self.rounds)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    rounds=settings.BCRYPT_ROUNDS,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
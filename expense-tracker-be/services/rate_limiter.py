@@ -0,0 +1,256 @@
+# services/rate_limiter.py
+"""
+Rate limit theo token bucket cho các endpoint đắt (LLM, dựng file export, bcrypt, analytics).
+
+- Mỗi policy là 1 bucket `burst` token, nạp lại `per_minute` token/phút, riêng cho từng user
+  (claim `id` của access token) hoặc từng IP. Hết token -> 429 + Retry-After (giây tới khi có lại 1 token).
+- Bucket nằm trên Redis (HASH rate:{policy}:{user|ip}), đọc-nạp-trừ trong 1 Lua script nên
+  nguyên tử giữa mọi worker API; key tự hết hạn khi bucket đã nạp đầy.
+- Redis chưa init / lỗi -> bucket trong process (TTLCache); giới hạn khi đó tính riêng từng worker
+  và bỏ qua Redis RATE_LIMIT_REDIS_RETRY_SECONDS giây để request không phải chờ timeout liên tục.
+- Thời điểm nạp token lấy từ `TIME` của Redis (1 đồng hồ chung): worker lệch giờ không nạp nhầm bucket.
+- Bucket theo IP dùng IP client thật: chỉ đọc X-Forwarded-For khi kết nối đến từ proxy trong
+  RATE_LIMIT_TRUSTED_PROXIES (client tự đặt header này được nên không tin nếu gọi thẳng vào API).
+- RateLimitMiddleware là ASGI middleware thuần: không bọc body -> không ảnh hưởng StreamingResponse của export.
+"""
+import ipaddress
+import json
+import logging
+import math
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+
+from core import cache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = bucket; ARGV = burst, token/giây, cost -> {allowed, tokens còn lại, retry_after}
+# now lấy từ TIME của Redis (Redis >= 5 replicate theo effect nên gọi TIME trước khi ghi vẫn hợp lệ).
+# Số thực trả về dạng chuỗi vì Redis cắt số Lua thành integer.
+TOKEN_BUCKET_LUA = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+  tokens = burst
+  ts = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RateLimitPolicy:
+    def __init__(self, name: str, per_minute: int, burst: int, routes: Iterable[Tuple[str, str]], per_ip: bool = False):
+        self.name = name
+        self.burst = burst
+        self.rate = per_minute / 60  # token/giây
+        self.routes = {(method.upper(), path) for method, path in routes}  # (method, path) hoặc (method, "prefix*")
+        self.per_ip = per_ip
+
+    def matches(self, method: str, path: str) -> bool:
+        for route_method, route_path in self.routes:
+            if route_method != method:
+                continue
+            if route_path.endswith("*") and path.startswith(route_path[:-1]):
+                return True
+            if path == route_path:
+                return True
+        return False
+
+
+def default_policies() -> list:
+    return [
+        RateLimitPolicy("chat", settings.RATE_LIMIT_CHAT_PER_MINUTE, settings.RATE_LIMIT_CHAT_BURST,
+                        [("POST", "/chat/send")]),
+        RateLimitPolicy("export", settings.RATE_LIMIT_EXPORT_PER_MINUTE, settings.RATE_LIMIT_EXPORT_BURST,
+                        [("GET", "/export/transactions"), ("GET", "/export/income"), ("GET", "/export/expense"),
+                         ("POST", "/export/jobs")]),  # Không tính GET /export/jobs/{id}: FE poll trạng thái
+        RateLimitPolicy("login", settings.RATE_LIMIT_LOGIN_PER_MINUTE, settings.RATE_LIMIT_LOGIN_BURST,
+                        [("POST", "/auth/login_sync")], per_ip=True),
+        RateLimitPolicy("analytics", settings.RATE_LIMIT_ANALYTICS_PER_MINUTE, settings.RATE_LIMIT_ANALYTICS_BURST,
+                        [("GET", "/analytics/summary")]),
+    ]
+
+
+class RateLimiter:
+    def __init__(self, policies: list, redis_retry_seconds: float, local_size: int = 10000,
+                 timer: Callable[[], float] = time.time):
+        self.policies = policies
+        self.redis_retry_seconds = redis_retry_seconds
+        self._timer = timer
+        self._script = None
+        self._script_client = None
+        self._redis_down_until = 0.0
+        self._local = TTLCache(maxsize=local_size, ttl=max((p.burst / p.rate for p in policies), default=60) + 1,
+                               timer=timer)
+        self._local_lock = threading.Lock()
+        self.stats = {"allowed": 0, "limited": 0, "local": 0}
+
+    def match(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        for policy in self.policies:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    async def hit(self, policy: RateLimitPolicy, identity: str, cost: int = 1) -> Tuple[bool, float, float]:
+        """Lấy `cost` token của bucket (policy, identity) -> (được phép, token còn lại, retry_after giây)."""
+        key = f"rate:{policy.name}:{identity}"
+        now = self._timer()
+        result = await self._hit_redis(policy, key, now, cost)
+        if result is None:
+            self.stats["local"] += 1
+            result = self._hit_local(policy, key, now, cost)
+        self.stats["allowed" if result[0] else "limited"] += 1
+        return result
+
+    async def _hit_redis(self, policy, key, now, cost) -> Optional[Tuple[bool, float, float]]:
+        client = cache.redis_client
+        if not client or now < self._redis_down_until:
+            return None
+        if self._script_client is not client:
+            # register_script: EVALSHA, tự nạp lại script khi Redis trả NOSCRIPT (restart / failover)
+            self._script = client.register_script(TOKEN_BUCKET_LUA)
+            self._script_client = client
+        try:
+            allowed, tokens, retry_after = await self._script(keys=[key], args=[policy.burst, policy.rate, cost])
+        except RedisError as e:
+            self._redis_down_until = now + self.redis_retry_seconds
+            logger.warning(f"⚠️ Redis rate limit error, using in-process buckets for {self.redis_retry_seconds}s: {e}")
+            return None
+        return bool(int(allowed)), float(tokens), float(retry_after)
+
+    def _hit_local(self, policy, key, now, cost) -> Tuple[bool, float, float]:
+        with self._local_lock:
+            tokens, ts = self._local.get(key, (policy.burst, now))
+            tokens = min(policy.burst, tokens + max(0.0, now - ts) * policy.rate)
+            if tokens >= cost:
+                self._local[key] = (tokens - cost, now)
+                return True, tokens - cost, 0.0
+            self._local[key] = (tokens, now)
+            return False, tokens, (cost - tokens) / policy.rate
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def parse_trusted_proxies(raw: str) -> list:
+    """"10.0.0.0/8, 127.0.0.1" -> danh sách ip_network; mục sai định dạng bị bỏ qua (kèm cảnh báo)."""
+    networks = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring invalid RATE_LIMIT_TRUSTED_PROXIES entry: {item}")
+    return networks
+
+
+def _is_trusted(ip: str, trusted_proxies) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+
+def client_ip(scope, trusted_proxies=()) -> str:
+    """
+    IP client thật: đi ngược từ peer TCP qua X-Forwarded-For, bỏ qua các hop là proxy tin cậy;
+    hop đầu tiên không tin cậy là client. Peer không phải proxy tin cậy -> không đọc header.
+    """
+    client = scope.get("client")
+    if not client:
+        return "unknown"
+    hops = [client[0]]
+    if trusted_proxies and _is_trusted(client[0], trusted_proxies):
+        forwarded = [value.decode("latin-1") for key, value in scope.get("headers", []) if key == b"x-forwarded-for"]
+        hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()] + hops
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    return hops[0]  # Mọi hop đều là proxy tin cậy (VD health check nội bộ)
+
+
+def request_identity(scope, per_ip: bool, trusted_proxies=()) -> str:
+    """user:{id} nếu access token hợp lệ (kiểm chữ ký: không ai tự đổi id để lấy bucket mới), ngược lại ip:{ip}."""
+    if not per_ip:
+        authorization = _header(scope, b"authorization")
+        if authorization and authorization.startswith("Bearer "):
+            try:
+                payload = jwt.decode(authorization.split(" ", 1)[1], settings.SECRET_KEY,
+                                     algorithms=[settings.ALGORITHM])
+                if payload.get("id"):
+                    return f"user:{payload['id']}"
+            except JWTError:
+                pass
+    return f"ip:{client_ip(scope, trusted_proxies)}"
+
+
+class RateLimitMiddleware:
+    """Đăng ký TRƯỚC CORSMiddleware để phản hồi 429 vẫn có header CORS (trình duyệt đọc được Retry-After)."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None, enabled: bool = True,
+                 trusted_proxies: Optional[str] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+        self.enabled = enabled
+        self.trusted_proxies = parse_trusted_proxies(
+            settings.RATE_LIMIT_TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        policy = self.limiter.match(scope["method"], scope["path"])
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        allowed, _tokens, retry_after = await self.limiter.hit(policy, request_identity(scope, policy.per_ip, self.trusted_proxies))
+        if allowed:
+            return await self.app(scope, receive, send)
+
+        retry_after = max(1, math.ceil(retry_after))
+        body = json.dumps({"detail": f"Too many requests. Please retry in {retry_after}s."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+                (b"x-ratelimit-limit", str(policy.burst).encode()),
+                (b"x-ratelimit-remaining", b"0"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+rate_limiter = RateLimiter(default_policies(), redis_retry_seconds=settings.RATE_LIMIT_REDIS_RETRY_SECONDS)
@@ -0,0 +1,134 @@
+# services/session_registry.py
+"""
+Sổ đăng ký phiên đăng nhập trên Redis (dùng chung mọi worker).
+
+- auth_sessions:{user_id}   HASH session_key -> thời điểm hết hạn (epoch giây) của các phiên đang hoạt động.
+- auth_revoked:{session_key} cờ thu hồi; tra bằng 1 lệnh EXISTS (O(1)).
+Cả 2 sống SESSION_TTL_SECONDS: không token nào mang session_key đó sống lâu hơn
+(pending 2FA tối đa 5 phút rồi mới đổi sang access token ACCESS_TOKEN_EXPIRE_MINUTES).
+
+get_current_user_db gọi check_session() mỗi request (1 round trip Redis): phiên bị thu hồi -> 401 ngay
+trên mọi worker. Sổ chỉ THÊM được lệnh thu hồi: so sánh với users.last_session_key (Single Device Mode,
+RESET_BY_ADMIN) vẫn luôn chạy, nên Redis lỗi / mất dữ liệu không bao giờ mở lại phiên đã bị đá ở DB.
+"""
+import logging
+import time
+from typing import Iterable, Optional
+
+from redis.exceptions import RedisError
+
+from core import cache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING_2FA_GRACE_SECONDS = 5 * 60
+SESSION_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + PENDING_2FA_GRACE_SECONDS
+SESSION_RESET_MARKER = "RESET_BY_ADMIN"  # Giá trị last_session_key khi admin thu hồi mọi phiên (dự phòng ở DB)
+
+
+def _sessions_key(user_id) -> str:
+    return f"auth_sessions:{user_id}"
+
+
+def _revoked_key(session_key: str) -> str:
+    return f"auth_revoked:{session_key}"
+
+
+def _revoke_keys(pipe, session_keys: Iterable[str]) -> None:
+    for session_key in session_keys:
+        pipe.set(_revoked_key(session_key), 1, ex=SESSION_TTL_SECONDS)
+
+
+def register_session(user, session_key: str) -> None:
+    """
+    Gọi SAU commit của mọi lần đăng nhập (đã xoay last_session_key).
+    User bật Single Device Mode -> các phiên khác của user bị thu hồi luôn.
+    Đọc sổ + ghi trong WATCH/MULTI: 2 lần đăng nhập cùng lúc không thể cùng "không thấy" phiên của nhau
+    (lần ghi sau bị hủy và chạy lại với sổ mới nhất).
+    """
+    client = cache.sync_redis_client
+    if not client:
+        return
+
+    key = _sessions_key(user.id)
+
+    def _register(pipe):
+        now = int(time.time())
+        sessions = pipe.hgetall(key)  # Đang WATCH: lệnh chạy ngay, chưa vào MULTI
+        if user.restrict_multi_device:
+            stale = [k for k in sessions if k != session_key]
+            revoked = stale
+        else:
+            stale = [k for k, expires_at in sessions.items() if int(expires_at) <= now]
+            revoked = []
+        pipe.multi()
+        _revoke_keys(pipe, revoked)
+        if stale:
+            pipe.hdel(key, *stale)
+        pipe.hset(key, session_key, now + SESSION_TTL_SECONDS)
+        pipe.expire(key, SESSION_TTL_SECONDS)
+
+    try:
+        client.transaction(_register, key)  # WatchError -> redis-py tự chạy lại _register
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis session register error (user {user.id}): {e}")
+
+
+def revoke_user_sessions(user_id, keep: Optional[str] = None) -> None:
+    """Thu hồi mọi phiên của user (trừ `keep`), có hiệu lực ngay trên mọi worker. Gọi SAU commit."""
+    client = cache.sync_redis_client
+    if not client:
+        return
+
+    key = _sessions_key(user_id)
+    try:
+        revoked = [k for k in client.hkeys(key) if k != keep]
+        if not revoked:
+            return
+        pipe = client.pipeline(transaction=True)
+        _revoke_keys(pipe, revoked)
+        pipe.hdel(key, *revoked)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis session revoke error (user {user_id}): {e}")
+
+
+def _session_state(revoked, active) -> Optional[bool]:
+    if revoked:
+        return False
+    return True if active else None
+
+
+async def check_session(user_id, session_key: Optional[str]) -> Optional[bool]:
+    """False: phiên đã bị thu hồi; True: phiên có trong sổ; None: không có trong sổ / Redis lỗi."""
+    client = cache.redis_client
+    if not client or not user_id or not session_key:
+        return None
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.exists(_revoked_key(session_key))
+        pipe.hexists(_sessions_key(user_id), session_key)
+        revoked, active = await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis session check error (user {user_id}): {e}")
+        return None
+    return _session_state(revoked, active)
+
+
+def check_session_sync(user_id, session_key: Optional[str]) -> Optional[bool]:
+    """Bản đồng bộ của check_session (dependency `def` chạy trong threadpool)."""
+    client = cache.sync_redis_client
+    if not client or not user_id or not session_key:
+        return None
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.exists(_revoked_key(session_key))
+        pipe.hexists(_sessions_key(user_id), session_key)
+        revoked, active = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis session check error (user {user_id}): {e}")
+        return None
+    return _session_state(revoked, active)
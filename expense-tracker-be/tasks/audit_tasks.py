@@ -0,0 +1,30 @@
+# tasks/audit_tasks.py
+import logging
+
+from celery_app import celery_app
+from cruds import crud_audit
+from db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="audit.maintain_partitions")
+def maintain_audit_partitions():
+    """
+    Chạy hằng ngày qua Celery beat: tạo trước partition tháng tới + DROP partition quá hạn giữ.
+    Tạo partition lỗi vẫn chạy retention (2 bước độc lập).
+    """
+    db = SessionLocal()
+    try:
+        created = []
+        try:
+            created = crud_audit.ensure_audit_partitions(db)
+        except Exception:
+            db.rollback()
+            logger.exception("Audit partition creation failed, running retention anyway")
+        dropped = crud_audit.drop_expired_audit_partitions(db)
+        if created or dropped:
+            logger.info(f"Audit partitions created: {created}, dropped: {dropped}")
+        return {"created": created, "dropped": dropped}
+    finally:
+        db.close()
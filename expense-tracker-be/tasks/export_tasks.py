@@ -1,16 +1,84 @@
 # tasks/export_tasks.py
+import logging
+import tempfile
+from datetime import date
+from uuid import UUID
+
+from sqlalchemy import func, select
+
 from celery_app import celery_app
-import pandas as pd
-from io import BytesIO
-from cruds.crud_income import list_incomes_for_user
-from cruds.crud_expense import list_expenses_for_user
+from cruds import crud_export_job
 from db.database import SessionLocal
+from models import export_job_model
+from services.export_service import STREAM_WRITERS, export_file_name, export_statement, iter_export_rows
+from services.export_storage import get_export_storage
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY_ROWS = 5000  # Ghi tiến độ xuống DB mỗi N dòng (không commit từng dòng)
+
+
+def _statement_for_job(job):
+    filters = job.filters or {}
+    return export_statement(
+        job.user_id,
+        type_filter=filters.get("type"),
+        start_date=date.fromisoformat(filters["start_date"]) if filters.get("start_date") else None,
+        end_date=date.fromisoformat(filters["end_date"]) if filters.get("end_date") else None,
+        category_id=UUID(filters["category_id"]) if filters.get("category_id") else None,
+    )
+
+
+@celery_app.task(name="exports.run_export_job")
+def run_export_job(job_id: str):
+    """Ghi file export ra file tạm (bộ nhớ phẳng), đẩy vào storage rồi cập nhật trạng thái job."""
+    db = SessionLocal()
+    try:
+        job = db.get(export_job_model.ExportJob, UUID(job_id))
+        # "running" vẫn chạy lại: task_acks_late giao lại task khi worker chết giữa chừng.
+        if not job or job.status not in crud_export_job.ACTIVE_STATUSES:
+            return
+
+        try:
+            stmt = _statement_for_job(job)
+            total_rows = db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+            crud_export_job.mark_running(db, job, total_rows)
+
+            processed = 0
+
+            def _counted(rows):
+                nonlocal processed
+                for row in rows:
+                    processed += 1
+                    if processed % PROGRESS_EVERY_ROWS == 0:
+                        crud_export_job.update_progress(db, job, processed)
+                    yield row
+
+            storage = get_export_storage()
+            storage_key = f"{job.user_id}/{job.id}.{job.format}"
+            with tempfile.TemporaryFile() as tmp:
+                for chunk in STREAM_WRITERS[job.format](_counted(iter_export_rows(stmt))):
+                    tmp.write(chunk)
+                tmp.seek(0)
+                file_size = storage.save(storage_key, tmp)
+
+            prefix = {"income": "incomes", "expense": "expenses"}.get((job.filters or {}).get("type"), "transactions")
+            crud_export_job.mark_completed(
+                db, job, storage_key, export_file_name(prefix, job.format), file_size, processed
+            )
+        except Exception as e:
+            logger.exception(f"❌ Export job {job_id} failed")
+            db.rollback()
+            crud_export_job.mark_failed(db, job, str(e))
+    finally:
+        db.close()
+
 
-@celery_app.task
-def export_income_task(user_id: str):
+@celery_app.task(name="exports.purge_expired_exports")
+def purge_expired_exports():
+    """Chạy định kỳ qua Celery beat: xóa file hết hạn + đánh dấu job bị treo."""
     db = SessionLocal()
-    data = list_incomes_for_user(db, user_id)["items"]
-    df = pd.DataFrame([...])  # giống export_route
-    # Upload lên Firebase Storage hoặc gửi email
-    # Trả về signed URL
-    return {"file_url": "https://storage.../incomes.xlsx", "status": "completed"}
\ No newline at end of file
+    try:
+        return crud_export_job.expire_export_jobs(db, get_export_storage())
+    finally:
+        db.close()
@@ -0,0 +1,19 @@
+# tasks/system_tasks.py
+import logging
+
+from celery_app import celery_app
+from cruds import crud_system_counter
+from db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="system.reconcile_counters")
+def reconcile_system_counters():
+    """Chạy định kỳ qua Celery beat: sửa lệch giữa system_counters và dữ liệu thật (Admin KPIs)."""
+    db = SessionLocal()
+    try:
+        drift = crud_system_counter.reconcile_system_counters(db)
+        return {name: str(delta) for name, delta in drift.items()}
+    finally:
+        db.close()
@@ -0,0 +1,97 @@
+# tests/test_audit_partitions.py
+"""Bảo trì partition audit_logs (session giả ghi lại SQL): advisory lock, tháng cũ trong DEFAULT, retention."""
+import datetime
+
+import pytest
+
+from cruds import crud_audit
+
+THIS_MONTH = datetime.date(2026, 10, 1)
+
+
+class FakeSession:
+    """Catalog giả: các partition đang có + các tháng còn dòng trong DEFAULT."""
+
+    def __init__(self, partitions=(), default_months=()):
+        self.partitions = set(partitions) | {crud_audit.AUDIT_DEFAULT_PARTITION}
+        self.default_months = list(default_months)
+        self.statements = []
+        self.locked = False
+
+    def _sql(self, stmt):
+        sql = str(stmt)
+        self.statements.append(sql)
+        return sql
+
+    def scalar(self, stmt, params=None):
+        sql = self._sql(stmt)
+        if "to_regclass" in sql:
+            if params["name"] != crud_audit.AUDIT_DEFAULT_PARTITION:
+                assert self.locked, "to_regclass của partition tháng phải chạy sau advisory lock"
+            return params["name"] if params["name"] in self.partitions else None
+        if "SELECT EXISTS" in sql:
+            return params["start"][:7] in {m.isoformat()[:7] for m in self.default_months}
+        raise AssertionError(sql)
+
+    def scalars(self, stmt, params=None):
+        sql = self._sql(stmt)
+        if "date_trunc" in sql:
+            return _Rows([m for m in self.default_months if params["start"] <= m.isoformat() < params["end"]])
+        return _Rows(sorted(self.partitions))
+
+    def execute(self, stmt, params=None):
+        sql = self._sql(stmt)
+        if "pg_advisory_xact_lock" in sql:
+            self.locked = True
+        elif sql.startswith("CREATE TABLE"):
+            self.partitions.add(sql.split()[2])
+        elif sql.startswith("DROP TABLE"):
+            self.partitions.discard(sql.split()[2])
+        return _Result(rowcount=3 if sql.startswith(("INSERT", "DELETE")) else 0)
+
+    def commit(self):
+        self.locked = False
+
+    rollback = commit
+
+
+class _Rows(list):
+    def all(self):
+        return list(self)
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+
+@pytest.fixture(autouse=True)
+def this_month(monkeypatch):
+    monkeypatch.setattr(crud_audit, "_current_month", lambda: THIS_MONTH)
+    monkeypatch.setattr(crud_audit.settings, "AUDIT_RETENTION_MONTHS", 12)
+
+
+def test_creates_current_and_upcoming_months_under_the_lock():
+    db = FakeSession(partitions={"audit_logs_p2026_10"})
+    created = crud_audit.ensure_audit_partitions(db, months_ahead=2)
+    assert created == ["audit_logs_p2026_11", "audit_logs_p2026_12"]
+
+
+def test_past_months_left_in_default_get_their_own_partition():
+    db = FakeSession(
+        partitions={"audit_logs_p2026_10"},
+        default_months=[datetime.date(2026, 7, 1), datetime.date(2025, 1, 1)],  # 2025-01: quá retention
+    )
+    created = crud_audit.ensure_audit_partitions(db, months_ahead=0)
+
+    assert created == ["audit_logs_p2026_07"]
+    assert any(sql.startswith("INSERT INTO audit_logs_p2026_07") for sql in db.statements)
+
+
+def test_retention_drops_old_partitions_and_purges_expired_default_rows():
+    db = FakeSession(partitions={"audit_logs_p2025_09", "audit_logs_p2025_10", "audit_logs_p2026_10"})
+    dropped = crud_audit.drop_expired_audit_partitions(db)
+
+    assert dropped == ["audit_logs_p2025_09"]
+    assert "pg_advisory_xact_lock" in db.statements[0]
+    assert any(sql.startswith(f"DELETE FROM {crud_audit.AUDIT_DEFAULT_PARTITION}") for sql in db.statements)
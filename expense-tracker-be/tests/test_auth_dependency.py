@@ -0,0 +1,65 @@
+# tests/test_auth_dependency.py
+"""get_current_user_db: dependency đồng bộ (chạy trong threadpool), đọc cache user + sổ phiên qua Redis đồng bộ."""
+import inspect
+import uuid
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
+from core import cache
+from core.security import create_access_token
+from models.user_model import User
+from services import auth_token_db, session_registry
+
+
+def _user():
+    return User(id=uuid.uuid4(), email="a@test.local", name="A", restrict_multi_device=False, is_admin=False,
+                is_2fa_enabled=False, currency_code="USD", currency_symbol="$", last_session_key="s1")
+
+
+def _token(user, session_key="s1"):
+    return create_access_token(
+        {"sub": user.email, "id": str(user.id), "session_key": session_key, "token_use": "access"}
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_local_cache():
+    cache._local_auth_user_cache.clear()
+    yield
+    cache._local_auth_user_cache.clear()
+
+
+def test_dependency_is_sync_so_fastapi_runs_it_in_the_threadpool():
+    assert not inspect.iscoroutinefunction(auth_token_db.get_current_user_db)
+
+
+def test_db_hit_fills_the_cache_then_cache_hit_skips_the_query(fake_redis):
+    user = _user()
+    db = mock.Mock()
+    db.query.return_value.filter.return_value.first.return_value = user
+
+    assert auth_token_db.get_current_user_db(_token(user), db) is user
+    assert cache.get_cached_sync(f"auth_user:{user.id}")["email"] == user.email
+
+    cache._local_auth_user_cache.clear()  # Worker khác: chỉ còn tầng Redis
+    db.reset_mock()
+    db.merge.side_effect = lambda obj, load: obj
+    cached_user = auth_token_db.get_current_user_db(_token(user), db)
+
+    assert cached_user.id == user.id
+    db.query.assert_not_called()
+
+
+def test_revoked_session_is_rejected_before_touching_the_db(fake_redis):
+    user = _user()
+    user.restrict_multi_device = True
+    session_registry.register_session(user, "s1")
+    session_registry.register_session(user, "s2")  # Đăng nhập máy khác -> s1 bị thu hồi
+    db = mock.Mock()
+
+    with pytest.raises(HTTPException) as exc:
+        auth_token_db.get_current_user_db(_token(user, "s1"), db)
+    assert exc.value.status_code == 401
+    db.query.assert_not_called()
@@ -0,0 +1,170 @@
+# tests/test_chat_cache.py
+"""
+Chat cache theo intent (LLM giả, fakeredis): câu cùng nghĩa dùng chung 1 entry; câu ghi, câu mơ hồ,
+câu theo danh mục/cửa hàng không bao giờ được trả lời từ cache của câu khác.
+"""
+import uuid
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from core import cache
+from services import chat_service
+from services.chat_intent import resolve_period
+
+pytestmark = pytest.mark.anyio
+
+# Mỗi nhóm: (tool + mốc thời gian mà LLM sẽ gọi, các câu diễn đạt khác nhau). Câu đầu tiên "mồi" cache.
+PARAPHRASE_GROUPS = [
+    (("get_balance", None), [
+        "số dư của tôi là bao nhiêu?", "Số dư", "cho mình xem số dư", "tôi còn bao nhiêu tiền",
+        "còn lại bao nhiêu tiền vậy", "so du",
+    ]),
+    (("get_balance", None), [
+        "What's my balance?", "balance", "how much money do I have", "show my balance",
+    ]),
+    (("get_statistics", "this_month"), [
+        "tháng này tiêu bao nhiêu", "Tháng này mình chi tiêu bao nhiêu vậy?", "tổng chi tiêu tháng này",
+        "thống kê tháng này", "tháng này xài hết bao nhiêu rồi",
+    ]),
+    (("get_statistics", "this_month"), [
+        "how much did I spend this month", "How much have I spent this month?", "this month's spending",
+        "total spending this month",
+    ]),
+    (("get_statistics", "last_month"), [
+        "tháng trước tiêu bao nhiêu", "tháng rồi chi tiêu hết bao nhiêu", "thống kê tháng trước",
+    ]),
+    (("get_statistics", "last_month"), [
+        "how much did I spend last month", "total spending last month", "How much have I spent last month?",
+    ]),
+    (("get_statistics", "yesterday"), [
+        "hôm qua tiêu bao nhiêu", "hôm qua chi tiêu hết bao nhiêu", "tổng chi hôm qua",
+    ]),
+    (("get_statistics", "this_week"), [
+        "tuần này tiêu bao nhiêu", "thống kê tuần này", "tuần này xài bao nhiêu",
+    ]),
+    (("analyze_spending", "this_month"), [
+        "vẽ biểu đồ chi tiêu tháng này", "biểu đồ tháng này", "cơ cấu chi tiêu tháng này",
+    ]),
+    (("analyze_spending", "this_month"), [
+        "show me a chart of this month", "spending breakdown this month",
+    ]),
+]
+
+# Không bao giờ được trả từ cache: ghi dữ liệu, câu mơ hồ, hoặc đang trả lời câu hỏi của bot.
+NEGATIVE_CASES = [
+    ("vừa ăn 50k", []),
+    ("đặt ngân sách tháng này 5 triệu", []),
+    ("ghi chi tiêu hôm nay", []),
+    ("tháng này so với tháng trước thế nào", []),
+    ("số dư tháng này", []),
+    ("2024-12-03", []),
+    ("tháng này", [{"role": "bot", "content": "Khoản này vào ngày nào ạ?"}]),
+]
+
+# (câu tổng, câu theo danh mục/cửa hàng, mốc): LLM có thể gọi cùng tool + khoảng ngày cho cả 2 câu
+# nhưng câu trả lời khác nhau -> không câu nào được trả lời bằng cache của câu kia (theo cả 2 chiều).
+NON_COLLIDING_PAIRS = [
+    ("tháng này tiêu bao nhiêu", "tháng này tiêu cafe bao nhiêu", "this_month"),
+    ("how much did I spend this month", "how much did I spend on food this month", "this_month"),
+    ("hôm qua tiêu bao nhiêu", "hôm qua ăn uống hết bao nhiêu", "yesterday"),
+    ("thống kê tháng trước", "thống kê grab tháng trước", "last_month"),
+]
+
+
+def _tool_call(tool: str, period):
+    if period is None:
+        return tool, {}
+    start, end = resolve_period(period, date.today())
+    return tool, {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+
+class FakeAgent:
+    """LLM giả: mỗi lần gọi 1 câu trả lời khác nhau, kèm tool call mà LLM thật sẽ gọi cho câu đó."""
+
+    def __init__(self):
+        self.calls = 0
+        self.expected_calls = {}
+
+    def expect(self, message: str, tool_call):
+        self.expected_calls[message] = tool_call
+
+    def __call__(self, user_id, user_message, history):
+        self.calls += 1
+        tool_call = self.expected_calls.get(user_message, ("create_transaction", {"amount": 50000}))
+        return f"answer #{self.calls}", [tool_call]
+
+
+@pytest.fixture
+def chat(fake_redis, monkeypatch):
+    """ask(message, history) -> True nếu câu trả lời được đọc từ chat cache."""
+    agent = FakeAgent()
+    hits = []
+    get_cached = chat_service.get_cached
+
+    async def spy_get_cached(key):
+        value = await get_cached(key)
+        if value is not None and key.startswith("chat:"):
+            hits.append(key)
+        return value
+
+    monkeypatch.setattr(chat_service, "get_cached", spy_get_cached)
+    monkeypatch.setattr(chat_service, "_run_agent", agent)
+    # Tắt fast path (router gọi thẳng tool) để kiểm tra riêng tầng cache trước LLM.
+    monkeypatch.setattr(chat_service, "_run_fast_path", lambda user_id, intent: None)
+    user = mock.Mock(id=uuid.uuid4(), is_admin=False)
+
+    async def ask(message, history=None):
+        before = len(hits)
+        await chat_service.process_chat_message(user, message, history or [])
+        return len(hits) > before
+
+    ask.agent, ask.user = agent, user
+    return ask
+
+
+@pytest.mark.parametrize(
+    "tool_period, messages", PARAPHRASE_GROUPS, ids=[messages[0] for _, messages in PARAPHRASE_GROUPS]
+)
+async def test_paraphrases_share_one_cache_entry(chat, tool_period, messages):
+    for message in messages:
+        chat.agent.expect(message, _tool_call(*tool_period))
+
+    assert not await chat(messages[0])
+    for message in messages[1:]:
+        assert await chat(message), message
+    assert chat.agent.calls == 1
+
+
+@pytest.mark.parametrize("message, history", NEGATIVE_CASES, ids=[message for message, _ in NEGATIVE_CASES])
+async def test_never_served_from_cache(chat, message, history):
+    await chat(message, history)  # lần 1 có thể ghi cache (nếu lỗi), lần 2 mới lộ ra
+    assert not await chat(message, history)
+
+
+@pytest.mark.parametrize("first, second, period", [
+    pair for plain, scoped, period in NON_COLLIDING_PAIRS
+    for pair in ((plain, scoped, period), (scoped, plain, period))
+])
+async def test_category_scoped_questions_do_not_collide(chat, first, second, period):
+    chat.agent.expect(first, _tool_call("get_statistics", period))
+    chat.agent.expect(second, _tool_call("get_statistics", period))
+
+    await chat(first)
+    assert not await chat(second)
+
+
+async def test_write_makes_cached_answer_stale(chat):
+    chat.agent.expect("số dư", _tool_call("get_balance", None))
+    await chat("số dư")
+    assert await chat("số dư")
+
+    cache.bump_user_data_version(chat.user.id)  # Thêm/sửa/xóa giao dịch
+    assert not await chat("số dư")
+
+
+async def test_answer_not_cached_when_llm_calls_another_tool(chat):
+    chat.agent.expect("tháng này tiêu bao nhiêu", _tool_call("get_statistics", "last_month"))
+    await chat("tháng này tiêu bao nhiêu")
+    assert not await chat("tháng này tiêu bao nhiêu")
@@ -0,0 +1,58 @@
+# tests/test_daily_totals.py
+"""Rollup user_daily_totals: khóa theo tên danh mục lưu trên giao dịch (snapshot), không theo Category.name."""
+import uuid
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+from cruds import crud_analytics, crud_daily_total, crud_system_counter
+from schemas.analytics_schemas import AnalyticsFilter
+
+USER_ID = uuid.uuid4()
+FOOD_ID = uuid.uuid4()
+
+
+def _txn(amount, category_name):
+    return SimpleNamespace(user_id=USER_ID, date=date(2026, 10, 1), type="expense", category_id=FOOD_ID,
+                           category_name=category_name, amount=amount)
+
+
+def _compiled(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+def test_bulk_upsert_keeps_one_row_per_category_name_snapshot(monkeypatch):
+    monkeypatch.setattr(crud_system_counter, "track_transaction_delta", mock.Mock())
+    db = mock.Mock()
+    crud_daily_total.add_transactions_bulk(
+        db, [_txn(10, "Food"), _txn(5, "Lunch"), _txn(7, "Food"), _txn(3, None)]
+    )
+
+    compiled = _compiled(db.execute.call_args.args[0])
+    assert "ON CONFLICT (user_id, date, type, category_id, category_name)" in str(compiled)
+    rows = {
+        compiled.params[f"category_name_m{i}"]: (compiled.params[f"total_amount_m{i}"],
+                                                 compiled.params[f"transaction_count_m{i}"])
+        for i in range(3)
+    }
+    assert rows == {"Food": (17, 2), "Lunch": (5, 1), "": (3, 1)}
+
+
+def test_remove_targets_the_row_of_the_transaction_snapshot(monkeypatch):
+    monkeypatch.setattr(crud_system_counter, "track_transaction_delta", mock.Mock())
+    db = mock.Mock()
+    db.execute.return_value.scalar.return_value = 0  # Hết giao dịch -> xóa dòng rollup
+    crud_daily_total.remove_transaction(db, _txn(10, "Lunch"))
+
+    upsert, delete = (_compiled(call.args[0]) for call in db.execute.call_args_list)
+    assert upsert.params["category_name"] == "Lunch"
+    assert "user_daily_totals.category_name = " in str(delete) and "Lunch" in delete.params.values()
+
+
+def test_category_distribution_groups_by_the_snapshot_without_joining_categories():
+    stmt = crud_analytics._analytics_statements(USER_ID, AnalyticsFilter())["category_distribution"]
+    sql = str(_compiled(stmt))
+    assert "GROUP BY user_daily_totals.category_name, user_daily_totals.type" in sql
+    assert "categories" not in sql
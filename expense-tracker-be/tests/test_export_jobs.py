@@ -0,0 +1,160 @@
+# tests/test_export_jobs.py
+"""
+Job export qua Celery (task_always_eager, SQLite in-memory, storage local trong tmp_path):
+pending -> running -> completed/failed, giới hạn job đồng thời, dọn file hết hạn và job bị treo.
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateTable
+
+from celery_app import celery_app
+from cruds import crud_export_job
+from models import category_model, export_job_model, transaction_model, user_model
+from services import export_service, export_storage
+from tasks import export_tasks
+
+TABLES = [user_model.User, category_model.Category, transaction_model.Transaction, export_job_model.ExportJob]
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(_type, _compiler, **_kw):
+    return "JSON"
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        for model in TABLES:  # Chỉ bảng, không tạo index (index biểu thức / INCLUDE là cú pháp Postgres)
+            conn.execute(CreateTable(model.__table__))
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(export_tasks, "SessionLocal", session_factory)
+    monkeypatch.setattr(export_service, "SessionLocal", session_factory)
+    yield session_factory
+    engine.dispose()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    local = export_storage.LocalExportStorage(str(tmp_path))
+    monkeypatch.setattr(export_storage, "_storage", local)
+    return local
+
+
+@pytest.fixture(autouse=True)
+def eager_celery(monkeypatch):
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+
+
+@pytest.fixture
+def db(Session):
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = user_model.User(email="a@test.local", currency_code="USD", currency_symbol="$")
+    db.add(user)
+    db.flush()
+    food = category_model.Category(user_id=user.id, name="Food", type="expense")
+    salary = category_model.Category(user_id=user.id, name="Salary", type="income")
+    db.add_all([food, salary])
+    db.flush()
+    for day in range(1, 4):
+        db.add(transaction_model.Transaction(user_id=user.id, category_id=food.id, type="expense", amount=10 * day,
+                                             category_name="Food", date=date(2026, 10, day)))
+    db.add(transaction_model.Transaction(user_id=user.id, category_id=salary.id, type="income", amount=1000,
+                                         category_name="Salary", date=date(2026, 10, 1)))
+    db.commit()
+    return user
+
+
+def _run(db, user, export_format="csv", filters=None):
+    job = crud_export_job.create_export_job(db, user.id, export_format, filters or {"type": "expense"})
+    export_tasks.run_export_job.delay(str(job.id))
+    db.refresh(job)
+    return job
+
+
+def test_job_runs_to_completed_with_file_and_expiry(db, user, storage, monkeypatch):
+    statuses = []
+    mark_running = crud_export_job.mark_running
+
+    def record_running(session, job, total_rows):
+        statuses.append(job.status)
+        mark_running(session, job, total_rows)
+        statuses.append(job.status)
+
+    monkeypatch.setattr(crud_export_job, "mark_running", record_running)
+    job = _run(db, user)
+
+    assert statuses == ["pending", "running"]
+    assert job.status == "completed"
+    assert (job.total_rows, job.processed_rows) == (3, 3)
+    assert job.file_name.startswith("expenses_") and job.file_name.endswith(".csv")
+    assert job.expires_at - job.finished_at == timedelta(hours=crud_export_job.settings.EXPORT_RESULT_TTL_HOURS)
+    assert crud_export_job.job_progress(job) == 100.0
+    with storage.open(job.storage_key) as exported:
+        assert exported.read() and os.path.getsize(exported.name) == job.file_size
+
+
+def test_writer_error_marks_the_job_failed(db, user, storage, monkeypatch):
+    def broken_writer(rows):
+        next(iter(rows))
+        raise RuntimeError("disk full")
+
+    monkeypatch.setitem(export_tasks.STREAM_WRITERS, "csv", broken_writer)
+    job = _run(db, user)
+
+    assert job.status == "failed"
+    assert "disk full" in job.error
+    assert job.storage_key is None and job.finished_at is not None
+
+
+def test_finished_job_is_not_rerun_when_redelivered(db, user, storage):
+    job = _run(db, user)
+    finished_at = job.finished_at
+
+    export_tasks.run_export_job.delay(str(job.id))  # task_acks_late: task có thể được giao lại
+    db.refresh(job)
+    assert job.status == "completed" and job.finished_at == finished_at
+
+
+def test_active_job_limit_per_user(db, user, monkeypatch):
+    monkeypatch.setattr(crud_export_job.settings, "EXPORT_MAX_ACTIVE_JOBS_PER_USER", 2)
+    for _ in range(2):
+        crud_export_job.create_export_job(db, user.id, "csv", {})
+
+    with pytest.raises(HTTPException) as exc:
+        crud_export_job.create_export_job(db, user.id, "csv", {})
+    assert exc.value.status_code == 429
+
+
+def test_purge_expires_old_files_and_fails_stuck_jobs(db, user, storage, monkeypatch):
+    done = _run(db, user)
+    stuck = crud_export_job.create_export_job(db, user.id, "csv", {})  # Worker chết trước khi nhận job
+    assert export_tasks.purge_expired_exports.delay().get() == 0
+
+    now = crud_export_job._now()
+    monkeypatch.setattr(crud_export_job, "_now", lambda: now + timedelta(hours=25))
+    fresh = crud_export_job.create_export_job(db, user.id, "csv", {})
+    db.query(export_job_model.ExportJob).filter_by(id=fresh.id).update({"created_at": now + timedelta(hours=25)})
+    db.commit()
+
+    assert export_tasks.purge_expired_exports.delay().get() == 2
+    for job in (done, stuck, fresh):
+        db.refresh(job)
+    assert done.status == "expired" and done.storage_key is None
+    assert not os.listdir(os.path.join(storage.base_dir, str(user.id)))
+    assert stuck.status == "failed" and stuck.error == "Export timed out"
+    assert fresh.status == "pending"
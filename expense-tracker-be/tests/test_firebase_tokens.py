@@ -0,0 +1,162 @@
+# tests/test_firebase_tokens.py
+"""Xác minh Firebase ID token offline: cặp khóa RSA tự sinh thay cho khóa ký của Firebase."""
+import datetime
+import threading
+import time
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import auth as fb_auth
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from services.firebase_token_verifier import ID_TOKEN_ISSUER_PREFIX, FirebaseTokenVerifier
+
+PROJECT_ID = "test-project"
+
+
+class LocalKey:
+    """Cặp khóa RSA + chứng chỉ tự ký, đóng vai khóa ký của Firebase."""
+
+    def __init__(self, kid: str):
+        self.kid = kid
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(private_key, hashes.SHA256())
+        )
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+        key_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        self.signer = crypt.RSASigner.from_string(key_pem, key_id=kid)
+
+    def token(self, uid: str = "uid-1", ttl: int = 3600, **overrides) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": ID_TOKEN_ISSUER_PREFIX + PROJECT_ID, "aud": PROJECT_ID, "sub": uid,
+            "iat": now - 10, "exp": now + ttl, "email": f"{uid}@test.local",
+        }
+        payload.update(overrides)
+        return google_jwt.encode(self.signer, payload).decode()
+
+
+class FakeCertEndpoint:
+    """Thay cho endpoint chứng chỉ của Google: đếm số lần tải."""
+
+    def __init__(self, keys, max_age: int = 3600):
+        self.keys = list(keys)
+        self.max_age = max_age
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {key.kid: key.cert_pem for key in self.keys}, self.max_age
+
+
+@pytest.fixture(scope="module")
+def key():
+    return LocalKey("key-1")
+
+
+@pytest.fixture
+def endpoint(key):
+    return FakeCertEndpoint([key])
+
+
+def _verifier(endpoint, **kwargs) -> FirebaseTokenVerifier:
+    return FirebaseTokenVerifier(cache_size=1000, refresh_margin=300, retry_interval=30,
+                                 fetch_certs=endpoint, project_id=PROJECT_ID, **kwargs)
+
+
+def test_valid_token_is_verified_once_then_served_from_cache(key, endpoint):
+    verifier = _verifier(endpoint)
+    token = key.token()
+
+    payload = verifier.verify(token)
+    assert payload["uid"] == "uid-1" and payload["email"] == "uid-1@test.local"
+    payload["uid"] = "tampered"
+    assert verifier.verify(token)["uid"] == "uid-1"  # Cache trả bản sao, không bị sửa theo
+    assert verifier.stats == {"cache_hits": 1, "verified": 1, "cert_fetches": 1}
+    assert endpoint.calls == 1
+
+
+@pytest.mark.parametrize("overrides, error", [
+    ({"ttl": -60}, fb_auth.ExpiredIdTokenError),
+    ({"aud": "other"}, fb_auth.InvalidIdTokenError),
+    ({"iss": "https://evil.example/x"}, fb_auth.InvalidIdTokenError),
+    ({"uid": ""}, fb_auth.InvalidIdTokenError),
+], ids=["expired", "audience", "issuer", "empty-subject"])
+def test_bad_claims_are_rejected(key, endpoint, overrides, error):
+    with pytest.raises(error):
+        _verifier(endpoint).verify(key.token(**overrides))
+
+
+def test_forged_or_garbage_tokens_are_rejected(key, endpoint):
+    verifier = _verifier(endpoint)
+    head, _body, signature = key.token().split(".")
+    forged = ".".join([head, google_jwt.encode(key.signer, {"sub": "admin"}).decode().split(".")[1], signature])
+
+    with pytest.raises(fb_auth.InvalidIdTokenError):
+        verifier.verify(forged)
+    with pytest.raises(fb_auth.InvalidIdTokenError):
+        verifier.verify("not-a-jwt")
+
+
+def test_unknown_kid_refreshes_once_and_picks_up_rotated_keys(key, endpoint):
+    verifier = _verifier(endpoint)
+    verifier.verify(key.token())
+
+    with pytest.raises(fb_auth.InvalidIdTokenError):
+        verifier.verify(LocalKey("key-x").token())
+    assert endpoint.calls == 2
+
+    rotated = LocalKey("key-2")
+    endpoint.keys.append(rotated)
+    assert verifier.verify(rotated.token(uid="uid-2"))["uid"] == "uid-2"
+
+
+def test_cached_payload_is_dropped_at_exp(key, endpoint):
+    clock = [time.time()]
+    verifier = _verifier(endpoint, timer=lambda: clock[0])
+    token = key.token(ttl=60)
+    verifier.verify(token)
+
+    clock[0] += 120  # Chữ ký kiểm theo giờ thật (token còn hạn), cache theo giờ giả (đã quá exp)
+    verifier.verify(token)
+    assert verifier.stats["verified"] == 2 and verifier.stats["cache_hits"] == 0
+
+
+def test_stats_are_exact_under_concurrent_verifies(key, endpoint):
+    verifier = _verifier(endpoint)
+    token = key.token()
+    verifier.verify(token)
+    threads = [threading.Thread(target=lambda: [verifier.verify(token) for _ in range(200)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert verifier.stats["cache_hits"] == 8 * 200
+
+
+def test_background_thread_refreshes_certs_before_max_age(key):
+    endpoint = FakeCertEndpoint([key], max_age=1)
+    verifier = FirebaseTokenVerifier(cache_size=10, refresh_margin=0.5, retry_interval=0.2,
+                                     fetch_certs=endpoint, project_id=PROJECT_ID)
+    verifier.start()
+    try:
+        deadline = time.time() + 5
+        while endpoint.calls < 2 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        verifier.stop()
+    assert endpoint.calls >= 2
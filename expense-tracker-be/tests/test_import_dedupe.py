@@ -0,0 +1,62 @@
+# tests/test_import_dedupe.py
+"""Bỏ dòng trùng khi import sao kê: so theo số lần xuất hiện, kể cả khi dòng trùng nằm ở 2 batch khác nhau."""
+import uuid
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+
+from cruds.crud_transaction import _drop_duplicate_rows
+
+USER_ID = uuid.uuid4()
+COFFEE = {"date": date(2026, 10, 1), "amount": Decimal("45000"), "note": "HIGHLANDS COFFEE"}
+LUNCH = {"date": date(2026, 10, 1), "amount": Decimal("60000"), "note": "COM TAM"}
+
+
+class FakeSession:
+    """Giao dịch đã có của user (date, amount, note); bỏ qua WHERE vì khóa trùng được so ở Python."""
+
+    def __init__(self, rows=()):
+        self.rows = [(r["date"], r["amount"], r["note"]) for r in rows]
+
+    def execute(self, _stmt):
+        return self
+
+    def all(self):
+        return list(self.rows)
+
+    def commit_batch(self, rows):
+        self.rows.extend((r["date"], r["amount"], r["note"]) for r in rows)
+
+
+def _import(db, batches):
+    seen_keys = Counter()
+    inserted = []
+    for batch in batches:
+        created = _drop_duplicate_rows(db, USER_ID, batch, seen_keys)
+        db.commit_batch(created)
+        inserted.extend(created)
+    return inserted
+
+
+def test_identical_rows_in_one_file_are_all_kept():
+    assert _import(FakeSession(), [[COFFEE, COFFEE, LUNCH]]) == [COFFEE, COFFEE, LUNCH]
+
+
+def test_reimporting_the_same_file_skips_every_row():
+    db = FakeSession()
+    _import(db, [[COFFEE, COFFEE, LUNCH]])
+    assert _import(db, [[COFFEE, COFFEE, LUNCH]]) == []
+    assert len(db.rows) == 3
+
+
+def test_only_occurrences_beyond_existing_rows_are_inserted():
+    db = FakeSession([COFFEE])
+    assert _import(db, [[COFFEE, COFFEE, COFFEE]]) == [COFFEE, COFFEE]
+
+
+def test_duplicates_split_across_batches():
+    assert _import(FakeSession(), [[COFFEE], [COFFEE]]) == [COFFEE, COFFEE]
+
+    db = FakeSession([COFFEE])
+    assert _import(db, [[COFFEE], [LUNCH, COFFEE]]) == [LUNCH, COFFEE]
+    assert _import(db, [[COFFEE], [LUNCH, COFFEE]]) == []
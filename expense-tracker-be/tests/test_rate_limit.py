@@ -0,0 +1,172 @@
+# tests/test_rate_limit.py
+"""Rate limit token bucket (fakeredis + lupa chạy Lua): Redis, fallback trong process, middleware, IP sau proxy."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fakeredis.commands_mixins import server_mixin
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from core import cache
+from core.security import create_access_token
+from services.rate_limiter import (
+    RateLimitMiddleware, RateLimitPolicy, RateLimiter, client_ip, parse_trusted_proxies,
+)
+
+pytestmark = pytest.mark.anyio
+
+ORIGIN = "http://localhost:5173"
+
+
+class BrokenRedis:
+    """Redis sập: mọi lệnh ném ConnectionError, đếm số lần bị gọi."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, _script):
+        async def run(keys, args):
+            self.calls += 1
+            raise RedisConnectionError("connection refused")
+
+        return run
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Đồng hồ giả dùng chung cho limiter (fallback) và lệnh TIME của fakeredis (Lua script)."""
+    now = [time.time()]
+    monkeypatch.setattr(server_mixin, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _policy(name="test", per_minute=60, burst=5, per_ip=False):
+    return RateLimitPolicy(name, per_minute, burst, [("POST", "/expensive")], per_ip=per_ip)
+
+
+def _limiter(policy, clock):
+    return RateLimiter([policy], redis_retry_seconds=5, timer=lambda: clock[0])
+
+
+async def _burst(limiter, policy, identity, count):
+    return [await limiter.hit(policy, identity) for _ in range(count)]
+
+
+async def test_burst_then_limited_with_retry_after(fake_redis, clock):
+    policy = _policy()
+    limiter = _limiter(policy, clock)
+
+    results = await _burst(limiter, policy, "user:a", 6)
+    assert [r[0] for r in results] == [True] * 5 + [False]
+    assert results[-1][2] == pytest.approx(1.0, abs=0.01)  # Thời gian nạp lại 1 token
+    assert limiter.stats["local"] == 0
+    assert (await limiter.hit(policy, "user:b"))[0]  # Identity khác có bucket riêng
+
+
+async def test_bucket_refills_on_the_redis_clock(fake_redis, clock):
+    policy = _policy()
+    limiter = RateLimiter([policy], redis_retry_seconds=5, timer=lambda: 0.0)  # Đồng hồ worker bị lệch hẳn
+    await _burst(limiter, policy, "user:a", 5)
+
+    clock[0] += 2.5
+    assert [r[0] for r in await _burst(limiter, policy, "user:a", 3)] == [True, True, False]
+    clock[0] += 3600
+    assert [r[0] for r in await _burst(limiter, policy, "user:a", 6)] == [True] * 5 + [False]  # Tối đa = burst
+    assert 0 < await fake_redis.pttl(f"rate:{policy.name}:user:a") <= 6000  # Hết hạn khi bucket đã nạp đầy
+
+
+async def test_workers_with_skewed_clocks_share_one_bucket(fake_redis, clock):
+    policy = _policy()
+    ahead = RateLimiter([policy], redis_retry_seconds=5, timer=lambda: clock[0] + 3600)
+    behind = _limiter(policy, clock)
+    await _burst(behind, policy, "user:c", 5)
+
+    # Worker nhanh giờ không được tự "nạp" bucket theo đồng hồ của nó
+    assert not (await ahead.hit(policy, "user:c"))[0]
+    results = await asyncio.gather(*(w.hit(policy, "user:d") for w in (ahead, behind) for _ in range(20)))
+    assert sum(r[0] for r in results) == 5
+
+
+async def test_redis_down_falls_back_to_in_process_buckets(monkeypatch, clock):
+    broken = BrokenRedis()
+    monkeypatch.setattr(cache, "redis_client", broken)
+    policy = _policy()
+    limiter = _limiter(policy, clock)
+
+    results = await _burst(limiter, policy, "user:a", 6)
+    assert [r[0] for r in results] == [True] * 5 + [False]
+    assert broken.calls == 1 and limiter.stats["local"] == 6  # Bỏ qua Redis trong cửa sổ retry
+
+    clock[0] += 6
+    await limiter.hit(policy, "user:a")
+    assert broken.calls == 2
+
+
+@pytest.mark.parametrize("peer, forwarded, expected", [
+    ("203.0.113.9", None, "203.0.113.9"),
+    ("203.0.113.9", "1.2.3.4", "203.0.113.9"),  # Không qua proxy tin cậy: bỏ qua header client tự đặt
+    ("10.0.0.2", "198.51.100.7", "198.51.100.7"),
+    ("10.0.0.2", "1.2.3.4, 198.51.100.7, 10.0.0.5", "198.51.100.7"),  # Hop giả mạo bên trái bị bỏ qua
+    ("10.0.0.2", None, "10.0.0.2"),
+    ("10.0.0.2", "not-an-ip", "not-an-ip"),
+])
+def test_client_ip_only_trusts_forwarded_for_from_proxies(peer, forwarded, expected):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {"client": (peer, 50000), "headers": headers}
+    assert client_ip(scope, parse_trusted_proxies("10.0.0.0/8, bogus")) == expected
+
+
+@pytest.fixture
+def client(fake_redis, clock):
+    user_policy, ip_policy = _policy("user", burst=2), _policy("ip", burst=2, per_ip=True)
+    ip_policy.routes = {("POST", "/login")}
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter([user_policy, ip_policy], 5, timer=lambda: clock[0]),
+                       trusted_proxies="10.0.0.0/8")
+    app.add_middleware(CORSMiddleware, allow_origins=[ORIGIN], allow_methods=["*"], allow_headers=["*"])
+
+    for path in ("/expensive", "/login", "/cheap"):
+        app.add_api_route(path, lambda: {"ok": True}, methods=["POST"])
+    return TestClient(app, client=("10.0.0.2", 50000))  # Request đi qua reverse proxy 10.0.0.2
+
+
+@pytest.fixture
+def auth():
+    token = create_access_token({"sub": "a@test.local", "id": "user-a", "token_use": "access"})
+    return {"Authorization": f"Bearer {token}", "Origin": ORIGIN}
+
+
+def test_middleware_returns_429_with_retry_after_and_cors(client, auth):
+    assert [client.post("/expensive", headers=auth).status_code for _ in range(2)] == [200, 200]
+    limited = client.post("/expensive", headers=auth)
+
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert limited.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_anonymous_and_forged_tokens_use_the_ip_bucket(client, auth):
+    assert client.post("/expensive", headers=auth).status_code == 200
+    assert client.post("/expensive", headers={"Origin": ORIGIN}).status_code == 200
+    assert client.post("/expensive", headers={"Authorization": "Bearer forged.token.x"}).status_code == 200
+    assert client.post("/expensive", headers={"Authorization": "Bearer forged.token.y"}).status_code == 429
+
+
+def test_unmatched_routes_and_preflight_are_not_limited(client, auth):
+    assert all(client.post("/cheap", headers=auth).status_code == 200 for _ in range(10))
+    preflight = {"Origin": ORIGIN, "Access-Control-Request-Method": "POST"}
+    assert all(client.options("/login", headers=preflight).status_code == 200 for _ in range(5))
+
+
+def test_per_ip_policy_ignores_the_user_token(client, auth):
+    assert [client.post("/login", headers=auth).status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_per_ip_policy_limits_each_client_behind_the_proxy(client):
+    first, second = {"X-Forwarded-For": "198.51.100.1"}, {"X-Forwarded-For": "198.51.100.2"}
+    assert [client.post("/login", headers=first).status_code for _ in range(3)] == [200, 200, 429]
+    assert client.post("/login", headers=second).status_code == 200
@@ -0,0 +1,65 @@
+# tests/test_response_cache.py
+"""cached_response (fakeredis): key theo user + data_version + ngày hiện tại."""
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from core import cache
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeDate(date):
+    current = date(2026, 10, 31)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+@pytest.fixture
+def route(fake_redis, monkeypatch):
+    """Route giả đếm số lần đọc DB; trả về ngày mà nó "tính" dữ liệu."""
+    monkeypatch.setattr(cache, "date", FakeDate)
+    calls = []
+
+    @cache.cached_response("test:daily")
+    async def daily_trend(days: int = 30, current_user=None, db=None):
+        calls.append(days)
+        return {"as_of": FakeDate.today().isoformat(), "days": days}
+
+    daily_trend.calls = calls
+    daily_trend.user = SimpleNamespace(id=uuid.uuid4())
+    return daily_trend
+
+
+async def test_same_day_is_served_from_cache(route):
+    assert await route(days=7, current_user=route.user) == await route(days=7, current_user=route.user)
+    assert route.calls == [7]
+
+
+async def test_new_day_misses_the_previous_days_entry(route, monkeypatch):
+    await route(days=7, current_user=route.user)
+    monkeypatch.setattr(FakeDate, "current", date(2026, 11, 1))
+
+    assert (await route(days=7, current_user=route.user))["as_of"] == "2026-11-01"
+    assert route.calls == [7, 7]
+
+
+async def test_write_bumps_the_version(route):
+    await route(days=7, current_user=route.user)
+    cache.bump_user_data_version(route.user.id)
+    await route(days=7, current_user=route.user)
+    assert route.calls == [7, 7]
+
+
+def test_dashboard_month_follows_the_cache_key_date(monkeypatch):
+    from cruds import crud_summary
+
+    monkeypatch.setattr(crud_summary, "date", FakeDate)
+    monkeypatch.setattr(FakeDate, "current", date(2026, 11, 1))  # Đã sang tháng theo ngày local
+    params = crud_summary._current_dashboard_statement(uuid.uuid4()).compile().params
+
+    assert date(2026, 11, 1) in params.values() and date(2026, 12, 1) in params.values()
@@ -0,0 +1,71 @@
+# tests/test_session_registry.py
+"""Sổ phiên đăng nhập trên Redis (fakeredis): Single Device Mode, thu hồi, đăng nhập đồng thời."""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from core import cache
+from services import session_registry
+
+pytestmark = pytest.mark.anyio
+
+
+def _user(restrict_multi_device=True):
+    return SimpleNamespace(id=uuid.uuid4(), restrict_multi_device=restrict_multi_device)
+
+
+async def test_single_device_login_revokes_other_sessions(fake_redis):
+    user = _user()
+    session_registry.register_session(user, "a")
+    session_registry.register_session(user, "b")
+
+    assert await session_registry.check_session(user.id, "a") is False
+    assert await session_registry.check_session(user.id, "b") is True
+
+
+async def test_multi_device_login_keeps_other_sessions(fake_redis):
+    user = _user(restrict_multi_device=False)
+    session_registry.register_session(user, "a")
+    session_registry.register_session(user, "b")
+
+    assert await session_registry.check_session(user.id, "a") is True
+    assert await session_registry.check_session(user.id, "b") is True
+
+
+async def test_concurrent_single_device_logins_do_not_both_survive(fake_redis, monkeypatch):
+    """Lần đăng nhập "a" chen vào giữa lúc "b" đọc sổ và ghi: EXEC của "b" bị hủy, chạy lại và thu hồi "a"."""
+    user = _user()
+    revoke_keys = session_registry._revoke_keys
+    interleaved = []
+
+    def revoke_keys_after_concurrent_login(pipe, session_keys):
+        if not interleaved:  # Lần đầu: "b" đã đọc sổ (trống), chưa ghi
+            interleaved.append(True)
+            session_registry.register_session(user, "a")
+        revoke_keys(pipe, session_keys)
+
+    monkeypatch.setattr(session_registry, "_revoke_keys", revoke_keys_after_concurrent_login)
+    session_registry.register_session(user, "b")
+
+    assert await session_registry.check_session(user.id, "a") is False
+    assert await session_registry.check_session(user.id, "b") is True
+    assert set(cache.sync_redis_client.hkeys(f"auth_sessions:{user.id}")) == {"b"}
+
+
+async def test_revoke_user_sessions_keeps_current_session(fake_redis):
+    user = _user(restrict_multi_device=False)
+    for session_key in ("a", "b", "c"):
+        session_registry.register_session(user, session_key)
+
+    session_registry.revoke_user_sessions(user.id, keep="c")
+
+    assert [await session_registry.check_session(user.id, k) for k in ("a", "b", "c")] == [False, False, True]
+
+
+async def test_unknown_session_or_no_redis_is_left_to_the_db_check(fake_redis, monkeypatch):
+    user = _user()
+    assert await session_registry.check_session(user.id, "never-registered") is None
+
+    monkeypatch.setattr(cache, "redis_client", None)
+    assert await session_registry.check_session(user.id, "a") is None
@@ -0,0 +1,53 @@
+# tests/test_support_request.py
+"""POST /auth/api/public/support-request: ghi audit (có thể chặn khi hàng đợi đầy) phải chạy ngoài event loop."""
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cruds import crud_audit, crud_user
+from db.database import get_db
+from routes import auth_route
+
+PAYLOAD = {"email": "a@test.local", "issue_type": "LOST_2FA", "message": "help"}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(auth_route.router)
+    app.dependency_overrides[get_db] = lambda: mock.Mock()
+    return TestClient(app, client=("203.0.113.9", 50000))
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def test_audit_write_runs_in_the_threadpool(client, monkeypatch):
+    monkeypatch.setattr(crud_user, "get_user_by_email", lambda db, email: SimpleNamespace(email=email))
+    events = []
+    monkeypatch.setattr(crud_audit.audit_sink, "emit", lambda event: events.append((event, _on_event_loop())))
+
+    response = client.post("/auth/api/public/support-request", json=PAYLOAD)
+
+    assert response.status_code == 200
+    [(event, on_loop)] = events
+    assert not on_loop  # emit có thể sleep + INSERT đồng bộ khi hàng đợi đầy
+    assert (event["action"], event["status"], event["ip_address"]) == ("SOS_REQUEST", "PENDING", "203.0.113.9")
+
+
+def test_unknown_email_is_not_logged(client, monkeypatch):
+    monkeypatch.setattr(crud_user, "get_user_by_email", lambda db, email: None)
+    emit = mock.Mock()
+    monkeypatch.setattr(crud_audit.audit_sink, "emit", emit)
+
+    assert client.post("/auth/api/public/support-request", json=PAYLOAD).status_code == 404
+    emit.assert_not_called()
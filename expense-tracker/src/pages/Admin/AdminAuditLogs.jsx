@@ -6,7 +6,7 @@ import {
     FileText, AlertCircle, CheckCircle2, RefreshCw, Search, Terminal, SearchX, Loader2,
     User, Target, Clock, ShieldAlert, Zap, LifeBuoy
 } from "lucide-react";
-import { adminGetAuditLogs } from "../../services/adminService";
+import { adminGetAuditLogsPage } from "../../services/adminService";
 import { toast, Toaster } from "react-hot-toast";
 
 // Helper format thời gian
@@ -19,29 +19,72 @@ const formatDateTime = (isoString) => {
     } catch (e) { return isoString; }
 };
 
+const PAGE_SIZE = 100;
+const EMPTY_FILTERS = { actor_email: "", action: "", status: "", from: "", to: "" };
+
+// Bộ lọc trên form -> query của /admin/logs; ngày "đến" tính trọn ngày (end_time là 0h ngày kế tiếp, giờ máy)
+const toLogQuery = ({ actor_email, action, status, from, to }) => {
+    const startOfDay = (value) => new Date(`${value}T00:00:00`);
+    let end_time;
+    if (to) {
+        const end = startOfDay(to);
+        end.setDate(end.getDate() + 1);
+        end_time = end.toISOString();
+    }
+    return {
+        actor_email: actor_email.trim() || undefined,
+        action: action.trim() || undefined,
+        status: status || undefined,
+        start_time: from ? startOfDay(from).toISOString() : undefined,
+        end_time,
+    };
+};
+
 export default function AdminAuditLogs() {
   const { theme } = useOutletContext();
   const isDark = theme === "dark";
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
   const [filter, setFilter] = useState("");
+  const [filters, setFilters] = useState(EMPTY_FILTERS);
+  const [appliedFilters, setAppliedFilters] = useState(EMPTY_FILTERS);
 
-  // --- FETCH DATA ---
-  const fetchLogs = async () => {
-    setLoading(true);
+  // --- FETCH DATA (cursor: trang kế tiếp cùng bộ lọc, nối vào danh sách) ---
+  const fetchLogs = async (cursor = null, query = appliedFilters) => {
+    cursor ? setLoadingMore(true) : setLoading(true);
     try {
-        const data = await adminGetAuditLogs(100);
-        setLogs(Array.isArray(data) ? data : []);
+        const page = await adminGetAuditLogsPage({ cursor, limit: PAGE_SIZE, ...toLogQuery(query) });
+        const items = Array.isArray(page?.items) ? page.items : [];
+        setLogs(prev => (cursor ? [...prev, ...items] : items));
+        setNextCursor(page?.next_cursor || null);
     } catch (error) {
         console.warn("Logs fetch fail:", error);
-        setLogs([]);
+        if (!cursor) setLogs([]);
+        setNextCursor(null);
+        toast.error("Could not load logs.");
     } finally {
-        setLoading(false);
+        cursor ? setLoadingMore(false) : setLoading(false);
     }
   };
 
   useEffect(() => { fetchLogs(); }, []);
 
+  const applyFilters = (e) => {
+    e.preventDefault();
+    setAppliedFilters(filters);
+    fetchLogs(null, filters);
+  };
+
+  const resetFilters = () => {
+    setFilters(EMPTY_FILTERS);
+    setAppliedFilters(EMPTY_FILTERS);
+    fetchLogs(null, EMPTY_FILTERS);
+  };
+
+  const updateFilter = (key) => (e) => setFilters(prev => ({ ...prev, [key]: e.target.value }));
+
   const filteredLogs = useMemo(() => {
     if (!Array.isArray(logs)) return [];
     const lowerFilter = filter.toLowerCase();
@@ -78,17 +121,34 @@ export default function AdminAuditLogs() {
             </h1>
             <p className="text-gray-500 dark:text-gray-400 mt-1 text-xs sm:text-sm">Monitor system events & security.</p>
         </div>
-        <button onClick={fetchLogs} className={`w-full md:w-auto px-4 py-2.5 rounded-lg transition flex items-center justify-center gap-2 font-medium shadow-sm active:scale-95 ${isDark ? "bg-gray-800 hover:bg-gray-700 text-gray-200 border border-gray-700" : "bg-white hover:bg-gray-100 text-gray-700 border border-gray-200"}`}>
+        <button onClick={() => fetchLogs()} className={`w-full md:w-auto px-4 py-2.5 rounded-lg transition flex items-center justify-center gap-2 font-medium shadow-sm active:scale-95 ${isDark ? "bg-gray-800 hover:bg-gray-700 text-gray-200 border border-gray-700" : "bg-white hover:bg-gray-100 text-gray-700 border border-gray-200"}`}>
             <RefreshCw size={16} className={loading ? "animate-spin text-purple-500" : ""} /> Refresh
         </button>
       </div>
 
-      {/* --- SEARCH --- */}
-      <div className="px-4 mb-6">
+      {/* --- FILTERS (lọc phía server) + SEARCH (trong các dòng đã tải) --- */}
+      <div className="px-4 mb-6 space-y-3">
+        <form onSubmit={applyFilters} className={`p-3 rounded-xl shadow-sm border grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-6 gap-2 ${isDark ? "bg-gray-800 border-gray-700" : "bg-white border-gray-200"}`}>
+            <input type="email" placeholder="Actor email" value={filters.actor_email} onChange={updateFilter("actor_email")} className={`px-3 py-2 rounded-lg border outline-none text-sm ${isDark ? "bg-gray-900 border-gray-700 text-white" : "bg-gray-50 border-gray-200 text-gray-900"}`} />
+            <input type="text" placeholder="Action (e.g. LOGIN)" value={filters.action} onChange={updateFilter("action")} className={`px-3 py-2 rounded-lg border outline-none text-sm ${isDark ? "bg-gray-900 border-gray-700 text-white" : "bg-gray-50 border-gray-200 text-gray-900"}`} />
+            <select value={filters.status} onChange={updateFilter("status")} className={`px-3 py-2 rounded-lg border outline-none text-sm ${isDark ? "bg-gray-900 border-gray-700 text-white" : "bg-gray-50 border-gray-200 text-gray-900"}`}>
+                <option value="">All statuses</option>
+                <option value="SUCCESS">SUCCESS</option>
+                <option value="ERROR">ERROR</option>
+                <option value="INFO">INFO</option>
+                <option value="PENDING">PENDING</option>
+            </select>
+            <input type="date" title="From" value={filters.from} onChange={updateFilter("from")} className={`px-3 py-2 rounded-lg border outline-none text-sm ${isDark ? "bg-gray-900 border-gray-700 text-white" : "bg-gray-50 border-gray-200 text-gray-900"}`} />
+            <input type="date" title="To" value={filters.to} onChange={updateFilter("to")} className={`px-3 py-2 rounded-lg border outline-none text-sm ${isDark ? "bg-gray-900 border-gray-700 text-white" : "bg-gray-50 border-gray-200 text-gray-900"}`} />
+            <div className="flex gap-2">
+                <button type="submit" className="flex-1 px-3 py-2 rounded-lg bg-purple-600 hover:bg-purple-700 text-white text-sm font-medium">Apply</button>
+                <button type="button" onClick={resetFilters} className={`px-3 py-2 rounded-lg border text-sm ${isDark ? "border-gray-700 text-gray-300" : "border-gray-200 text-gray-600"}`}>Reset</button>
+            </div>
+        </form>
         <div className={`p-2 rounded-xl shadow-sm border ${isDark ? "bg-gray-800 border-gray-700" : "bg-white border-gray-200"}`}>
             <div className="relative w-full">
                 <Search className="absolute left-3 top-1/2 -translate-y-1/2 text-gray-400" size={18} />
-                <input type="text" placeholder="Search logs..." value={filter} onChange={(e) => setFilter(e.target.value)}
+                <input type="text" placeholder="Search loaded logs..." value={filter} onChange={(e) => setFilter(e.target.value)}
                     className={`w-full pl-10 pr-4 py-2 rounded-lg bg-transparent outline-none transition-all placeholder-gray-400 text-sm ${isDark ? "text-white" : "text-gray-900"}`} />
             </div>
         </div>
@@ -221,6 +281,14 @@ export default function AdminAuditLogs() {
                 </div>
             </>
         )}
+        {!loading && nextCursor && (
+            <div className="flex justify-center mt-6">
+                <button onClick={() => fetchLogs(nextCursor)} disabled={loadingMore}
+                    className={`px-5 py-2.5 rounded-lg border text-sm font-medium flex items-center gap-2 disabled:opacity-60 ${isDark ? "bg-gray-800 border-gray-700 text-gray-200 hover:bg-gray-700" : "bg-white border-gray-200 text-gray-700 hover:bg-gray-100"}`}>
+                    {loadingMore && <Loader2 size={16} className="animate-spin text-purple-500" />} Load more
+                </button>
+            </div>
+        )}
       </div>
     </div>
   );
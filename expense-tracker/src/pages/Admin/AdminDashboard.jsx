@@ -59,7 +59,7 @@ export default function AdminDashboard() {
       const [kpisData, growthData, usersData] = await Promise.all([
         adminGetGlobalKPIs().catch(err => { console.warn("KPI fetch fail:", err); return null; }),
         adminGetGlobalUserGrowth(30).catch(err => { console.warn("Growth fetch fail:", err); return []; }),
-        adminGetAllUsers(0, 5).catch(err => { console.warn("Users fetch fail:", err); return { users: [] }; }), 
+        adminGetAllUsers(5).catch(err => { console.warn("Users fetch fail:", err); return { users: [] }; }), 
       ]);
 
       // Xử lý dữ liệu an toàn
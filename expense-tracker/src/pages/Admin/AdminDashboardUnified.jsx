@@ -60,7 +60,7 @@ export default function AdminDashboardUnified() {
       const [kpiResult, growthResult, usersResult] = await Promise.allSettled([
         adminGetGlobalKPIs(),
         adminGetGlobalUserGrowth(30),
-        adminGetAllUsers(0, 12),
+        adminGetAllUsers(12),
       ]);
 
       if (!mounted) {
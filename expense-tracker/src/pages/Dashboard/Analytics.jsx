@@ -30,8 +30,8 @@ import {
 import toast, { Toaster } from "react-hot-toast";
 
 // Giữ nguyên import services
-import { getIncomes } from "../../services/incomeService";
-import { getExpenses } from "../../services/expenseService";
+import { getAllIncomes } from "../../services/incomeService";
+import { getAllExpenses } from "../../services/expenseService";
 import { getCategories } from "../../services/categoryService"; 
 
 // Helper format tiền tệ an toàn
@@ -118,8 +118,8 @@ export default function Analytics() {
     const fetchTransactions = useCallback(async () => {
         try {
             const [incomeRes, expenseRes, incomeCats, expenseCats] = await Promise.all([
-                getIncomes().catch(() => ({ items: [] })), 
-                getExpenses().catch(() => ({ items: [] })), 
+                getAllIncomes().catch(() => []), 
+                getAllExpenses().catch(() => []), 
                 getCategories('income').catch(() => []),
                 getCategories('expense').catch(() => []),
             ]);
@@ -67,6 +67,8 @@ export default function Expense() {
     const isDark = theme === "dark";
 
     const [expenseData, setExpenseData] = useState({ items: [] });
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [categories, setCategories] = useState([]);
     
     // UI States
@@ -132,6 +134,7 @@ export default function Expense() {
             ]);
 
             setExpenseData(expData && expData.items ? expData : { items: [] });
+            setNextCursor(expData?.next_cursor || null);
             setCategories(Array.isArray(categoryData) ? categoryData : []);
             setDailyTrend(Array.isArray(trendData) ? trendData : []);
             setBreakdownData(Array.isArray(breakdown) ? breakdown : []);
@@ -143,6 +146,21 @@ export default function Expense() {
         }
     }, [chartDays]);
 
+    // Phân trang cursor: nối trang tiếp theo vào danh sách hiện tại
+    const loadMore = useCallback(async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const page = await getExpenses({ cursor: nextCursor });
+            setExpenseData(prev => ({ ...prev, items: [...(prev.items || []), ...(page?.items || [])] }));
+            setNextCursor(page?.next_cursor || null);
+        } catch (error) {
+            console.warn("Expense page fetch fail:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    }, [nextCursor, loadingMore]);
+
     useEffect(() => {
         fetchData();
         const handleUpdate = () => {
@@ -340,6 +358,15 @@ export default function Expense() {
                         emptyDescription="Start tracking your finances by adding your first expense."
                         emptyActionLabel="Add Expense"
                     />
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className={`mt-4 w-full py-3 rounded-2xl font-bold transition-all active:scale-95 disabled:opacity-60 ${isDark ? "bg-gray-700 hover:bg-gray-600" : "bg-gray-100 hover:bg-gray-200 text-gray-700"}`}
+                        >
+                            {loadingMore ? "Loading..." : "Load more"}
+                        </button>
+                    )}
                 </div>
             </div>
 
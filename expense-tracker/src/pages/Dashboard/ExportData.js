@@ -15,8 +15,8 @@ import {
 } from "lucide-react";
 import toast, { Toaster } from "react-hot-toast";
 import { authorizedFetch } from "../../services/api";
-import { getIncomes } from "../../services/incomeService";
-import { getExpenses } from "../../services/expenseService";
+import { getAllIncomes } from "../../services/incomeService";
+import { getAllExpenses } from "../../services/expenseService";
 import { formatCurrency, formatLongDate } from "../../utils/formatters";
 
 function SummaryTile({ title, value, icon: Icon, tone }) {
@@ -46,13 +46,13 @@ export default function ExportData() {
     async function loadPreview() {
       setLoading(true);
 
-      const [incomeResult, expenseResult] = await Promise.allSettled([getIncomes(), getExpenses()]);
+      const [incomeResult, expenseResult] = await Promise.allSettled([getAllIncomes(), getAllExpenses()]);
       if (!mounted) {
         return;
       }
 
       const incomes = incomeResult.status === "fulfilled" ? incomeResult.value : [];
-      const expenses = expenseResult.status === "fulfilled" ? expenseResult.value?.items || [] : [];
+      const expenses = expenseResult.status === "fulfilled" ? expenseResult.value : [];
 
       const merged = [
         ...incomes.map((item) => ({ ...item, type: "income" })),
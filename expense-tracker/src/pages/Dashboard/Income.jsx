@@ -18,7 +18,7 @@ import {
 } from "recharts";
 import toast, { Toaster } from "react-hot-toast";
 import {
-    getIncomes,
+    getIncomePage,
     createIncome,
     updateIncome,
     deleteIncome,
@@ -70,6 +70,8 @@ export default function Income() {
     const isDark = theme === "dark";
 
     const [incomes, setIncomes] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [categories, setCategories] = useState([]);
     const [incomeSummary, setIncomeSummary] = useState([]); 
     
@@ -113,12 +115,12 @@ export default function Income() {
     const fetchData = useCallback(async () => {
         try {
             const [incomesResult, categoriesResult, summaryResult] = await Promise.all([
-                getIncomes().catch(err => { console.warn("Incomes fetch fail:", err); return []; }),
+                getIncomePage().catch(err => { console.warn("Incomes fetch fail:", err); return { items: [] }; }),
                 getCategories("income").catch(err => { console.warn("Cat fetch fail:", err); return []; }),
                 getIncomeSummary().catch(err => { console.warn("Summary fetch fail:", err); return []; }),
             ]);
 
-            const safeIncomes = Array.isArray(incomesResult) ? incomesResult : [];
+            const safeIncomes = Array.isArray(incomesResult?.items) ? incomesResult.items : [];
             const safeCategories = Array.isArray(categoriesResult) ? categoriesResult : [];
             const safeSummary = Array.isArray(summaryResult) ? summaryResult : [];
 
@@ -128,6 +130,7 @@ export default function Income() {
             })).filter(item => item.value > 0);
 
             setIncomes(safeIncomes);
+            setNextCursor(incomesResult?.next_cursor || null);
             setCategories(safeCategories);
             setIncomeSummary(formattedSummary);
 
@@ -138,6 +141,21 @@ export default function Income() {
         }
     }, []);
 
+    // Phân trang cursor: nối trang tiếp theo vào danh sách hiện tại
+    const loadMore = useCallback(async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const page = await getIncomePage({ cursor: nextCursor });
+            setIncomes(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err) {
+            console.warn("Incomes page fetch fail:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    }, [nextCursor, loadingMore]);
+
     useEffect(() => {
         fetchData();
         const handleUpdate = () => {
@@ -359,6 +377,15 @@ export default function Income() {
                         onAdd={() => setShowModal(true)}
                         formatAmount={(amt) => formatAmountDisplay(amt, currencyCode)}
                     />
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className={`mt-4 w-full py-3 rounded-2xl font-bold transition-all active:scale-95 disabled:opacity-60 ${isDark ? "bg-gray-700 hover:bg-gray-600" : "bg-gray-100 hover:bg-gray-200 text-gray-700"}`}
+                        >
+                            {loadingMore ? "Loading..." : "Load more"}
+                        </button>
+                    )}
                 </div>
             </div>
             
@@ -1,9 +1,24 @@
 import { authorizedFetch, buildQuery } from "./api";
 
-export async function adminGetAllUsers(skip = 0, limit = 100) {
-  return authorizedFetch(`/admin/users${buildQuery({ skip, limit })}`, {
-    method: "GET",
-  });
+// 1 trang user: { items, next_cursor }; lọc theo search (tiền tố email/tên), is_admin, is_2fa_enabled, is_email_verified
+export async function adminGetUsersPage({
+  cursor,
+  limit = 100,
+  search,
+  is_admin,
+  is_2fa_enabled,
+  is_email_verified,
+} = {}) {
+  return authorizedFetch(
+    `/admin/users${buildQuery({ cursor, limit, search, is_admin, is_2fa_enabled, is_email_verified })}`,
+    { method: "GET" }
+  );
+}
+
+// Trang đầu (user mới nhất), trả về mảng như trước
+export async function adminGetAllUsers(limit = 100) {
+  const page = await adminGetUsersPage({ limit });
+  return page?.items || [];
 }
 
 export async function adminUpdateUser(userId, data) {
@@ -62,10 +77,26 @@ export async function updateSystemSettings(data) {
   });
 }
 
-export async function adminGetAuditLogs(limit = 50, skip = 0) {
-  return authorizedFetch(`/admin/logs${buildQuery({ skip, limit })}`, {
-    method: "GET",
-  });
+// 1 trang log: { items, next_cursor }; lọc theo actor_email, action, status, [start_time, end_time) (ISO)
+export async function adminGetAuditLogsPage({
+  cursor,
+  limit = 100,
+  actor_email,
+  action,
+  status,
+  start_time,
+  end_time,
+} = {}) {
+  return authorizedFetch(
+    `/admin/logs${buildQuery({ cursor, limit, actor_email, action, status, start_time, end_time })}`,
+    { method: "GET" }
+  );
+}
+
+// Trang đầu (log mới nhất), trả về mảng như trước
+export async function adminGetAuditLogs(limit = 50) {
+  const page = await adminGetAuditLogsPage({ limit });
+  return page?.items || [];
 }
 
 export async function adminGetSystemHealth() {
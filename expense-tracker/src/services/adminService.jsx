@@ -2,7 +2,7 @@
 // - ✅ FIX: Dùng Token từ LocalStorage và xử lý 401
 
 import { getToken } from "./incomeService"; 
-import { BACKEND_BASE } from "./api";
+import { BACKEND_BASE, buildQuery } from "./api";
 import { auth } from "../components/firebase";
 import { signOut } from "firebase/auth";
 
@@ -61,8 +61,10 @@ async function systemRequest(endpoint, method, body = null) {
 
 // --- CÁC HÀM EXPORT (GIỮ NGUYÊN) ---
 
-export async function adminGetAllUsers() {
-    return adminRequest("/users", { method: "GET" });
+// /admin/users trả về 1 trang cursor { items, next_cursor }; hàm này lấy trang đầu (user mới nhất) dạng mảng
+export async function adminGetAllUsers(limit = 100) {
+    const page = await adminRequest(`/users?limit=${limit}`, { method: "GET" });
+    return page?.items || [];
 }
 
 export async function adminUpdateUser(userId, data) {
@@ -119,8 +121,18 @@ export async function updateSystemSettings(data) {
     return systemRequest("/settings", "PUT", data);
 }
 
+// 1 trang log: { items, next_cursor }; lọc theo actor_email, action, status, [start_time, end_time) (ISO)
+export async function adminGetAuditLogsPage({ cursor, limit = 100, actor_email, action, status, start_time, end_time } = {}) {
+    return adminRequest(
+        `/logs${buildQuery({ cursor, limit, actor_email, action, status, start_time, end_time })}`,
+        { method: "GET" }
+    );
+}
+
+// Trang đầu (log mới nhất), trả về mảng như trước
 export async function adminGetAuditLogs(limit = 50) {
-    return adminRequest(`/logs?limit=${limit}`, { method: "GET" });
+    const page = await adminGetAuditLogsPage({ limit });
+    return page?.items || [];
 }
 
 export async function adminGetSystemHealth() {
@@ -45,14 +45,35 @@ export async function createExpense(data) {
   return normalizeExpense(response);
 }
 
-export async function getExpenses() {
-  const data = await authorizedFetch("/expenses/", { method: "GET" });
+function buildPageQuery({ cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+  if (limit) params.set("limit", String(limit));
+  const query = params.toString();
+  return query ? `?${query}` : "";
+}
+
+// Trả về 1 trang (mặc định 50 dòng); truyền next_cursor của trang trước để lấy trang tiếp theo.
+export async function getExpenses(page = {}) {
+  const data = await authorizedFetch(`/expenses/${buildPageQuery(page)}`, { method: "GET" });
   return {
     ...data,
     items: Array.isArray(data?.items) ? data.items.map(normalizeExpense) : [],
   };
 }
 
+// Toàn bộ lịch sử (export, analytics): đi hết các trang theo next_cursor, mỗi trang tối đa 500 dòng (giới hạn của server).
+export async function getAllExpenses() {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await getExpenses({ cursor, limit: 500 });
+    items.push(...(page?.items || []));
+    cursor = page?.next_cursor || null;
+  } while (cursor);
+  return items;
+}
+
 export async function updateExpense(id, data) {
   const response = await authorizedFetch(`/expenses/${id}`, {
     method: "PUT",
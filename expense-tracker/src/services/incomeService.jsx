@@ -97,9 +97,34 @@ export async function createIncome(data) {
   });
 }
 
-export async function getIncomes() {
-  const data = await authorizedFetch(`${BACKEND_BASE}/incomes`, { method: "GET" });
-  return data.items || [];
+function buildPageQuery({ cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+  if (limit) params.set("limit", String(limit));
+  const query = params.toString();
+  return query ? `?${query}` : "";
+}
+
+// Trả về 1 trang { items, next_cursor }; truyền next_cursor của trang trước để lấy trang tiếp theo.
+export async function getIncomePage(page = {}) {
+  const data = await authorizedFetch(`${BACKEND_BASE}/incomes${buildPageQuery(page)}`, { method: "GET" });
+  return { items: data.items || [], next_cursor: data.next_cursor || null };
+}
+
+export async function getIncomes(page = {}) {
+  return (await getIncomePage(page)).items;
+}
+
+// Toàn bộ lịch sử (export, analytics): đi hết các trang theo next_cursor, mỗi trang tối đa 500 dòng (giới hạn của server).
+export async function getAllIncomes() {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await getIncomePage({ cursor, limit: 500 });
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return items;
 }
 
 export async function updateIncome(id, data) {